@@ -1,8 +1,54 @@
 # __init__.py
 # agentic_ai_framework/agents/__init__.py
-from .base_agent import BaseAgent
-from .orchestrator_agent import OrchestratorAgent
-from .researcher_agent import ResearcherAgent
-from .communicator_agent import CommunicatorAgent
-from .planner_agent import PlannerAgent
-from .multimodal_input_agent import MultimodalInputAgent
\ No newline at end of file
+import importlib
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List
+
+# Agent classes -> defining module. Like the tool registry, modules are imported on first attribute
+# access (PEP 562), so `import agents` does not pull in the agents' tools and their dependencies.
+_AGENT_EXPORTS = {
+    "BaseAgent": "base_agent",
+    "OrchestratorAgent": "orchestrator_agent",
+    "ResearcherAgent": "researcher_agent",
+    "CommunicatorAgent": "communicator_agent",
+    "PlannerAgent": "planner_agent",
+    "MultimodalInputAgent": "multimodal_input_agent",
+}
+
+__all__ = ["AgentRegistry"] + list(_AGENT_EXPORTS)
+
+def __getattr__(name: str):
+    if name in _AGENT_EXPORTS:
+        return getattr(importlib.import_module(f"{__name__}.{_AGENT_EXPORTS[name]}"), name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_AGENT_EXPORTS))
+
+class AgentRegistry(Mapping):
+    """
+    Read-only mapping of route name -> agent in which each agent is built by its factory on first lookup.
+    Names, membership and iteration only use the declared factories, so routing prompts can list
+    every agent without constructing any of them.
+    """
+    def __init__(self, factories: Dict[str, Callable[[], Any]]):
+        self._factories = dict(factories)
+        self._agents: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._agents:
+            self._agents[name] = self._factories[name]() # KeyError for unknown names, as with a dict
+        return self._agents[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def loaded(self) -> List[str]:
+        """Names of the agents that have been built so far."""
+        return list(self._agents)
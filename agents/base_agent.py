@@ -4,36 +4,58 @@ import asyncio
 from llm_client import LLMClient
 from utils.logger import setup_logger
 from utils.prompt_formatter import PromptFormatter
+from tools import get_tool
 from typing import List, Dict, Callable, Any, Union
 import inspect
 from PIL.Image import Image as PILImage # For type hinting PIL Image objects
-import chainlit as cl # For Chainlit integration
+from utils.events import current_sink
+from utils.deadline import Deadline, RequestCancelled, current_deadline
+from utils.tracing import tracer, payload_size
+from config import ORCHESTRATION_SETTINGS
 
 logger = setup_logger(__name__)
 
 class BaseAgent:
+    # Agents that consume RAG context set this so the Orchestrator hands them its prefetched lookup.
+    uses_retrieval = False
+
     def __init__(self, name: str, role: str, goal: str, instructions: str,
-                 llm_client: LLMClient, memory=None, tools: List[Any] = None): # tools will be BaseTool instances
+                 llm_client: LLMClient, memory=None, tools: List[Any] = None): # BaseTool instances or registered tool names
         self.name = name
         self.role = role
         self.goal = goal
         self.instructions = instructions
         self.llm_client = llm_client
         self.memory = memory
-        self._tools = {tool.name: tool for tool in tools} if tools else {} # Map tool name to tool object
+        self._tools = {} # Map tool name to tool object, or to None until a registered tool is first needed
+        for tool in tools or []:
+            self.add_tool(tool)
+
+    def add_tool(self, tool: Any): # Expects a BaseTool instance or a name from tools.TOOL_REGISTRY
+        if isinstance(tool, str):
+            self._tools.setdefault(tool, None) # Resolved (and its module imported) on first use
+            logger.info(f"Tool '{tool}' added to {self.name}.")
+        else:
+            self._tools[tool.name] = tool
+            logger.info(f"Tool '{tool.name}' added to {self.name}.")
 
-    def add_tool(self, tool: Any): # Expects BaseTool instance
-        self._tools[tool.name] = tool
-        logger.info(f"Tool '{tool.name}' added to {self.name}.")
+    def _get_tool(self, tool_name: str) -> Any:
+        if self._tools[tool_name] is None:
+            self._tools[tool_name] = get_tool(tool_name)
+        return self._tools[tool_name]
 
     def get_tools(self) -> List[Any]:
-        return list(self._tools.values())
+        return [self._get_tool(tool_name) for tool_name in self._tools]
 
-    async def _execute_tool_call(self, tool_call: Any) -> Any:
+    async def _execute_tool_call(self, tool_call: Any, deadline: Deadline = None) -> Any:
         """
         Executes a tool call requested by the LLM.
         `tool_call` can be a Gemini FunctionCall or OpenAI ToolCall object.
+        Async tools are given at most the request's remaining budget.
         """
+        deadline = deadline or current_deadline()
+        if deadline:
+            deadline.check()
         tool_name = tool_call.function.name
         tool_args = tool_call.function.args.copy() # Make a mutable copy of args
 
@@ -41,34 +63,41 @@ class BaseAgent:
             logger.error(f"Agent {self.name} attempted to call unknown tool: {tool_name}")
             return f"Error: Tool '{tool_name}' not found."
 
-        tool_func = self._tools[tool_name].func
+        tool_func = self._get_tool(tool_name).func
         
-        async with cl.Step(name=f"Tool: {tool_name}", type="tool", parent_id=cl.get_current_step().id) as tool_step:
+        with tracer.span("tool", label=tool_name, agent=self.name) as span:
+            tool_output = await self._run_tool(tool_name, tool_func, tool_args, deadline)
+            if tracer.enabled:
+                span.set(bytes_in=payload_size(tool_args), bytes_out=payload_size(tool_output))
+            return tool_output
+
+    async def _run_tool(self, tool_name: str, tool_func: Callable, tool_args: Dict[str, Any], deadline: Deadline = None) -> Any:
+        async with current_sink().step(f"Tool: {tool_name}", type="tool") as tool_step:
             tool_step.input = tool_args # Display tool arguments in Chainlit UI
             logger.info(f"Agent {self.name} calling tool '{tool_name}' with args: {tool_args}")
 
             try:
                 # Check if the tool function is async
                 if inspect.iscoroutinefunction(tool_func):
-                    tool_output = await tool_func(**tool_args)
+                    tool_output = await (deadline.wait_for(tool_func(**tool_args)) if deadline else tool_func(**tool_args))
                 else:
                     tool_output = tool_func(**tool_args)
                 tool_step.output = tool_output # Display tool output in Chainlit UI
                 logger.info(f"Tool '{tool_name}' returned: {tool_output}")
                 return tool_output
+            except RequestCancelled:
+                tool_step.output = "Stopped: the request was cancelled or ran out of time."
+                raise
             except Exception as e:
                 tool_step.output = f"Error executing tool: {e}"
-                tool_step.status = cl.StepStatus.FAILED
+                tool_step.is_error = True
                 logger.error(f"Error executing tool '{tool_name}': {e}")
                 return f"Error executing tool '{tool_name}': {e}"
 
-    async def generate_response(self, prompt: str, multimodal_content: List[Union[str, PILImage]] = None, **kwargs) -> str:
+    def _build_user_parts(self, prompt: str, multimodal_content: List[Union[str, PILImage]] = None) -> List[Any]:
         """
-        Generates a response using the LLM, potentially with multimodal input and handling tool calls.
+        Converts multimodal content plus the text prompt into the user parts sent to the LLM.
         """
-        # Build the initial conversation history for the LLM
-        history_parts = [{"role": "system", "parts": [self.instructions]}]
-        
         user_parts = []
         if multimodal_content:
             for item in multimodal_content:
@@ -76,52 +105,71 @@ class BaseAgent:
                     user_parts.append({"text": item})
                 elif isinstance(item, PILImage):
                     user_parts.append(item) # PIL Image objects are directly supported by Gemini
+                elif isinstance(item, dict) and "mime_type" in item:
+                    user_parts.append(item) # Pre-encoded inline data from the image pipeline
         user_parts.append({"text": prompt}) # Add the main text prompt
+        return user_parts
 
-        history_parts.append({"role": "user", "parts": user_parts})
+    async def generate_response(self, prompt: str, multimodal_content: List[Union[str, PILImage]] = None, deadline: Deadline = None, **kwargs) -> str:
+        """
+        Generates a response using the LLM, potentially with multimodal input and handling tool calls.
+        When little of the request's budget is left after a tool round, the LLM is asked for a final
+        answer from the tool results so far instead of being offered the tools again.
+        """
+        deadline = deadline or current_deadline()
+        kwargs.setdefault("call_site", "agent") # Model cascade policy for agent turns (see CASCADE_SETTINGS)
+        # Build the initial conversation history for the LLM
+        history_parts = [{"role": "system", "parts": [self.instructions]}]
+        history_parts.append({"role": "user", "parts": self._build_user_parts(prompt, multimodal_content)})
         
         num_retries = 0
         max_retries = 3 # Prevent infinite tool call loops
         
         while num_retries < max_retries:
-            llm_response = await self.llm_client.generate_content(
-                contents=history_parts,
-                tools=self.get_tools(),
-                **kwargs
-            )
+            budget = deadline.remaining() if deadline else None
+            final_round = num_retries > 0 and budget is not None and budget < ORCHESTRATION_SETTINGS["min_tool_round_seconds"]
+            if final_round:
+                logger.warning(f"Agent {self.name} has {budget:.1f}s left; answering without another tool round.")
+            with tracer.span("generate_response.iteration", label=self.name, iteration=num_retries, final_round=final_round) as span:
+                llm_response = await self.llm_client.generate_content(
+                    contents=history_parts,
+                    tools=None if final_round else self.get_tools(),
+                    deadline=deadline,
+                    **kwargs
+                )
             
-            if isinstance(llm_response, dict) and "tool_calls" in llm_response:
-                # If the LLM wants to call tools, execute them
-                tool_outputs = []
-                for tool_call in llm_response["tool_calls"]:
-                    output = await self._execute_tool_call(tool_call)
-                    tool_outputs.append({
-                        "function_name": tool_call.function.name,
-                        "output": output
-                    })
+                if isinstance(llm_response, dict) and "tool_calls" in llm_response:
+                    span.set(tool_calls=len(llm_response["tool_calls"]))
+                    # If the LLM wants to call tools, execute them
+                    tool_outputs = []
+                    for tool_call in llm_response["tool_calls"]:
+                        output = await self._execute_tool_call(tool_call, deadline=deadline)
+                        tool_outputs.append({
+                            "function_name": tool_call.function.name,
+                            "output": output
+                        })
                 
-                # After executing tools, append tool outputs to history and call LLM again
-                # Convert tool outputs to a format LLM understands
-                tool_output_messages = []
-                for tc in tool_outputs:
-                    # Gemini expects function call responses in this format
-                    tool_output_messages.append(
-                        genai.protos.Part(
-                            function_response=genai.protos.FunctionResponse(
-                                name=tc['function_name'],
-                                response=genai.protos.Response(
-                                    data=tc['output']
+                    # After executing tools, append tool outputs to history and call LLM again
+                    # Convert tool outputs to a format LLM understands
+                    import google.generativeai as genai # Deferred like in BaseTool; only tool-calling turns need it
+                    tool_output_messages = []
+                    for tc in tool_outputs:
+                        # Gemini expects function call responses in this format
+                        tool_output_messages.append(
+                            genai.protos.Part(
+                                function_response=genai.protos.FunctionResponse(
+                                    name=tc['function_name'],
+                                    response={"result": tc['output']} # A google.protobuf.Struct; there is no protos.Response
                                 )
                             )
                         )
-                    )
                 
-                history_parts.append({"role": "function", "parts": tool_output_messages})
-                logger.info(f"Appended tool outputs to history. Retrying LLM call. Retry count: {num_retries + 1}")
-                num_retries += 1
-            else:
-                # LLM generated a text response, not a tool call
-                return llm_response
+                    history_parts.append({"role": "function", "parts": tool_output_messages})
+                    logger.info(f"Appended tool outputs to history. Retrying LLM call. Retry count: {num_retries + 1}")
+                    num_retries += 1
+                else:
+                    # LLM generated a text response, not a tool call
+                    return llm_response
         
         logger.error(f"Agent {self.name} exceeded max tool call retries.")
         return "I tried to use tools multiple times but couldn't get a final answer. Please try clarifying your request."
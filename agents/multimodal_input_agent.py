@@ -2,12 +2,15 @@
 from .base_agent import BaseAgent
 from llm_client import LLMClient
 from utils.logger import setup_logger
+from utils.image_pipeline import image_pipeline
+from tools.voice_tools import UNTRANSCRIBED, speech_to_text
 from PIL import Image # For handling PIL Image objects
 from typing import List, Union, Dict, Any
 import io
+import json
 import base64
 import asyncio
-import chainlit as cl # For Chainlit integration
+from utils.events import current_sink
 
 logger = setup_logger(__name__)
 
@@ -30,48 +33,53 @@ class MultimodalInputAgent(BaseAgent):
             # No specific tools directly here; its "tools" are internal processing steps/LLM multimodal capabilities
         )
 
-    async def handle(self, audio_data: bytes = None, image_data: bytes = None, video_frame_data: bytes = None, text_input: str = None) -> Dict[str, Union[str, List[Union[str, Image]]]]:
+    async def handle(self, audio_data: bytes = None, image_data: bytes = None, video_frame_data: bytes = None, text_input: str = None,
+                     route_options: List[str] = None) -> Dict[str, Union[str, List[Union[str, Dict[str, Any]]]]]:
         """
         Processes raw multimodal inputs.
-        Returns parsed text and a list of multimodal parts (strings or PIL.Image.Image objects)
+        Returns parsed text and a list of multimodal parts (strings or inline image data dicts)
         that can be fed to Gemini 1.5 Pro.
+        If `route_options` is given (fused mode), the same LLM call also picks one of those agents
+        and the result carries it under "route", so the media does not need a second routing call. It then
+        also carries "interpreted_parts": the parts with each image/frame replaced by a reference to the
+        interpretation, for the routed agent, so the media is not sent to the model a second time.
         """
         logger.info("[MultimodalInputAgent] Processing multimodal input.")
         
         # This list will hold the various "parts" to send to Gemini
-        gemini_input_parts: List[Union[str, Image.Image]] = []
+        gemini_input_parts: List[Union[str, Dict[str, Any]]] = []
         
         processing_summary = []
 
         if audio_data:
-            async with cl.Step(name="Speech-to-Text", type="tool", parent_id=cl.get_current_step().id) as stt_step:
-                # In a real system, send audio_data to a real-time STT service or use your SpeechToTextTool
-                # For this example, we'll use a mock or the simulated tool.
-                from tools import SpeechToTextTool
-                # Create a temporary file to simulate audio_file_path for the tool
-                temp_audio_path = "temp_audio.mp3"
+            async with current_sink().step("Speech-to-Text", type="tool") as stt_step:
+                # Transcribed in memory, chunk by chunk; partial transcripts show up in the step as they arrive.
+                async def show_partial(partial_text: str):
+                    stt_step.output = f"Transcribing: {partial_text}"
+                    await stt_step.update()
+
                 try:
-                    with open(temp_audio_path, "wb") as f:
-                        f.write(audio_data)
-                    transcribed_text = await SpeechToTextTool.func(audio_file_path=temp_audio_path)
+                    transcribed_text = await speech_to_text.transcribe(audio_data, on_partial=show_partial)
                     stt_step.output = f"Transcribed: {transcribed_text}"
                     logger.info(f"Transcribed Audio: {transcribed_text}")
-                    gemini_input_parts.append(f"User said: '{transcribed_text}'")
-                    processing_summary.append(f"Audio Transcribed: '{transcribed_text}'")
+                    if transcribed_text == UNTRANSCRIBED:
+                        gemini_input_parts.append("The user's audio could not be transcribed.")
+                        processing_summary.append("Audio received but could not be transcribed.")
+                    else:
+                        gemini_input_parts.append(f"User said: '{transcribed_text}'")
+                        processing_summary.append(f"Audio Transcribed: '{transcribed_text}'")
                 except Exception as e:
                     stt_step.output = f"Error transcribing audio: {e}"
                     logger.error(f"Error transcribing audio: {e}")
                     gemini_input_parts.append("Error processing audio.")
-                finally:
-                    if os.path.exists(temp_audio_path):
-                        os.remove(temp_audio_path)
 
         if image_data:
-            async with cl.Step(name="Image Processing", type="tool", parent_id=cl.get_current_step().id) as image_step:
+            async with current_sink().step("Image Processing", type="tool") as image_step:
                 try:
-                    img = Image.open(io.BytesIO(image_data))
-                    gemini_input_parts.append(img) # Directly append PIL Image
-                    image_step.output = "Image processed successfully."
+                    # Downscaled, re-encoded and deduped in the shared process pool before it reaches the model
+                    processed = await image_pipeline.process_bytes(image_data)
+                    gemini_input_parts.append(image_pipeline.to_part(processed))
+                    image_step.output = f"Image processed successfully ({processed['width']}x{processed['height']}, {len(image_data)} -> {len(processed['data'])} bytes)."
                     processing_summary.append("Image received and processed.")
                 except Exception as e:
                     image_step.output = f"Error processing image: {e}"
@@ -79,12 +87,15 @@ class MultimodalInputAgent(BaseAgent):
                     gemini_input_parts.append("Error processing image.")
         
         if video_frame_data:
-            async with cl.Step(name="Video Frame Processing", type="tool", parent_id=cl.get_current_step().id) as video_step:
+            async with current_sink().step("Video Frame Processing", type="tool") as video_step:
                 try:
-                    frame_img = Image.open(io.BytesIO(video_frame_data))
-                    gemini_input_parts.append(frame_img) # Directly append PIL Image
-                    video_step.output = "Video frame processed successfully."
-                    processing_summary.append("Video frame received and processed.")
+                    # Sample a few distinct frames instead of treating the whole video as one image
+                    frames = await image_pipeline.sample_video(video_frame_data)
+                    for frame in frames:
+                        gemini_input_parts.append(f"Video frame at {frame['timestamp']}s:")
+                        gemini_input_parts.append(image_pipeline.to_part(frame))
+                    video_step.output = f"Sampled {len(frames)} video frame(s) at {[f['timestamp'] for f in frames]}s."
+                    processing_summary.append(f"Video received; {len(frames)} frame(s) sampled.")
                 except Exception as e:
                     video_step.output = f"Error processing video frame: {e}"
                     logger.error(f"Failed to process video frame data: {e}")
@@ -107,14 +118,53 @@ class MultimodalInputAgent(BaseAgent):
             f"Extract key context and formulate a clear, actionable textual prompt for another agent. "
             f"Summarize the overall request. Your output should be a single coherent textual representation of the user's full request."
         )
+        llm_kwargs = {"call_site": "multimodal"}
+        if route_options:
+            final_prompt_for_gemini += (
+                f"\nAlso choose which agent should handle the request. Available Agents: {', '.join(route_options)}. "
+                f"Use 'clarify' if the request is ambiguous. "
+                f'Respond ONLY with a JSON object: {{"intent": "<the textual request>", "route": "<agent name>"}}.'
+            )
+            llm_kwargs["response_format"] = "json"
+            # An answer without a usable route (or with 'clarify') goes to the stronger model
+            llm_kwargs["validate"] = lambda response: self._parse_interpretation(response, text_input)[1] in route_options
 
-        gemini_input_parts.append(final_prompt_for_gemini) # Add the final instruction
-
-        async with cl.Step(name="Gemini Multimodal Interpretation", type="llm", parent_id=cl.get_current_step().id) as llm_step:
+        # The instruction is only for this call; downstream agents get the raw parts.
+        async with current_sink().step("Gemini Multimodal Interpretation", type="llm") as llm_step:
             # The LLM will process the `gemini_input_parts` list, which can contain both text and images/video frames.
-            llm_response = await self.llm_client.generate_content(contents=gemini_input_parts)
-            parsed_text_from_multimodal = llm_response # This will be Gemini's interpretation
+            llm_response = await self.llm_client.generate_content(contents=gemini_input_parts + [final_prompt_for_gemini], **llm_kwargs)
+            fallback_text = text_input or " ".join(processing_summary)
+            parsed_text_from_multimodal, route = self._parse_interpretation(llm_response, fallback_text) if route_options else (llm_response, None)
             llm_step.output = f"Gemini's interpretation: {parsed_text_from_multimodal[:200]}..."
-            logger.info(f"Multimodal input parsed to: {parsed_text_from_multimodal}")
+            if route:
+                llm_step.output += f"\nSuggested route: {route}"
+            logger.info(f"Multimodal input parsed to: {parsed_text_from_multimodal} (route: {route})")
+
+        result = {"parsed_text": parsed_text_from_multimodal, "multimodal_parts": gemini_input_parts}
+        if route:
+            result["route"] = route
+            result["interpreted_parts"] = [
+                part if isinstance(part, str) else "[Attached media: already interpreted in the request above.]"
+                for part in gemini_input_parts
+            ]
+        return result
 
-        return {"parsed_text": parsed_text_from_multimodal, "multimodal_parts": gemini_input_parts}
\ No newline at end of file
+    def _parse_interpretation(self, llm_response: Any, fallback_text: str = "") -> tuple:
+        """
+        Splits a fused-mode JSON response into (intent text, route). If the model did not return
+        valid JSON, the raw text is used as the intent and the route is left for normal routing.
+        Valid JSON without an intent yields `fallback_text` (the user's own words), never the JSON itself.
+        """
+        if not isinstance(llm_response, str):
+            return str(llm_response), None
+        try:
+            data = json.loads(llm_response.strip().strip("`").removeprefix("json").strip())
+            intent = str(data.get("intent") or "").strip()
+            route = str(data.get("route") or "").strip().lower() or None
+            if intent:
+                return intent, route
+            logger.warning("Fused multimodal response had no intent. Using the user's input and routing separately.")
+            return fallback_text, None
+        except (ValueError, AttributeError):
+            logger.warning("Fused multimodal response was not valid JSON. Falling back to separate routing.")
+        return llm_response, None
@@ -2,12 +2,54 @@
 from .base_agent import BaseAgent
 from llm_client import LLMClient
 from utils.logger import setup_logger
+from config import ORCHESTRATION_SETTINGS
+from utils.tracing import tracer
 from typing import Dict, Any, List, Union
 from PIL.Image import Image as PILImage # For type hinting PIL Image objects
-import chainlit as cl # For Chainlit integration
+from pydantic import BaseModel, Field, ValidationError
 
 logger = setup_logger(__name__)
 
+class TaskNode(BaseModel):
+    id: str = Field(..., description="Short unique identifier for this step (e.g., 'r1').")
+    agent: str = Field(..., description="Name of the agent that executes this step.")
+    task: str = Field(..., description="Instruction for the agent, phrased as a standalone request.")
+    depends_on: List[str] = Field(default_factory=list, description="IDs of steps whose outputs this step needs.")
+
+class TaskPlan(BaseModel):
+    steps: List[TaskNode] = Field(..., description="Steps of the plan. Steps without shared dependencies run in parallel.")
+
+    def topological_order(self) -> List[TaskNode]:
+        """Returns the steps ordered so every step comes after its dependencies. Raises ValueError on cycles."""
+        nodes = {node.id: node for node in self.steps}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(node_id: str):
+            if node_id in done:
+                return
+            if node_id in visiting:
+                raise ValueError(f"Cycle detected at step '{node_id}'.")
+            visiting.add(node_id)
+            for dep in nodes[node_id].depends_on:
+                visit(dep)
+            visiting.discard(node_id)
+            done.add(node_id)
+            ordered.append(nodes[node_id])
+
+        for node in self.steps:
+            visit(node.id)
+        return ordered
+
+PLANNING_INSTRUCTIONS = (
+    "You are the planning module of the AI system. Break the user's request into a small graph of steps, "
+    "each handled by one specialized agent. Use as few steps as possible; a single step is fine for simple requests. "
+    "Steps that do not need each other's output must NOT depend on each other so they can run in parallel. "
+    "A step that needs another step's result (e.g., emailing a research summary) lists it in `depends_on`. "
+    "Respond ONLY with a JSON object of the form "
+    '{"steps": [{"id": "s1", "agent": "research", "task": "...", "depends_on": []}, '
+    '{"id": "s2", "agent": "communicator", "task": "...", "depends_on": ["s1"]}]}.'
+)
+
 class OrchestratorAgent(BaseAgent):
     def __init__(self, llm_client: LLMClient, agents_map: Dict[str, BaseAgent], memory=None):
         super().__init__(
@@ -42,19 +84,86 @@ class OrchestratorAgent(BaseAgent):
             f"If uncertain, state 'clarify'."
         )
         
-        # Use multimodal input for routing if provided
-        response = await self.generate_response(routing_prompt, multimodal_content=multimodal_content)
-        
-        chosen_agent_name = response.strip().lower().split(' ')[0] # Simple parsing
-        
-        # Ensure the response is one of the valid agent names or "clarify"
-        if chosen_agent_name not in self.agents_map and chosen_agent_name != "clarify":
-            logger.warning(f"Orchestrator returned unrecognized agent name: '{chosen_agent_name}'. Defaulting to 'clarify'.")
-            chosen_agent_name = "clarify"
+        # Use multimodal input for routing if provided. A cheaper model answers first; if it names no
+        # known agent (including 'clarify', i.e. it is unsure), the stronger model is asked.
+        with tracer.span("route_task") as span:
+            response = await self.generate_response(
+                routing_prompt, multimodal_content=multimodal_content,
+                call_site="routing", validate=lambda r: self._parse_route(r) in self.agents_map
+            )
+            
+            chosen_agent_name = self._parse_route(response)
+            
+            # Ensure the response is one of the valid agent names or "clarify"
+            if chosen_agent_name not in self.agents_map and chosen_agent_name != "clarify":
+                logger.warning(f"Orchestrator returned unrecognized agent name: '{chosen_agent_name}'. Defaulting to 'clarify'.")
+                chosen_agent_name = "clarify"
+            span.set(route=chosen_agent_name)
 
         logger.info(f"Orchestrator routed task to: {chosen_agent_name}")
         return chosen_agent_name
 
+    def _parse_route(self, response: Any) -> str:
+        return str(response).strip().lower().split(' ')[0] # Simple parsing
+
+    async def plan_task(self, user_input: str, multimodal_content: List[Union[str, PILImage]] = None) -> TaskPlan:
+        """
+        Asks the LLM for a small task graph. Falls back to a single-step plan from `route_task`
+        if the model returns something that is not a valid, acyclic plan over known agents.
+        """
+        agent_names = ", ".join(name for name in self.agents_map if name != "multimodal_input")
+        planning_prompt = (
+            f"Available Agents: {agent_names}\n"
+            f"Maximum number of steps: {ORCHESTRATION_SETTINGS['max_plan_steps']}\n"
+            f"User Request: {user_input}"
+        )
+        history_parts = [
+            {"role": "system", "parts": [PLANNING_INSTRUCTIONS]},
+            {"role": "user", "parts": self._build_user_parts(planning_prompt, multimodal_content)}
+        ]
+        response = await self.llm_client.generate_content(
+            contents=history_parts, response_format="json", call_site="planning", validate=self._parse_plan
+        )
+
+        try:
+            plan = self._parse_plan(response)
+            logger.info(f"Orchestrator planned {len(plan.steps)} step(s): {[(n.id, n.agent, n.depends_on) for n in plan.steps]}")
+            return plan
+        except (ValueError, ValidationError) as e:
+            logger.warning(f"Orchestrator returned an invalid plan ({e}). Falling back to single-agent routing.")
+
+        chosen_agent_name = await self.route_task(user_input, multimodal_content)
+        if chosen_agent_name not in self.agents_map or chosen_agent_name == "multimodal_input":
+            chosen_agent_name = "clarify" # Media is interpreted before planning; that agent cannot run a plan step
+        return TaskPlan(steps=[TaskNode(id="s1", agent=chosen_agent_name, task=user_input)])
+
+    def _parse_plan(self, response: Any) -> TaskPlan:
+        """Validates the raw LLM output as a TaskPlan whose agents and dependencies all exist."""
+        if not isinstance(response, str):
+            raise ValueError("Expected a JSON text response.")
+        raw = response.strip()
+        if raw.startswith("```"): # Tolerate fenced JSON
+            raw = raw.strip("`")
+            raw = raw[raw.find("{"):]
+        plan = TaskPlan.model_validate_json(raw)
+
+        if not plan.steps:
+            raise ValueError("Plan has no steps.")
+        if len(plan.steps) > ORCHESTRATION_SETTINGS["max_plan_steps"]:
+            raise ValueError(f"Plan has {len(plan.steps)} steps, more than the allowed maximum.")
+        step_ids = [node.id for node in plan.steps]
+        if len(set(step_ids)) != len(step_ids):
+            raise ValueError("Plan contains duplicate step IDs.")
+        for node in plan.steps:
+            node.agent = node.agent.strip().lower()
+            if node.agent not in self.agents_map or node.agent == "multimodal_input":
+                raise ValueError(f"Unknown or non-plannable agent '{node.agent}' in step '{node.id}'.")
+            unknown_deps = set(node.depends_on) - set(step_ids)
+            if unknown_deps:
+                raise ValueError(f"Step '{node.id}' depends on unknown steps {sorted(unknown_deps)}.")
+        plan.topological_order() # Raises on cycles
+        return plan
+
     async def handle(self, user_input: str, multimodal_content: List[Union[str, PILImage]] = None) -> str:
         # The OrchestratorAgent primarily handles routing, not direct task execution.
         # Its `handle` method is mainly for internal consistency with BaseAgent.
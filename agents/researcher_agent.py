@@ -2,16 +2,18 @@
 # agentic_ai_framework/agents/researcher_agent.py
 from .base_agent import BaseAgent
 from llm_client import LLMClient
-from tools import WebSearchTool # Import the tool
 from memory.rag_module import RAGModule # For internal knowledge search
 from utils.logger import setup_logger
-from typing import List, Union
+from typing import List, Union, Awaitable
+import asyncio
 from PIL.Image import Image as PILImage # For type hinting PIL Image objects
-import chainlit as cl # For Chainlit integration
+from utils.events import current_sink
 
 logger = setup_logger(__name__)
 
 class ResearcherAgent(BaseAgent):
+    uses_retrieval = True
+
     def __init__(self, llm_client: LLMClient, memory_rag: RAGModule):
         super().__init__(
             name="ResearchAgent",
@@ -26,15 +28,20 @@ class ResearcherAgent(BaseAgent):
             ),
             llm_client=llm_client,
             memory=memory_rag,
-            tools=[WebSearchTool] # Assign web search tool
+            tools=["serper_search"] # Assign web search tool (loaded on first use)
         )
         self.rag_module = memory_rag
 
-    async def handle(self, user_input: str, multimodal_content: List[Union[str, PILImage]] = None) -> str:
+    async def handle(self, user_input: str, multimodal_content: List[Union[str, PILImage]] = None,
+                     prefetched_docs: Awaitable[List[str]] = None) -> str:
         logger.info(f"[ResearchAgent] Handling research task for: {user_input}")
 
-        async with cl.Step(name="RAG Query", type="retrieval", parent_id=cl.get_current_step().id) as rag_step:
-            relevant_docs = await self.rag_module.query_memory(user_input)
+        async with current_sink().step("RAG Query", type="retrieval") as rag_step:
+            # Reuse the Orchestrator's prefetched lookup when available; it usually finished during routing.
+            if prefetched_docs is not None:
+                relevant_docs = await prefetched_docs
+            else:
+                relevant_docs = await self.rag_module.query_memory(user_input)
             if relevant_docs:
                 internal_context = "Relevant internal knowledge:\n" + "\n".join([f"- {doc}" for doc in relevant_docs])
                 rag_step.output = f"Found {len(relevant_docs)} relevant internal documents."
@@ -46,13 +53,17 @@ class ResearcherAgent(BaseAgent):
                 rag_step.output = "No relevant internal documents found."
                 logger.info("[ResearchAgent] No relevant internal knowledge, proceeding with potential web search.")
         
-        async with cl.Step(name="LLM Research & Tool Use", type="llm", parent_id=cl.get_current_step().id) as llm_step:
+        async with current_sink().step("LLM Research & Tool Use", type="llm") as llm_step:
             # Let Gemini decide to use the web search tool based on the prompt_with_context
             result = await self.generate_response(prompt_with_context, multimodal_content=multimodal_content)
             llm_step.output = f"LLM generated response: {result[:200]}..."
 
         # After getting result, you might want to store new insights in memory
         if self.memory:
-            await self.memory.add_to_memory(user_input, result) # Store query and result for future RAG
+            # Store query and result for future RAG (queued; the answer does not wait). Chroma metadata must be a dict.
+            self.memory.add_in_background(
+                text=f"Research Query: {user_input}\nFindings: {result}",
+                metadata={"agent": self.name, "timestamp": asyncio.get_running_loop().time()}
+            )
 
         return result
\ No newline at end of file
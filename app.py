@@ -3,6 +3,14 @@
 import chainlit as cl
 import asyncio
 from orchestrator import Orchestrator
+from tools.reminder_service import reminder_scheduler
+from memory.session_state import session_store
+from utils.admission import request_scheduler, SchedulerBusy, BUSY_MESSAGE
+from utils.deadline import Deadline
+from utils.tracing import start_metrics_server
+from config import ORCHESTRATION_SETTINGS
+from utils.events import use_sink
+from utils.chainlit_sink import chainlit_sink
 from utils.logger import setup_logger
 from PIL import Image # Needed for Chainlit's cl.Image element content
 import base64
@@ -14,6 +22,9 @@ logger = setup_logger(__name__)
 orchestrator = Orchestrator()
 logger.info("Chainlit app started. Orchestrator initialized.")
 
+# Prometheus metrics, recent request traces and the tracing on/off switch on a local endpoint
+start_metrics_server()
+
 @cl.on_chat_start
 async def start():
     """
@@ -22,10 +33,55 @@ async def start():
     """
     # Store orchestrator in session if you need a separate instance per user (less common for a single system)
     # cl.user_session.set("orchestrator", Orchestrator())
+    # Per-session conversation state is small and bounded; the LLM and memory clients stay shared in the orchestrator.
+    cl.user_session.set("session_state", session_store.get(cl.user_session.get("id")))
     
     await cl.Message(content="[Agentic AI]: System Ready. How can I assist you today?").send()
     logger.info("New Chainlit chat session started and welcome message sent.")
 
+    # Reminders fire on the shared scheduler; this session's task posts the ones it owns into the chat
+    reminder_scheduler.start()
+    owner = chainlit_sink.session_owner()
+    reminder_queue = reminder_scheduler.register_session(owner)
+    cl.user_session.set("reminder_queue", reminder_queue)
+    cl.user_session.set("reminder_task", asyncio.create_task(deliver_reminders(reminder_queue)))
+
+async def deliver_reminders(reminder_queue: asyncio.Queue):
+    """Posts fired reminders into the chat session this task was started from."""
+    while True:
+        reminder = await reminder_queue.get()
+        try:
+            await cl.Message(content=f"[Reminder]: {reminder['text']}").send()
+            logger.info(f"Reminder {reminder['id']} delivered to Chainlit session.")
+        except Exception as e:
+            # Keep serving the queue: ending the task would leave later reminders unread
+            logger.error(f"Could not post reminder {reminder['id']} to the Chainlit session: {e}")
+
+@cl.on_chat_end
+async def end():
+    """
+    Stops reminder delivery for the closed session (later reminders are held until the owner reconnects)
+    and releases its conversation state.
+    """
+    reminder_task = cl.user_session.get("reminder_task")
+    if reminder_task:
+        reminder_task.cancel()
+    reminder_scheduler.unregister_session(chainlit_sink.session_owner(), cl.user_session.get("reminder_queue"))
+    session_store.drop(cl.user_session.get("id"))
+
+@cl.on_stop
+async def stop():
+    """
+    Runs when the user presses the stop button: cancels the session's requests and everything they started.
+    A message sent while another is still running waits for a slot, so both the running and any queued
+    request are stopped.
+    """
+    deadlines = cl.user_session.get("deadlines") or ()
+    for deadline in list(deadlines):
+        deadline.cancel("stopped by user")
+    if deadlines:
+        logger.info(f"{len(deadlines)} request(s) stopped by user.")
+
 @cl.on_message
 async def main(message: cl.Message):
     """
@@ -54,18 +110,36 @@ async def main(message: cl.Message):
                 await cl.Message(content=f"Received audio: **{element.name}**").send()
                 logger.info(f"Chainlit received audio: {element.name}")
             elif isinstance(element, cl.Video):
-                user_video_frame = element.content # Assuming this is a single frame or raw video bytes
+                user_video_frame = element.content # Raw video bytes; frames are sampled by MultimodalInputAgent
                 await cl.Message(content=f"Received video: **{element.name}**").send()
                 logger.info(f"Chainlit received video: {element.name}")
             # Add handling for other file types if needed
 
-    # Delegate the full request (text + multimodal) to the Orchestrator
-    final_ai_response = await current_orchestrator.handle_user_request(
-        user_text_input=user_text_input,
-        user_audio_data=user_audio_data,
-        user_image_data=user_image_data,
-        user_video_frame=user_video_frame
-    )
+    # Delegate the full request (text + multimodal) to the Orchestrator; its steps and messages go to the Chainlit UI.
+    # The scheduler admits it when a slot is free (taking turns with other sessions) or answers "busy" under overload.
+    # The request's time budget starts now, so queueing counts against it; the stop button cancels it.
+    session_id = cl.user_session.get("id")
+    deadline = Deadline(ORCHESTRATION_SETTINGS["request_timeout_seconds"])
+    deadlines = cl.user_session.get("deadlines")
+    if deadlines is None:
+        deadlines = set() # Every in-flight request of the session, not just the latest one
+        cl.user_session.set("deadlines", deadlines)
+    deadlines.add(deadline)
+    try:
+        async with request_scheduler.slot(session_id):
+            with use_sink(chainlit_sink):
+                final_ai_response = await current_orchestrator.handle_user_request(
+                    user_text_input=user_text_input,
+                    user_audio_data=user_audio_data,
+                    user_image_data=user_image_data,
+                    user_video_frame=user_video_frame,
+                    session=cl.user_session.get("session_state") or session_store.get(session_id),
+                    deadline=deadline
+                )
+    except SchedulerBusy:
+        final_ai_response = BUSY_MESSAGE
+    finally:
+        deadlines.discard(deadline)
     
     # Send the final response back to the user in the Chainlit UI
     await cl.Message(content=final_ai_response).send()
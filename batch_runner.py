@@ -0,0 +1,131 @@
+# batch_runner.py
+# agentic_ai_framework/batch_runner.py
+"""
+Headless batch execution: runs a JSONL file of requests through the Orchestrator without Chainlit.
+
+Each input line is a JSON object with "text" and optionally "id", "owner", "session", "timeout_seconds",
+"image_path", "audio_path" and "video_path". Requests sharing a "session" see each other's earlier turns,
+like a chat (send them in order with --concurrency 1 if the order matters). One JSON line per request is written as
+soon as it finishes (so output order follows completion, not input), holding the response, total seconds
+and the timing of every pipeline step.
+
+    python batch_runner.py requests.jsonl --output results.jsonl --concurrency 8
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, Optional, TextIO
+from orchestrator import Orchestrator
+from memory.session_state import session_store
+from utils.admission import request_scheduler
+from utils.deadline import Deadline
+from utils.events import RecordingEventSink, use_sink
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def _read_bytes(path: Optional[str]) -> Optional[bytes]:
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+async def run_request(orchestrator: Orchestrator, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Processes one request under its own recording sink and returns the result record."""
+    sink = RecordingEventSink(owner=request.get("owner") or f"batch:{request['id']}")
+    started = time.perf_counter()
+    result = {"id": request["id"]}
+    with use_sink(sink):
+        try:
+            image, audio, video = await asyncio.to_thread(
+                lambda: (_read_bytes(request.get("image_path")), _read_bytes(request.get("audio_path")), _read_bytes(request.get("video_path")))
+            )
+            result["response"] = await orchestrator.handle_user_request(
+                user_text_input=request.get("text") or "",
+                user_audio_data=audio,
+                user_image_data=image,
+                user_video_frame=video,
+                session=session_store.get(request["session"]) if request.get("session") else None,
+                deadline=Deadline(request["timeout_seconds"]) if request.get("timeout_seconds") else None
+            )
+        except Exception as e:
+            logger.error(f"Batch request {request['id']} failed: {e}", exc_info=True)
+            result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    result["steps"] = sink.timings()
+    result["messages"] = sink.messages
+    return result
+
+async def run_batch(input_file: TextIO, output_file: TextIO, concurrency: int) -> Dict[str, Any]:
+    """
+    Streams requests from `input_file` through `concurrency` workers. The bounded queue keeps memory
+    flat however large the input is. Returns a summary of the run.
+    """
+    orchestrator = Orchestrator()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    summary = {"requests": 0, "errors": 0, "invalid_lines": 0}
+    started = time.perf_counter()
+
+    async def worker():
+        while True:
+            request = await queue.get()
+            if request is None:
+                return
+            result = await run_request(orchestrator, request)
+            summary["requests"] += 1
+            summary["errors"] += "error" in result
+            output_file.write(json.dumps(result, default=str) + "\n")
+            output_file.flush()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for line_number, line in enumerate(input_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("not a JSON object")
+            except ValueError as e:
+                logger.warning(f"Skipping invalid request on line {line_number}: {e}")
+                summary["invalid_lines"] += 1
+                continue
+            request.setdefault("id", str(line_number))
+            await queue.put(request)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        await request_scheduler.drain() # Memory writes queued by the requests
+    finally:
+        for task in workers:
+            task.cancel()
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    summary["requests_per_second"] = round(summary["requests"] / elapsed, 3) if elapsed else 0.0
+    summary["scheduler"] = request_scheduler.metrics()
+    summary["llm_cascade"] = orchestrator.llm_client.cascade_report()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of requests through the Orchestrator without Chainlit.")
+    parser.add_argument("input", help="JSONL file of requests, or '-' for stdin.")
+    parser.add_argument("--output", "-o", default="-", help="Where to write result lines ('-' for stdout).")
+    parser.add_argument("--concurrency", "-c", type=int, default=4, help="Requests processed at the same time.")
+    args = parser.parse_args()
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, "r")
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        summary = asyncio.run(run_batch(input_file, output_file, max(1, args.concurrency)))
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    logger.info(f"Batch finished: {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# __init__.py
+# agentic_ai_framework/benchmarks/__init__.py
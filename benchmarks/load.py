@@ -0,0 +1,449 @@
+# load.py
+# agentic_ai_framework/benchmarks/load.py
+"""
+End-to-end load benchmark for Orchestrator.handle_user_request, fully offline.
+
+A fixed number of simulated users (--concurrency) send a mix of text, image and audio requests. The
+external backends are replaced in this process only, at the lowest level the framework talks to, so
+routing, the model cascade, tool rounds, memory prefetch/writes, speech-to-text and the image pipeline
+all run for real:
+  - Gemini: a fake GenerativeModel whose latency is a first-token delay (log-normal) plus a per-token time
+  - web search: SearchClient._fetch (the HTTP call); the client's cache and in-flight dedupe stay in play
+  - email: SMTPConnection.send, i.e. delivery by the outbound mailer's workers
+  - memory: the ChromaDB collection (query and add block in a worker thread, like the real one)
+  - speech-to-text: the recognizer engine (TextFixtureSTTEngine treats UTF-8 "audio" as its text); chunking and caching stay real
+
+Reported: throughput, latency p50/p95/p99 (overall and per request kind), time-to-first-token and peak RSS.
+The pipeline does not stream model output, so time-to-first-token is the time until the first message
+reaches the user (the routing notice). Results are written as JSON; pass an earlier file to --compare
+to see the change between commits.
+
+    python -m benchmarks.load --requests 200 --concurrency 16 --json load_results.json
+    python -m benchmarks.load --requests 200 --concurrency 16 --compare load_results.json
+    python -m benchmarks.load --latency-scale 0   # framework overhead only: backends answer at once
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median latency and log-normal spread per backend; `ms_per_token` is added per generated token.
+# The fast model answers "unsure" in `escalation_rate` of calls, so the cascade escalates that share.
+LATENCY_PROFILES: Dict[str, Dict[str, float]] = {
+    "gemini-1.5-flash": {"median_ms": 250, "sigma": 0.45, "ms_per_token": 4, "escalation_rate": 0.1},
+    "gemini-1.5-pro": {"median_ms": 700, "sigma": 0.5, "ms_per_token": 12, "escalation_rate": 0.0},
+    "search": {"median_ms": 350, "sigma": 0.6},
+    "smtp": {"median_ms": 120, "sigma": 0.5},
+    "memory_query": {"median_ms": 40, "sigma": 0.4},
+    "memory_add": {"median_ms": 60, "sigma": 0.4},
+}
+
+# (expected route, request text). Audio requests speak the text; image requests ask about the picture.
+PROMPTS: List[Tuple[str, str]] = [
+    ("research", "Research the latest developments in solid-state batteries and summarize them"),
+    ("research", "Find recent news about the James Webb telescope and give me the highlights"),
+    ("communicator", "Email team@example.com a short update on the release schedule"),
+    ("planner", "Plan my week so I can finish the quarterly report by Friday"),
+]
+IMAGE_PROMPT = "What is in this picture? Research where I could buy one"
+
+DEFAULT_MIX = "text=0.6,image=0.25,audio=0.15"
+FILLER = ("The available sources agree on the main points, differ on the timeline, and suggest checking "
+          "again in a few weeks as new results are published. ")
+
+class LatencyModel:
+    """Samples backend latencies from LATENCY_PROFILES, scaled by `scale` (0 makes every backend instant)."""
+    def __init__(self, seed: int, scale: float = 1.0):
+        self.rng = random.Random(seed)
+        self.scale = scale
+
+    def profile(self, name: str) -> Dict[str, float]:
+        return LATENCY_PROFILES.get(name) or LATENCY_PROFILES["gemini-1.5-pro"]
+
+    def seconds(self, name: str, tokens: int = 0) -> float:
+        if not self.scale:
+            return 0.0
+        profile = self.profile(name)
+        ms = self.rng.lognormvariate(math.log(profile["median_ms"]), profile["sigma"]) + tokens * profile.get("ms_per_token", 0)
+        return ms * self.scale / 1000
+
+    def chance(self, probability: float) -> bool:
+        return self.rng.random() < probability
+
+# --- Fake backends ---
+
+def _texts(value: Any) -> List[str]:
+    """All text in an LLM `contents` structure, in order."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        if "text" in value:
+            return _texts(value["text"])
+        return _texts(value.get("parts", []))
+    if isinstance(value, (list, tuple)):
+        return [text for item in value for text in _texts(item)]
+    return []
+
+def _route_for(user_text: str) -> str:
+    lowered = user_text.lower()
+    if "email" in lowered:
+        return "communicator"
+    if "plan " in lowered or "schedule" in lowered:
+        return "planner"
+    return "research"
+
+class FakeGeminiModel:
+    """
+    Stands in for google.generativeai.GenerativeModel. Answers like a cooperative model would for each
+    call site the framework uses (routing, fused multimodal interpretation, planning, agent turns with a
+    tool round), after a sampled delay.
+    """
+    def __init__(self, model_name: str, latency: LatencyModel):
+        self.model_name = model_name
+        self.latency = latency
+
+    async def generate_content_async(self, contents: List[Any], generation_config: Dict[str, Any] = None, tools: list = None):
+        texts = _texts(contents)
+        unsure = self.latency.chance(self.latency.profile(self.model_name).get("escalation_rate", 0.0))
+        function_calls = []
+        if any(isinstance(item, dict) and item.get("role") == "function" for item in contents):
+            text = "I'm not sure." if unsure else f"Here is what I found. {FILLER * 3}"
+        elif tools:
+            function_calls = self._tool_calls(texts[-1])
+            text = "" if function_calls else ("I'm not sure." if unsure else f"Here is the plan. {FILLER * 2}")
+        elif texts and "Respond ONLY with a JSON object: {\"intent\"" in texts[-1]:
+            user_text = " ".join(texts[:-1])
+            text = json.dumps({"intent": user_text, "route": "clarify" if unsure else _route_for(user_text)})
+        elif texts and "Respond ONLY with the name of the most suitable agent" in texts[-1]:
+            user_text = texts[-1].split("User Request:", 1)[-1]
+            text = "clarify" if unsure else _route_for(user_text)
+        elif any("planning module" in part for part in texts):
+            user_text = texts[-1].split("User Request:", 1)[-1].strip()
+            text = json.dumps({"steps": [{"id": "s1", "agent": _route_for(user_text), "task": user_text, "depends_on": []}]})
+        else:
+            text = f"The user asks: {' '.join(texts[:-1])[:300]}"
+
+        prompt_tokens = sum(len(part) for part in texts) // 4
+        completion_tokens = max(1, len(text) // 4)
+        await asyncio.sleep(self.latency.seconds(self.model_name, completion_tokens))
+        return SimpleNamespace(
+            candidates=[SimpleNamespace(function_calls=function_calls)],
+            text=text,
+            usage_metadata=SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=completion_tokens),
+        )
+
+    def _tool_calls(self, prompt: str) -> List[Any]:
+        route = _route_for(prompt)
+        if route == "research":
+            calls = [("serper_search", {"query": prompt[:120]})]
+        elif route == "communicator":
+            calls = [("send_email", {"to_address": "team@example.com", "subject": "Update", "body": f"Hello team,\n\n{FILLER}"})]
+        else:
+            return []
+        # Shaped like the tool calls BaseAgent consumes: `.function.name` and `.function.args`
+        return [SimpleNamespace(function=SimpleNamespace(name=name, args=args)) for name, args in calls]
+
+class FakeCollection:
+    """In-memory stand-in for the ChromaDB collection. Calls block like the real one; MemoryStore runs query and add in a thread."""
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.documents: List[str] = []
+
+    def count(self) -> int:
+        return len(self.documents)
+
+    def query(self, query_texts: List[str], n_results: int = 3) -> Dict[str, Any]:
+        time.sleep(self.latency.seconds("memory_query"))
+        return {"documents": [self.documents[-n_results:]]}
+
+    def add(self, documents: List[str], metadatas: List[Dict[str, Any]] = None, ids: List[str] = None):
+        time.sleep(self.latency.seconds("memory_add"))
+        self.documents.extend(documents)
+
+def install_fake_backends(orchestrator: Any, latency: LatencyModel):
+    """Points the orchestrator's LLM client, memory, search, email and speech-to-text at the fakes above (this process only)."""
+    from tools.web_tools import search_client
+    from tools.smtp_outbox import SMTPConnection, outbound_mailer
+    from tools.voice_tools import TextFixtureSTTEngine, speech_to_text
+
+    models: Dict[str, FakeGeminiModel] = {}
+    orchestrator.llm_client._gemini_for = lambda model_name: models.setdefault(model_name, FakeGeminiModel(model_name, latency))
+
+    orchestrator.memory_store._collection = FakeCollection(latency)
+    orchestrator.memory_store.available = True
+
+    async def fetch(query: str) -> List[Dict[str, str]]:
+        await asyncio.sleep(latency.seconds("search"))
+        return [{"title": f"Result {i} for {query[:40]}", "link": f"https://example.com/{abs(hash(query)) % 10000}/{i}", "snippet": FILLER}
+                for i in range(1, 6)]
+    search_client.api_key = "benchmark"
+    search_client._fetch = fetch
+
+    SMTPConnection.send = lambda self, message: time.sleep(latency.seconds("smtp"))
+    outbound_mailer.settings["host"] = "smtp.benchmark.invalid" # Not simulated: the workers "deliver" through the fake
+
+    speech_to_text.engine = TextFixtureSTTEngine() # Recognizes UTF-8 "audio" as its text; the chunking pipeline stays real
+
+# --- Workload ---
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """"text=0.6,image=0.25,audio=0.15" -> normalized weights."""
+    weights = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("text", "image", "audio"):
+            raise ValueError(f"Unknown request kind '{kind}' in mix (use text, image, audio).")
+        weights[kind] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Request mix weights must add up to more than zero.")
+    return {kind: weight / total for kind, weight in weights.items()}
+
+def make_image(rng: random.Random, size: Tuple[int, int]) -> bytes:
+    """A distinct noisy JPEG of `size`, so the image pipeline's dedupe cache does not hide its cost."""
+    from PIL import Image
+    width, height = size
+    img = Image.frombytes("RGB", (width // 8, height // 8), rng.randbytes(width // 8 * height // 8 * 3)).resize(size, Image.BILINEAR)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def build_request(index: int, kind: str, rng: random.Random, image_size: Tuple[int, int]) -> Dict[str, Any]:
+    _, text = PROMPTS[index % len(PROMPTS)]
+    text = f"{text} (request {index})" # Unique, so the search and transcript caches do not absorb repeats
+    if kind == "image":
+        return {"kind": kind, "text": f"{IMAGE_PROMPT} (request {index})", "image": make_image(rng, image_size)}
+    if kind == "audio":
+        # The benchmark's speech-to-text engine recognizes UTF-8 chunks as their text, so this "audio" says `text`
+        return {"kind": kind, "text": "", "audio": text.encode("utf-8")}
+    return {"kind": kind, "text": text}
+
+# --- Measurement ---
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, or None where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1) # Bytes on macOS, KiB on Linux
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def _looks_failed(response: str) -> bool:
+    return response.startswith(("Error", "An error occurred", "Sorry, this request took too long", "I'm not sure how to handle that"))
+
+async def run_load(requests: int, concurrency: int, mix: Dict[str, float], warmup: int, seed: int,
+                   latency_scale: float, image_size: Tuple[int, int]) -> Dict[str, Any]:
+    from orchestrator import Orchestrator
+    from memory.session_state import session_store
+    from utils.admission import request_scheduler
+    from utils.events import RecordingEventSink, use_sink
+    from utils.metrics import percentiles
+
+    class FirstOutputSink(RecordingEventSink):
+        """Records when the first message reached the user."""
+        first_message_at: Optional[float] = None
+
+        async def message(self, content: str):
+            if self.first_message_at is None:
+                self.first_message_at = time.perf_counter()
+            await super().message(content)
+
+    orchestrator = Orchestrator()
+    install_fake_backends(orchestrator, LatencyModel(seed, latency_scale))
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=warmup + requests)
+
+    async def user(user_id: int, queue: asyncio.Queue, records: List[Dict[str, Any]]):
+        session = session_store.get(f"bench-user-{user_id}")
+        while not queue.empty():
+            index, kind = queue.get_nowait()
+            request = await asyncio.to_thread(build_request, index, kind, random.Random(seed + index), image_size)
+            sink = FirstOutputSink(owner=f"bench-user-{user_id}")
+            record = {"index": index, "kind": kind}
+            started = time.perf_counter()
+            with use_sink(sink):
+                try:
+                    response = await orchestrator.handle_user_request(
+                        user_text_input=request["text"], user_audio_data=request.get("audio"), user_image_data=request.get("image"), session=session
+                    )
+                    record["failed"] = _looks_failed(response)
+                    if record["failed"]:
+                        record["error"] = response[:300] # Failures mostly come back as reply text, not exceptions
+                except Exception as e:
+                    record["failed"] = True
+                    record["error"] = str(e)
+            finished = time.perf_counter()
+            record["latency_ms"] = (finished - started) * 1000
+            record["ttft_ms"] = ((sink.first_message_at or finished) - started) * 1000
+            records.append(record)
+
+    async def run_phase(indices: range) -> List[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for index in indices:
+            queue.put_nowait((index, kinds[index]))
+        records: List[Dict[str, Any]] = []
+        await asyncio.gather(*(user(user_id, queue, records) for user_id in range(concurrency)))
+        return records
+
+    # Warm-up requests load agents, tools and SDK modules on first use; they are not part of the results.
+    await run_phase(range(warmup))
+    await request_scheduler.drain()
+    orchestrator.llm_client._cascade_stats.clear()
+    rss_before = peak_rss_mb()
+
+    started = time.perf_counter()
+    records = await run_phase(range(warmup, warmup + requests))
+    elapsed = time.perf_counter() - started
+    await request_scheduler.drain() # Background memory writes, outside the measured window
+
+    measured = sorted(records, key=lambda record: record["index"])
+    by_kind = {}
+    for kind in mix:
+        rows = [record for record in measured if record["kind"] == kind]
+        if rows:
+            by_kind[kind] = {
+                "requests": len(rows),
+                "latency_ms": percentiles([record["latency_ms"] for record in rows]),
+                "ttft_ms": percentiles([record["ttft_ms"] for record in rows]),
+            }
+    return {
+        "requests": len(measured),
+        "failed": sum(record["failed"] for record in measured),
+        "errors": [record["error"] for record in measured if "error" in record][:10],
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(measured) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": percentiles([record["latency_ms"] for record in measured]),
+        "ttft_ms": percentiles([record["ttft_ms"] for record in measured]),
+        "by_kind": by_kind,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_mb_before_run": rss_before,
+        "llm_cascade": orchestrator.llm_client.cascade_report(),
+    }
+
+# --- Reporting ---
+
+# (label, path into the results, whether higher is better)
+COMPARED_METRICS = [
+    ("throughput (req/s)", ("throughput_rps",), True),
+    ("latency p50 (ms)", ("latency_ms", "p50"), False),
+    ("latency p95 (ms)", ("latency_ms", "p95"), False),
+    ("latency p99 (ms)", ("latency_ms", "p99"), False),
+    ("first token p50 (ms)", ("ttft_ms", "p50"), False),
+    ("first token p95 (ms)", ("ttft_ms", "p95"), False),
+    ("peak RSS (MB)", ("peak_rss_mb",), False),
+]
+
+def _lookup(results: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(results, dict) or key not in results:
+            return None
+        results = results[key]
+    return results
+
+def print_results(results: Dict[str, Any]):
+    print(f"{results['requests']} requests in {results['seconds']:.2f}s: {results['throughput_rps']:.2f} req/s, {results['failed']} failed")
+    rows = [("all", results)] + list(results["by_kind"].items())
+    for name, row in rows:
+        latency, ttft = row["latency_ms"], row["ttft_ms"]
+        print(f"  {name:<6} latency p50 {latency['p50']:>9.1f}  p95 {latency['p95']:>9.1f}  p99 {latency['p99']:>9.1f} ms"
+              f"   first token p50 {ttft['p50']:>8.1f}  p95 {ttft['p95']:>8.1f} ms")
+    print(f"  peak RSS {results['peak_rss_mb']} MB (after warm-up {results['peak_rss_mb_before_run']} MB)")
+    for error in results["errors"]:
+        print(f"  error: {error}")
+
+def print_comparison(previous: Dict[str, Any], current: Dict[str, Any]):
+    """Prints each headline metric of an earlier run next to this one's, with the relative change."""
+    print(f"Compared with {previous.get('commit') or 'previous run'} ({previous.get('timestamp', '?')}):")
+    if previous.get("config") != current["config"]:
+        print("  note: the runs used different settings; the numbers are not directly comparable")
+    for label, path, higher_is_better in COMPARED_METRICS:
+        old, new = _lookup(previous.get("results", {}), path), _lookup(current["results"], path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = change > 0 if higher_is_better else change < 0
+        verdict = "" if abs(change) < 5 else (" better" if better else " WORSE")
+        print(f"  {label:<22} {old:>10.2f} -> {new:>10.2f}  ({change:+.1f}%){verdict}")
+
+def parse_size(spec: str) -> Tuple[int, int]:
+    width, _, height = spec.lower().partition("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test of Orchestrator.handle_user_request.")
+    parser.add_argument("--requests", "-n", type=int, default=100, help="Measured requests.")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Simulated users sending requests at the same time.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Share of each request kind (default {DEFAULT_MIX}).")
+    parser.add_argument("--warmup", type=int, default=None, help="Unmeasured requests run first (default: one per user).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the request mix, images and backend latencies.")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for every backend latency; 0 measures framework overhead only.")
+    parser.add_argument("--image-size", default="1024x768", help="Size of the uploaded test images.")
+    parser.add_argument("--log-level", default="WARNING", help="Application log level during the run (INFO includes logging cost).")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", dest="compare_path", help="JSON results of an earlier run to compare against.")
+    args = parser.parse_args()
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    logging.disable(max(logging.NOTSET, logging.getLevelName(args.log_level.upper()) - 10)) # Drops the records below the level
+    concurrency = max(1, args.concurrency)
+    config = {
+        "requests": args.requests,
+        "concurrency": concurrency,
+        "mix": parse_mix(args.mix),
+        "warmup": concurrency if args.warmup is None else args.warmup,
+        "seed": args.seed,
+        "latency_scale": args.latency_scale,
+        "image_size": args.image_size,
+        "log_level": args.log_level.upper(),
+    }
+    results = asyncio.run(run_load(
+        config["requests"], concurrency, config["mix"], config["warmup"], args.seed, args.latency_scale, parse_size(args.image_size)
+    ))
+    report = {
+        "benchmark": "load",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    print_results(results)
+    if results["failed"]:
+        # Latencies of failed requests measure an error path, not the pipeline; do not let them pass as results
+        print(f"FAILED: {results['failed']} of {results['requests']} requests did not complete.", file=sys.stderr)
+
+    if args.compare_path:
+        with open(args.compare_path) as f:
+            print_comparison(json.load(f), report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json_path}")
+    if results["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
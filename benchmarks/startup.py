@@ -0,0 +1,81 @@
+# startup.py
+# agentic_ai_framework/benchmarks/startup.py
+"""
+Startup-cost benchmark. Each stage runs in a fresh interpreter so imports are measured cold;
+stages are repeated and the median is reported together with the number of modules the stage imported.
+
+    python -m benchmarks.startup --repeat 5 --json startup_results.json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (stage name, setup code run before timing, timed code)
+STAGES = [
+    ("import tools", "", "import tools"),
+    ("import agents", "", "import agents"),
+    ("import orchestrator", "", "import orchestrator"),
+    ("Orchestrator()", "import orchestrator", "orchestrator.Orchestrator()"),
+    ("import app", "", "import app"),
+    ("first agent build", "import orchestrator; o = orchestrator.Orchestrator()", "o.agents_map['research']"),
+    ("first tool schemas", "import orchestrator; o = orchestrator.Orchestrator(); a = o.agents_map['research']",
+     "[tool.schema for tool in a.get_tools()]"),
+    ("all tools loaded", "import tools", "[tools.get_tool(name).schema for name in tools.TOOL_REGISTRY]"),
+]
+
+CHILD_TEMPLATE = """
+import sys, time, json
+{setup}
+modules_before = len(sys.modules)
+started = time.perf_counter()
+{timed}
+elapsed = time.perf_counter() - started
+print("BENCH" + json.dumps({{"seconds": elapsed, "modules": len(sys.modules) - modules_before}}))
+"""
+
+def run_stage(setup: str, timed: str) -> dict:
+    """Runs one stage in a new interpreter and returns {"seconds", "modules"} or {"error"}."""
+    code = CHILD_TEMPLATE.format(setup=setup, timed=timed)
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("BENCH"):
+            return json.loads(line[len("BENCH"):])
+    error_lines = result.stderr.strip().splitlines()
+    return {"error": error_lines[-1] if error_lines else f"exit code {result.returncode}"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import and initialization cost.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh-interpreter runs per stage.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = []
+    for name, setup, timed in STAGES:
+        runs = [run_stage(setup, timed) for _ in range(args.repeat)]
+        errors = [run["error"] for run in runs if "error" in run]
+        if errors:
+            results.append({"stage": name, "error": errors[0]})
+            print(f"{name:<22} failed: {errors[0]}")
+            continue
+        seconds = [run["seconds"] for run in runs]
+        stage = {
+            "stage": name,
+            "median_ms": round(statistics.median(seconds) * 1000, 2),
+            "min_ms": round(min(seconds) * 1000, 2),
+            "modules_imported": runs[-1]["modules"],
+        }
+        results.append(stage)
+        print(f"{name:<22} median {stage['median_ms']:>9.2f} ms  min {stage['min_ms']:>9.2f} ms  modules {stage['modules_imported']:>5}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "stages": results}, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -21,16 +21,208 @@ TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 # Using the official Google Generative AI API:
 GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta/" # For direct google-generativeai client
 OPENAI_API_BASE = "https://api.openai.com/v1"
+SERPER_DEFAULT_URL = "https://google.serper.dev/search"
+SERPER_API_URL = os.getenv("SERPER_API_URL", SERPER_DEFAULT_URL) # Point at a local stub server for tests/benchmarks
 
 # --- Model Settings ---
 MODEL_SETTINGS = {
     "default_model": "gemini-1.5-pro", # Default to Gemini for core tasks
     "gemini_model": "gemini-1.5-pro",
     "openai_model": "gpt-4o-mini", # Example if you want a cheaper, faster OpenAI model for specific tasks
+    "fast_model": "gemini-1.5-flash", # Cheaper, faster Gemini model tried first by the cascade
     "temperature": 0.7, # Default temperature for LLM calls
     "max_tokens": 4096, # Max tokens for LLM responses
 }
 
+# --- Model Cascade Settings ---
+CASCADE_SETTINGS = {
+    "enabled": True,
+    # Models tried in order per call site; the next one is only called when an answer is rejected.
+    # Names starting with "gpt-" go to OpenAI (text only), all others to Gemini.
+    "call_sites": {
+        "routing": [MODEL_SETTINGS["fast_model"], MODEL_SETTINGS["gemini_model"]],
+        "planning": [MODEL_SETTINGS["fast_model"], MODEL_SETTINGS["gemini_model"]],
+        "multimodal": [MODEL_SETTINGS["fast_model"], MODEL_SETTINGS["gemini_model"]],
+        "agent": [MODEL_SETTINGS["fast_model"], MODEL_SETTINGS["gemini_model"]],
+    },
+    "low_confidence_markers": ["i'm not sure", "i am not sure", "i don't know", "i do not know", "i'm unable to", "i cannot determine"],
+    "min_json_confidence": 0.6, # JSON answers with a "confidence" field below this are escalated
+    "metrics_window": 10000, # Recent latency samples kept per call site and model
+}
+
+# --- Orchestration Settings ---
+ORCHESTRATION_SETTINGS = {
+    "planning_mode": False, # If True, routing returns a small task graph instead of a single agent name
+    "max_parallel_agents": 3, # Max graph nodes executing concurrently
+    "max_plan_steps": 5, # Plans longer than this are rejected and fall back to single-agent routing
+    "fused_multimodal_routing": True, # Interpret media and choose the route in one structured LLM call
+    "request_timeout_seconds": 120.0, # End-to-end budget per request (queueing included when set by the app)
+    "min_tool_round_seconds": 10.0, # With less budget left, agents answer from the tool results they have instead of calling tools again
+    "cancel_grace_seconds": 1.0, # Time a stopped request gets to unwind (close steps, cancel subtasks)
+}
+
+# --- Admission Control Settings ---
+SCHEDULER_SETTINGS = {
+    "max_concurrent": 16, # Requests and background jobs running at once across all sessions
+    "max_per_session": 1, # Concurrent requests per session; a session's later messages queue behind its current one
+    "background_share": 0.25, # Share of slots background jobs (memory writes, ingestion) may hold at once (at least one)
+    "max_queue_wait_seconds": 20.0, # Interactive requests expected or found to wait longer get a "busy" reply
+    "max_queued_interactive": 500, # Interactive requests beyond this many waiting are shed immediately
+    "max_queued_background": 1000, # Background jobs beyond this many waiting are dropped
+    "background_max_wait_seconds": 300.0, # Background jobs not started within this are dropped
+    "metrics_window": 10000, # Recent queue-wait samples kept per priority class for percentiles
+    "report_interval_seconds": 300, # How often the scheduler logs its metrics while busy
+}
+
+# --- Session State Settings ---
+SESSION_SETTINGS = {
+    "max_turns": 8, # Recent user/assistant turns kept per session (ring buffer)
+    "max_turn_chars": 2000, # Each stored message is truncated to this many characters
+    "max_sessions": 5000, # Least recently used sessions beyond this are evicted
+    "max_total_chars": 32 * 1024 * 1024, # Budget for all session state together (roughly bytes for ASCII text)
+    "context_ttl_seconds": 600, # Retrieved memory context is reused for follow-ups within this window
+    "follow_up_max_words": 6, # Requests this short are follow-ups if they refer back ("that", "the second one", ...)
+    "follow_up_min_overlap": 0.5, # ...as are requests sharing this share of content words with the query that fetched the context
+}
+
+# --- Email Settings ---
+MAILBOX_SETTINGS = {
+    "path": os.getenv("MAILBOX_PATH", "memory/mailbox"), # Local Maildir directory or mbox file backing read_email
+    "refresh_seconds": 30, # Minimum time between incremental index refreshes
+    "max_body_chars": 20000, # Body text indexed per message
+}
+
+SMTP_SETTINGS = {
+    "host": os.getenv("SMTP_HOST"), # Unset = deliveries are simulated (actual sending disabled for safety)
+    "port": int(os.getenv("SMTP_PORT", "587")),
+    "username": os.getenv("SMTP_USERNAME"),
+    "password": os.getenv("SMTP_PASSWORD"),
+    "use_tls": os.getenv("SMTP_USE_TLS", "true").lower() == "true", # STARTTLS after connecting
+    "sender": os.getenv("SMTP_SENDER", "agent@localhost"),
+    "pool_size": 2, # Persistent SMTP connections (one per sender worker)
+    "queue_size": 1000, # Outbound queue capacity; send_email fails fast when full
+    "batch_size": 20, # Messages sent back-to-back on one connection per batch
+    "batch_wait_seconds": 0.05, # How long a worker waits to fill a batch
+    "max_retries": 3, # Attempts for transient failures
+    "retry_backoff_seconds": 2.0, # Base delay, doubled on each retry
+    "idle_reconnect_seconds": 60, # Connections idle longer than this are re-opened before use
+    "timeout_seconds": 30,
+    "status_history": 10000, # Delivery statuses kept for check_email_status
+}
+
+# --- Web Search Settings ---
+SEARCH_SETTINGS = {
+    "timeout_seconds": 10.0, # Per-request timeout
+    "max_connections": 20, # Connection pool size
+    "max_keepalive_connections": 10, # Idle connections kept open for reuse
+    "cache_ttl_seconds": 300, # How long a query's results are reused
+    "cache_size": 512, # Max cached queries
+    "max_queries_per_call": 5, # Fan-out limit for one tool call
+    "results_per_query": 5, # Organic results kept per query
+}
+
+# --- File Tool Settings ---
+FILE_SETTINGS = {
+    "read_max_bytes": 64 * 1024, # Default cap per read; larger selections return a head/tail summary
+    "mmap_threshold_bytes": 1024 * 1024, # Files at least this large are memory-mapped instead of read whole
+    "binary_sniff_bytes": 8192, # Bytes inspected for NUL characters to detect binary files
+    "read_cache_size": 64, # Cached read results keyed by path+mtime+size+range
+    "search_page_size": 50, # Default number of matches returned per search_files page
+    "index_dir": "memory/file_index", # Persistent path index used by search_files(use_index=True); one file per indexed root
+    "index_refresh_seconds": 60, # Minimum time between incremental index refreshes of the same root
+    "index_max_dirs": 50000, # Safety cap on directories tracked per indexed root
+}
+
+# --- Shell Tool Settings ---
+SHELL_SETTINGS = {
+    "timeout_seconds": 60, # Commands running longer are killed together with their child processes
+    "min_timeout_seconds": 1, # Smaller (or negative) requested timeouts are raised to this
+    "max_output_bytes": 64 * 1024, # Per stream; beyond this only the head and tail are kept (the live view shows the head)
+    "stream_interval_seconds": 0.25, # Live output is sent to the UI at most this often
+    "max_concurrent_commands": 4, # Commands allowed to run at the same time across all sessions
+}
+
+# --- Image Pipeline Settings ---
+IMAGE_SETTINGS = {
+    "max_side": 1568, # Longest side in pixels after downscaling (larger images gain little for the model)
+    "format": "JPEG", # Re-encode format: "JPEG" or "WEBP"
+    "quality": 80, # Encoder quality target (1-95)
+    "process_pool_workers": 2, # Worker processes used for decode/resize/encode
+    "cache_size": 256, # Number of processed images kept for dedupe (exact byte matches only)
+}
+
+# --- Video Sampling Settings ---
+VIDEO_SETTINGS = {
+    "sample_fps": 1.0, # Frames per second of video time to sample
+    "max_frames": 8, # Cap on frames sent to the model per request
+    "dedupe_hash_distance": 6, # Sampled frames this close (Hamming distance) to a kept frame are dropped
+    "mjpeg_fps": 25.0, # Assumed frame rate for concatenated-JPEG (MJPEG-style) streams, which carry no timing
+}
+
+# --- Screen Capture Settings ---
+SCREEN_CAPTURE_SETTINGS = {
+    "tile_size": 64, # Edge length in pixels of the tiles compared between frames
+    "max_regions": 8, # More changed regions than this are merged into their bounding box
+    "full_frame_change_ratio": 0.5, # If this share of tiles changed, send the whole frame instead of regions
+    "max_tracked_frames": 256, # Previous frames (per session, monitor and region) kept for incremental captures
+}
+
+# --- Voice Settings ---
+VOICE_SETTINGS = {
+    "stt_chunk_bytes": 32000, # Audio fed to the recognizer per step (~1s of 16kHz 16-bit mono)
+    "stt_cache_size": 512, # Transcripts cached by audio hash
+    "tts_voice": "default", # Voice used when the caller does not pick one
+    "tts_sample_rate": 16000, # 16-bit mono PCM sample rate produced by the TTS engine
+    "tts_max_concurrency": 4, # Sentences synthesized in parallel per request
+    "tts_cache_bytes": 64 * 1024 * 1024, # PCM budget for synthesized sentences cached by text+voice hash
+    "tts_output_dir": "audio_output", # Directory for per-request audio files
+}
+
+# --- Calendar Settings ---
+CALENDAR_SETTINGS = {
+    "path": os.getenv("CALENDAR_PATH", "memory/calendar.jsonl"), # Append-only event journal used by the planning tools (older JSON array files are converted on load)
+    "compact_ratio": 2.0, # Rewrite the journal once it holds this many records per event
+    "working_hours": (9, 17), # Free-slot search only suggests times inside [start hour, end hour)
+    "slot_step_minutes": 15, # Suggested start times are aligned to this grid
+    "search_days": 7, # Default look-ahead window for free-slot searches
+    "max_suggestions": 3, # Free slots returned per search (also offered when a new event conflicts)
+}
+
+# --- Reminder Settings ---
+REMINDER_SETTINGS = {
+    "journal_path": os.getenv("REMINDER_JOURNAL_PATH", "memory/reminders.jsonl"), # Append-only log replayed on startup
+    "compact_ratio": 2.0, # Rewrite the journal once it holds this many records per pending reminder
+    "max_undelivered_per_owner": 50, # Fired reminders kept for owners with no open session, delivered when they reconnect
+    "metrics_window": 10000, # Recent samples kept for scheduling-overhead and lateness percentiles
+    "report_interval_seconds": 300, # How often the scheduler logs its metrics while reminders are firing
+}
+
+# --- Tracing & Metrics Settings ---
+TRACING_SETTINGS = {
+    "enabled": os.getenv("TRACING_ENABLED", "false").lower() == "true", # Can also be toggled at runtime via /tracing?enabled=1
+    "metrics_host": "127.0.0.1", # The endpoint is unauthenticated; keep it on localhost
+    "metrics_port": int(os.getenv("METRICS_PORT", "9464")), # Serves /metrics, /traces and /tracing; 0 disables it
+    "traces_path": os.getenv("TRACES_PATH"), # JSONL file receiving every finished request trace; unset = memory only
+    "recent_traces": 100, # Finished request traces kept for /traces
+    "latency_buckets_seconds": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0],
+    "payload_buckets_bytes": [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304],
+}
+
+# --- Profiling Settings ---
+# All off by default; change at runtime with GET /profiling?<setting>=<value> on the metrics endpoint.
+PROFILING_SETTINGS = {
+    "output_dir": os.getenv("PROFILE_DIR", "profiles"), # .prof captures, tracemalloc diffs/snapshots and loop_lag.jsonl
+    "cprofile_sample_rate": float(os.getenv("PROFILE_SAMPLE_RATE", "0")), # Share of requests captured with cProfile
+    "tracemalloc": os.getenv("PROFILE_TRACEMALLOC", "false").lower() == "true", # Track allocations and diff snapshots between requests
+    "tracemalloc_frames": 10, # Traceback depth recorded per allocation
+    "tracemalloc_every_n_requests": 1, # Snapshot/diff frequency
+    "tracemalloc_top": 25, # Largest changes written per diff
+    "tracemalloc_keep_reports": 50, # Newest diff reports kept on disk; only the latest raw snapshot is kept
+    "loop_lag_threshold_ms": int(os.getenv("PROFILE_LOOP_LAG_MS", "0")), # Report callbacks blocking the event loop longer than this; 0 = off
+    "loop_lag_interval_ms": 20, # Heartbeat period of the lag monitor
+    "metrics_window": 10000, # Recent loop-lag samples kept for percentiles
+}
+
 # --- Memory Settings ---
 MEMORY_DB_PATH = "memory/chroma_db" # Path for ChromaDB persistence
 
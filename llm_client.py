@@ -1,11 +1,15 @@
 # agentic_ai_framework/llm_client.py
-import google.generativeai as genai
-from openai import OpenAI as OpenAIClient # Alias to avoid conflict with `openai-agents` module if used
-from config import GEMINI_API_KEY, OPENAI_API_KEY, MODEL_SETTINGS, GEMINI_API_BASE, OPENAI_API_BASE
+from config import GEMINI_API_KEY, OPENAI_API_KEY, MODEL_SETTINGS, CASCADE_SETTINGS, GEMINI_API_BASE, OPENAI_API_BASE
 from utils.logger import setup_logger
-from typing import List, Dict, Any, Union
+from utils.deadline import Deadline, RequestCancelled, current_deadline
+from utils.metrics import percentiles
+from utils.tracing import tracer, payload_size
+from typing import List, Dict, Any, Callable, Optional, Union
+from collections import deque
 from PIL.Image import Image as PILImage # For type hinting PIL Image objects
 import asyncio
+import json
+import time
 
 logger = setup_logger(__name__)
 
@@ -15,30 +19,72 @@ class LLMClient:
         self.openai_model_name = model_name or MODEL_SETTINGS["openai_model"]
         self.temperature = MODEL_SETTINGS["temperature"]
         self.max_tokens = MODEL_SETTINGS["max_tokens"]
+        # SDK clients are created on first use: importing google.generativeai and openai dominates cold start.
+        self._gemini_clients: Dict[str, Any] = {} # Model name -> GenerativeModel
+        self._openai_client = None
+        self._cascade_stats: Dict[str, Dict[str, Any]] = {} # Call site -> counters and per-model latencies
 
-        if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-            self.gemini_client = genai.GenerativeModel(self.gemini_model_name)
-            logger.info(f"Initialized Gemini client with model: {self.gemini_model_name}")
-        else:
-            self.gemini_client = None
+        if not GEMINI_API_KEY:
             logger.warning("GEMINI_API_KEY not found. Gemini client not initialized.")
+        if not OPENAI_API_KEY:
+            logger.warning("OPENAI_API_KEY not found. OpenAI client not initialized.")
+
+    @property
+    def gemini_client(self):
+        return self._gemini_for(self.gemini_model_name)
+
+    def _gemini_for(self, model_name: str):
+        """The Gemini client for `model_name`, created on first use. None without an API key."""
+        if model_name not in self._gemini_clients and GEMINI_API_KEY:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            self._gemini_clients[model_name] = genai.GenerativeModel(model_name)
+            logger.info(f"Initialized Gemini client with model: {model_name}")
+        return self._gemini_clients.get(model_name)
 
-        if OPENAI_API_KEY:
-            self.openai_client = OpenAIClient(api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE)
+    @property
+    def openai_client(self):
+        if self._openai_client is None and OPENAI_API_KEY:
+            from openai import AsyncOpenAI as OpenAIClient # Async client, since calls are awaited; aliased to avoid conflict with `openai-agents`
+            self._openai_client = OpenAIClient(api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE)
             logger.info(f"Initialized OpenAI client with model: {self.openai_model_name}")
-        else:
-            self.openai_client = None
-            logger.warning("OPENAI_API_KEY not found. OpenAI client not initialized.")
+        return self._openai_client
 
-    async def generate_content(self, contents: List[Union[str, PILImage, Dict]], tools: list = None, use_gemini: bool = True, **kwargs) -> Union[str, Dict]:
+    async def generate_content(self, contents: List[Union[str, PILImage, Dict]], tools: list = None, use_gemini: bool = True,
+                               deadline: Deadline = None, call_site: str = None, validate: Callable[[Any], bool] = None,
+                               **kwargs) -> Union[str, Dict]:
         """
         Generates content (text or tool calls) using the specified LLM.
         `contents` can be a list of strings, PIL.Image.Image objects, or dicts for roles.
         Returns a string response or a dict with 'tool_calls' if the LLM wants to call tools.
+        Pass `response_format="json"` to request a JSON object instead of free text, and `model` to pick a model.
+        The call is not started once the request's `deadline` (by default the current one) has passed,
+        and is abandoned with DeadlineExceeded when the remaining budget runs out.
+        With a `call_site` that has a cascade configured (and no explicit `model`), the models are tried
+        cheapest first; `validate` lets the caller reject an answer so the next model is asked.
         """
+        deadline = deadline or current_deadline()
+        if deadline:
+            deadline.check()
+        if call_site and "model" not in kwargs and CASCADE_SETTINGS["enabled"]:
+            models = CASCADE_SETTINGS["call_sites"].get(call_site) or []
+            if len(models) > 1:
+                with tracer.span("llm.cascade", label=call_site):
+                    return await self._generate_cascade(call_site, models, contents, tools, deadline, validate, **kwargs)
+        model_name = kwargs.get("model") or (self.gemini_model_name if use_gemini else self.openai_model_name)
+        with tracer.span("llm.generate", label=model_name, call_site=call_site, tools=len(tools or [])) as span:
+            if tracer.enabled:
+                span.set(bytes_in=payload_size(contents))
+            response = await self._generate(contents, tools, use_gemini, deadline, **kwargs)
+            span.set(bytes_out=len(response) if isinstance(response, str) else 0,
+                     tool_calls=len(response["tool_calls"]) if isinstance(response, dict) else 0)
+            return response
+
+    async def _generate(self, contents: List[Any], tools: Optional[list], use_gemini: bool, deadline: Optional[Deadline], **kwargs) -> Union[str, Dict]:
+        """One call to one model; see generate_content."""
         if use_gemini:
-            if not self.gemini_client:
+            gemini_client = self._gemini_for(kwargs["model"]) if kwargs.get("model") else self.gemini_client
+            if not gemini_client:
                 logger.error("Gemini client not available.")
                 return "Error: Gemini client not configured."
             
@@ -53,19 +99,29 @@ class LLMClient:
 
             gemini_tools = [tool.to_gemini_format() for tool in tools if hasattr(tool, 'to_gemini_format')] if tools else None
 
+            generation_config = {
+                "temperature": kwargs.get("temperature", self.temperature),
+                "max_output_tokens": kwargs.get("max_tokens", self.max_tokens),
+            }
+            if kwargs.get("response_format") == "json":
+                generation_config["response_mime_type"] = "application/json" # Structured output mode
+
             try:
-                response = await self.gemini_client.generate_content_async(
+                request = gemini_client.generate_content_async(
                     contents=gemini_parts,
-                    generation_config={
-                        "temperature": kwargs.get("temperature", self.temperature),
-                        "max_output_tokens": kwargs.get("max_tokens", self.max_tokens),
-                    },
+                    generation_config=generation_config,
                     tools=gemini_tools if gemini_tools else None
                 )
+                response = await (deadline.wait_for(request) if deadline else request)
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    tracer.current().set(prompt_tokens=getattr(usage, "prompt_token_count", 0), completion_tokens=getattr(usage, "candidates_token_count", 0))
                 if response.candidates and response.candidates[0].function_calls:
                     tool_calls = response.candidates[0].function_calls
                     return {"tool_calls": tool_calls}
                 return response.text
+            except RequestCancelled:
+                raise
             except Exception as e:
                 logger.error(f"Error calling Gemini API: {e}")
                 return f"Error: {e}"
@@ -83,25 +139,106 @@ class LLMClient:
                     # Need to convert to OpenAI chat completion message format
                     content_str = "\n".join([part['text'] if isinstance(part, dict) and 'text' in part else str(part) for part in item['parts']])
                     messages.append({"role": item['role'], "content": content_str})
-                elif isinstance(item, PILImage):
+                elif isinstance(item, PILImage) or (isinstance(item, dict) and "mime_type" in item):
                     logger.warning("OpenAI client does not directly support PIL.Image.Image for input without conversion.")
                     messages.append({"role": "user", "content": "An image was provided but could not be processed by OpenAI client directly."})
 
 
             openai_tools = [tool.to_openai_format() for tool in tools if hasattr(tool, 'to_openai_format')] if tools else None
 
+            extra_args = {}
+            if kwargs.get("response_format") == "json":
+                extra_args["response_format"] = {"type": "json_object"} # Structured output mode
+
             try:
-                response = await self.openai_client.chat.completions.create(
+                request = self.openai_client.chat.completions.create(
                     model=kwargs.get("model", self.openai_model_name),
                     messages=messages,
                     temperature=kwargs.get("temperature", self.temperature),
                     max_tokens=kwargs.get("max_tokens", self.max_tokens),
-                    tools=openai_tools if openai_tools else None
+                    tools=openai_tools if openai_tools else None,
+                    **extra_args
                 )
+                response = await (deadline.wait_for(request) if deadline else request)
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    tracer.current().set(prompt_tokens=getattr(usage, "prompt_tokens", 0), completion_tokens=getattr(usage, "completion_tokens", 0))
                 if response.choices[0].message.tool_calls:
                     tool_calls = response.choices[0].message.tool_calls
                     return {"tool_calls": tool_calls}
                 return response.choices[0].message.content
+            except RequestCancelled:
+                raise
             except Exception as e:
                 logger.error(f"Error calling OpenAI API: {e}")
-                return f"Error: {e}"
\ No newline at end of file
+                return f"Error: {e}"
+
+    # --- Model cascade ---
+
+    async def _generate_cascade(self, call_site: str, models: List[str], contents: List[Any], tools: Optional[list],
+                                deadline: Optional[Deadline], validate: Optional[Callable[[Any], bool]], **kwargs) -> Union[str, Dict]:
+        """
+        Asks each model in turn until one gives an acceptable answer; the last model's answer is always used.
+        Escalation reasons and per-model latency are recorded for `cascade_report()`.
+        """
+        stats = self._cascade_stats.setdefault(call_site, {"calls": 0, "escalations": {}, "answered_by": {}, "latency_ms": {}})
+        stats["calls"] += 1
+        for index, model in enumerate(models):
+            started = time.perf_counter()
+            response = await self.generate_content(
+                contents, tools=tools, use_gemini=not model.startswith("gpt-"), deadline=deadline, call_site=call_site, model=model, **kwargs
+            )
+            latency = stats["latency_ms"].setdefault(model, deque(maxlen=CASCADE_SETTINGS["metrics_window"]))
+            latency.append((time.perf_counter() - started) * 1000)
+            reason = self._rejection_reason(response, tools, validate) if index < len(models) - 1 else None
+            if reason is None:
+                stats["answered_by"][model] = stats["answered_by"].get(model, 0) + 1
+                return response
+            stats["escalations"][reason] = stats["escalations"].get(reason, 0) + 1
+            tracer.current().set(escalated_from=model, escalation_reason=reason)
+            logger.info(f"Cascade '{call_site}': escalating from {model} to {models[index + 1]} ({reason}).")
+
+    def _rejection_reason(self, response: Any, tools: Optional[list], validate: Optional[Callable[[Any], bool]]) -> Optional[str]:
+        """Why a cheaper model's answer should not be used, or None to accept it."""
+        if isinstance(response, dict) and "tool_calls" in response:
+            tool_names = {tool.name for tool in tools or []}
+            for tool_call in response["tool_calls"]:
+                function = getattr(tool_call, "function", None)
+                if function is None or getattr(function, "name", None) not in tool_names or not hasattr(getattr(function, "args", None), "copy"):
+                    return "tool_call_parse"
+            return None
+        if not isinstance(response, str) or response.startswith("Error:"):
+            return "error"
+        text = response.strip()
+        if not text:
+            return "empty"
+        lowered = text.lower()
+        if any(marker in lowered for marker in CASCADE_SETTINGS["low_confidence_markers"]):
+            return "low_confidence"
+        if text.startswith("{"):
+            try:
+                confidence = json.loads(text).get("confidence")
+                if isinstance(confidence, (int, float)) and confidence < CASCADE_SETTINGS["min_json_confidence"]:
+                    return "low_confidence"
+            except (ValueError, AttributeError):
+                pass # Malformed JSON is for `validate` to judge
+        if validate is not None:
+            try:
+                if not validate(response):
+                    return "validation"
+            except Exception:
+                return "validation"
+        return None
+
+    def cascade_report(self) -> Dict[str, Any]:
+        """Per call site: calls, escalation rate and reasons, which model answered, and latency percentiles per model."""
+        return {
+            call_site: {
+                "calls": stats["calls"],
+                "escalation_rate": round(sum(stats["escalations"].values()) / stats["calls"], 4) if stats["calls"] else 0.0,
+                "escalations": dict(stats["escalations"]),
+                "answered_by": dict(stats["answered_by"]),
+                "latency_ms": {model: percentiles(list(samples)) for model, samples in stats["latency_ms"].items()},
+            }
+            for call_site, stats in self._cascade_stats.items()
+        }
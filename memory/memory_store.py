@@ -1,22 +1,40 @@
 # memory_store.py
 # agentic_ai_framework/memory/memory_store.py
-from chromadb import Client, Settings
-from chromadb.utils import embedding_functions
 from config import MEMORY_DB_PATH, GEMINI_API_KEY
 from utils.logger import setup_logger
+from utils.tracing import tracer
 from typing import List, Dict, Any
 import os
+import uuid
 import asyncio
+import threading
 
 logger = setup_logger(__name__)
 
 class MemoryStore:
     def __init__(self):
+        # The ChromaDB client, embedding function and collection are created on first use:
+        # importing chromadb and opening the persistent store are the slowest parts of startup.
+        self.client = None
+        self.collection_name = "agentic_ai_memory"
+        self._collection = None
+        self._init_lock = threading.Lock()
+        self.available = bool(GEMINI_API_KEY) # False once initialization is known to be impossible or has failed
         if not GEMINI_API_KEY:
             logger.error("GEMINI_API_KEY is required for GeminiEmbeddingFunction. MemoryStore not initialized.")
-            self.client = None
-            self.collection = None
-            return
+
+    @property
+    def collection(self):
+        """The ChromaDB collection, created on first access (blocking). None if memory is unavailable."""
+        if self._collection is None and self.available:
+            with self._init_lock:
+                if self._collection is None and self.available:
+                    self._connect()
+        return self._collection
+
+    def _connect(self):
+        from chromadb import Client, Settings
+        from chromadb.utils import embedding_functions
 
         self.embedding_function = embedding_functions.GoogleGenerativeAiEmbeddingFunction(api_key=GEMINI_API_KEY)
         
@@ -26,28 +44,42 @@ class MemoryStore:
         self.client = Client(Settings(
             persist_directory=MEMORY_DB_PATH
         ))
-        self.collection_name = "agentic_ai_memory"
         
         try:
-            self.collection = self.client.get_or_create_collection(
+            self._collection = self.client.get_or_create_collection(
                 name=self.collection_name,
                 embedding_function=self.embedding_function
             )
             logger.info(f"MemoryStore initialized successfully with collection: {self.collection_name}")
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB collection: {e}")
-            self.collection = None
+            self.available = False
+
+    async def get_collection(self):
+        """Like `collection`, but the first-use initialization runs off the event loop."""
+        if self._collection is not None or not self.available:
+            return self._collection
+        return await asyncio.to_thread(lambda: self.collection)
 
     async def add_to_memory(self, text: str, metadata: Dict[str, Any] = None) -> bool:
         """Adds text content to the memory store."""
-        if not self.collection:
+        with tracer.span("memory.add", bytes_in=len(text)) as span:
+            added = await self._add(text, metadata)
+            span.set(added=added)
+            return added
+
+    async def _add(self, text: str, metadata: Dict[str, Any] = None) -> bool:
+        collection = await self.get_collection()
+        if not collection:
             logger.error("MemoryStore collection not initialized.")
             return False
         try:
-            await asyncio.sleep(0.1) # Simulate async operation
-            # ChromaDB expects IDs for documents
-            doc_id = f"doc_{self.collection.count() + 1}"
-            self.collection.add(
+            # ChromaDB expects IDs for documents. Random ones, since writes run concurrently in threads
+            # and a count-based ID could be taken twice.
+            doc_id = f"doc_{uuid.uuid4().hex}"
+            # Embedding the document blocks like a query does, so it also runs off the event loop
+            await asyncio.to_thread(
+                collection.add,
                 documents=[text],
                 metadatas=[metadata if metadata else {}],
                 ids=[doc_id]
@@ -60,12 +92,21 @@ class MemoryStore:
 
     async def query_memory(self, query: str, n_results: int = 3) -> List[str]:
         """Queries the memory store for relevant documents."""
-        if not self.collection:
+        with tracer.span("memory.query", bytes_in=len(query), n_results=n_results) as span:
+            documents = await self._query(query, n_results)
+            span.set(documents=len(documents), bytes_out=sum(len(doc) for doc in documents))
+            return documents
+
+    async def _query(self, query: str, n_results: int) -> List[str]:
+        collection = await self.get_collection()
+        if not collection:
             logger.error("MemoryStore collection not initialized.")
             return []
         try:
-            await asyncio.sleep(0.1) # Simulate async operation
-            results = self.collection.query(
+            # Embedding the query and the vector search both block, so run them off the event loop.
+            # This lets a prefetched lookup genuinely overlap with routing.
+            results = await asyncio.to_thread(
+                collection.query,
                 query_texts=[query],
                 n_results=n_results
             )
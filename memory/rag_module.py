@@ -1,8 +1,11 @@
 # rag_module.py
 # agentic_ai_framework/memory/rag_module.py
 from memory.memory_store import MemoryStore
+from utils.admission import request_scheduler
+from utils.events import current_sink
 from utils.logger import setup_logger
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 
 logger = setup_logger(__name__)
 
@@ -15,18 +18,37 @@ class RAGModule:
         """
         Retrieves relevant documents from memory based on a query.
         """
-        if not self.memory_store.collection:
+        if not self.memory_store.available:
             logger.warning("Memory store not available for RAG query.")
             return []
         
         return await self.memory_store.query_memory(query, n_results)
 
+    def prefetch(self, query: str, n_results: int = 3) -> asyncio.Task:
+        """
+        Starts a memory lookup in the background and returns the task.
+        The chosen agent awaits it; if no agent needs it, cancelling the task is enough to drop it.
+        """
+        return asyncio.create_task(self.query_memory(query, n_results))
+
     async def add_to_memory(self, text: str, metadata: Dict[str, Any] = None) -> bool:
         """
         Adds text to the memory store.
         """
-        if not self.memory_store.collection:
+        if not self.memory_store.available:
             logger.warning("Memory store not available for adding content.")
             return False
             
-        return await self.memory_store.add_to_memory(text, metadata)
\ No newline at end of file
+        return await self.memory_store.add_to_memory(text, metadata)
+
+    def add_in_background(self, text: str, metadata: Dict[str, Any] = None, session_id: str = None) -> Optional[asyncio.Task]:
+        """
+        Queues a memory write at background priority and returns without waiting for it, so storing
+        an interaction never delays the reply. The write is dropped if the background queue is full.
+        """
+        if not self.memory_store.available:
+            return None
+        session_id = session_id or current_sink().session_owner() or "anonymous"
+        return request_scheduler.submit_background(
+            session_id, lambda: self.memory_store.add_to_memory(text, metadata), name="memory write"
+        )
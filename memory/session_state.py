@@ -0,0 +1,147 @@
+# session_state.py
+# agentic_ai_framework/memory/session_state.py
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from config import SESSION_SETTINGS
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+# Function words; overlap is measured on the remaining content words
+STOPWORDS = {
+    "a", "an", "the", "of", "to", "for", "and", "or", "but", "in", "on", "at", "by", "about", "from", "with",
+    "is", "are", "was", "were", "be", "do", "does", "did", "can", "could", "would", "should", "will",
+    "i", "you", "we", "me", "my", "your", "what", "which", "who", "how", "why", "when", "where", "please", "tell",
+}
+# Words that point back at the previous request or its answer ("and the second one?", "more about that")
+FOLLOW_UP_SIGNALS = {
+    "it", "its", "that", "this", "those", "these", "them", "they", "their", "one", "ones", "same", "also",
+    "too", "more", "else", "other", "another", "again", "first", "second", "third", "last", "previous", "above",
+}
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+class SessionState:
+    """
+    Short-term state of one conversation: the last few turns in a ring buffer, the agent that handled
+    the previous request and the memory context retrieved for it. It holds no clients; the LLM and memory
+    clients are the Orchestrator's shared instances. Turns and context are changed through
+    SessionStore.record_* so the store's memory accounting stays correct.
+    """
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns = deque(maxlen=SESSION_SETTINGS["max_turns"]) # (user text, assistant text)
+        self.last_route: Optional[str] = None
+        self.context_query: Optional[str] = None
+        self.context_docs: List[str] = []
+        self.context_time = 0.0
+        self.size = 0 # Characters held, as last measured by the store
+
+    def measure(self) -> int:
+        return (sum(len(user) + len(assistant) for user, assistant in self.turns)
+                + len(self.context_query or "") + sum(len(doc) for doc in self.context_docs))
+
+    def clear(self):
+        self.turns.clear()
+        self.last_route = None
+        self.context_query = None
+        self.context_docs = []
+        self.context_time = 0.0
+
+    def history_text(self) -> str:
+        """The recent turns as a text part to put in front of the request, or "" for a new conversation."""
+        if not self.turns:
+            return ""
+        lines = ["Recent conversation (oldest first):"]
+        for user, assistant in self.turns:
+            lines.append(f"User: {user}")
+            lines.append(f"Assistant: {assistant}")
+        if self.last_route:
+            lines.append(f"(The previous request was handled by the '{self.last_route}' agent.)")
+        return "\n".join(lines)
+
+    def cached_context(self, query: str) -> Optional[List[str]]:
+        """
+        The previously retrieved memory context if `query` looks like a follow-up to the request that
+        fetched it: recent, and either short with a word pointing back at it ("and the second one?") or
+        mostly the same content words. Else None, so a short new question gets its own retrieval.
+        """
+        if self.context_query is None or time.monotonic() - self.context_time > SESSION_SETTINGS["context_ttl_seconds"]:
+            return None
+        words = _words(query)
+        if len(words) <= SESSION_SETTINGS["follow_up_max_words"] and words & FOLLOW_UP_SIGNALS:
+            return self.context_docs
+        content = words - STOPWORDS - FOLLOW_UP_SIGNALS
+        if not content:
+            return None
+        overlap = len(content & _words(self.context_query)) / len(content)
+        return self.context_docs if overlap >= SESSION_SETTINGS["follow_up_min_overlap"] else None
+
+class SessionStore:
+    """
+    All live sessions in LRU order. Sessions beyond `max_sessions`, or beyond the shared character budget,
+    are evicted oldest-first. An evicted session's state is cleared in place, since the chat session
+    object may still reference it, and starts over as a new conversation.
+    """
+    def __init__(self):
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.total_size = 0
+        self.evictions = 0
+
+    def get(self, session_id: str) -> SessionState:
+        """Returns the session's state, creating it if needed, and marks it most recently used."""
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = SessionState(session_id)
+            self._sessions[session_id] = state
+            self._enforce_limits(keep=session_id)
+        else:
+            self._sessions.move_to_end(session_id)
+        return state
+
+    def drop(self, session_id: str):
+        state = self._sessions.pop(session_id, None)
+        if state is not None:
+            self.total_size -= state.size
+            state.clear()
+            state.size = 0
+
+    def record_turn(self, state: SessionState, user_text: str, assistant_text: str):
+        limit = SESSION_SETTINGS["max_turn_chars"]
+        state.turns.append((user_text[:limit], (assistant_text or "")[:limit]))
+        self._commit(state)
+
+    def record_context(self, state: SessionState, query: str, docs: List[str]):
+        state.context_query = query[:SESSION_SETTINGS["max_turn_chars"]]
+        state.context_docs = list(docs)
+        state.context_time = time.monotonic()
+        self._commit(state)
+
+    def _commit(self, state: SessionState):
+        current = self._sessions.get(state.session_id)
+        if current is not state:
+            # Re-admit a state object that was evicted while in use, replacing any fresh one created since
+            if current is not None:
+                self.total_size -= current.size
+            self._sessions[state.session_id] = state
+        self._sessions.move_to_end(state.session_id)
+        new_size = state.measure()
+        self.total_size += new_size - state.size
+        state.size = new_size
+        self._enforce_limits(keep=state.session_id)
+
+    def _enforce_limits(self, keep: str):
+        while len(self._sessions) > 1 and (len(self._sessions) > SESSION_SETTINGS["max_sessions"]
+                                           or self.total_size > SESSION_SETTINGS["max_total_chars"]):
+            session_id, state = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break # Only the session being served is left over budget
+            self.drop(session_id)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"sessions": len(self._sessions), "total_chars": self.total_size, "evictions": self.evictions}
+
+# Shared store for all sessions in this process
+session_store = SessionStore()
@@ -1,19 +1,29 @@
 # orchestrator.py
 # agentic_ai_framework/orchestrator.py
 import asyncio
+import importlib
 from llm_client import LLMClient
 from memory.memory_store import MemoryStore
 from memory.rag_module import RAGModule
-from agents import OrchestratorAgent, ResearchAgent, CommunicatorAgent, PlannerAgent, MultimodalInputAgent, BaseAgent
-from tools import WebSearchTool, SendEmailTool, ReadEmailTool, ReadFileTool, WriteFileTool, ListDirectoryTool, \
-                  TextToSpeechTool, SpeechToTextTool, OpenApplicationTool, RunShellCommandTool, CaptureScreenTool
+from memory.session_state import SessionState, session_store
+from agents import AgentRegistry, BaseAgent
+from agents.orchestrator_agent import OrchestratorAgent, TaskPlan, TaskNode
+from config import ORCHESTRATION_SETTINGS
 from utils.logger import setup_logger
 from typing import Dict, Any, List, Union
 from PIL.Image import Image as PILImage # For type hinting PIL Image objects
-import chainlit as cl # For Chainlit integration
+from utils.events import current_sink # Steps and messages go to the request's sink (Chainlit UI or headless recorder)
+from utils.deadline import Deadline, DeadlineExceeded, RequestCancelled, use_deadline
+from utils.tracing import tracer, payload_size
+from utils.profiling import profiler
 
 logger = setup_logger(__name__)
 
+# Tools every task agent may use, by their name in tools.TOOL_REGISTRY
+COMMON_TOOLS = ["serper_search", "send_email", "read_email", "check_email_status", "read_file", "write_file",
+                "list_directory", "search_files", "text_to_speech", "speech_to_text", "open_application",
+                "run_shell_command", "capture_screen"]
+
 class Orchestrator:
     def __init__(self):
         logger.info("Initializing Orchestrator...")
@@ -21,33 +31,18 @@ class Orchestrator:
         self.memory_store = MemoryStore()
         self.rag_module = RAGModule(self.memory_store)
 
-        # Initialize specialized agents
-        # Pass all potential tools to agents that might use them.
+        # Specialized agents are declared here and built on first use, so startup does not import
+        # their modules, tools or SDKs. Pass all potential tools to agents that might use them;
+        # tools are given by registered name and only loaded when an agent first talks to the LLM.
         # The BaseAgent's generate_response method will ensure LLM uses only relevant tools.
-        common_tools = [WebSearchTool, SendEmailTool, ReadEmailTool, ReadFileTool, WriteFileTool, ListDirectoryTool, 
-                        TextToSpeechTool, SpeechToTextTool, OpenApplicationTool, RunShellCommandTool, CaptureScreenTool]
-
-        self.research_agent = ResearchAgent(llm_client=self.llm_client, memory_rag=self.rag_module)
-        self.communicator_agent = CommunicatorAgent(llm_client=self.llm_client, memory=self.rag_module)
-        self.planner_agent = PlannerAgent(llm_client=self.llm_client, memory=self.rag_module)
-        self.multimodal_input_agent = MultimodalInputAgent(llm_client=self.llm_client)
-
-        # You might want to assign specific tools to specific agents if they only need a subset
-        # For this comprehensive example, BaseAgent gets all tools it might need.
-        for tool in common_tools:
-            self.research_agent.add_tool(tool)
-            self.communicator_agent.add_tool(tool)
-            self.planner_agent.add_tool(tool)
+        self.agents_map: Dict[str, BaseAgent] = AgentRegistry({
+            "research": lambda: self._build_agent("ResearcherAgent", memory_rag=self.rag_module),
+            "communicator": lambda: self._build_agent("CommunicatorAgent", memory=self.rag_module),
+            "planner": lambda: self._build_agent("PlannerAgent", memory=self.rag_module),
             # MultimodalInputAgent does not directly use external tools in its handle method,
-            # but relies on LLM's multimodal processing.
-
-        # Map agent names to instances for the OrchestratorAgent
-        self.agents_map: Dict[str, BaseAgent] = {
-            "research": self.research_agent,
-            "communicator": self.communicator_agent,
-            "planner": self.planner_agent,
-            "multimodal_input": self.multimodal_input_agent # Orchestrator can route to this first
-        }
+            # but relies on LLM's multimodal processing. Orchestrator can route to this first.
+            "multimodal_input": lambda: self._build_agent("MultimodalInputAgent", with_tools=False),
+        })
         
         # The main orchestrator agent that routes tasks
         self.orchestrator_agent = OrchestratorAgent(
@@ -55,29 +50,73 @@ class Orchestrator:
             agents_map=self.agents_map,
             memory=self.rag_module # Orchestrator also benefits from memory
         )
-        logger.info("All agents initialized.")
+        logger.info("Orchestrator initialized; specialized agents load on first use.")
+
+    def _build_agent(self, class_name: str, with_tools: bool = True, **kwargs) -> BaseAgent:
+        """Imports and constructs one specialized agent, attaching the common tools by name."""
+        agent_class = getattr(importlib.import_module("agents"), class_name)
+        agent = agent_class(llm_client=self.llm_client, **kwargs)
+        if with_tools:
+            for tool_name in COMMON_TOOLS:
+                agent.add_tool(tool_name)
+        logger.info(f"{agent.name} initialized on first use.")
+        return agent
 
     async def _process_multimodal_input(self, text_input: str = None, audio_input: bytes = None, image_input: bytes = None, video_frame_input: bytes = None) -> Dict[str, Union[str, List[Any]]]:
         """
         Helper to delegate raw multimodal inputs to the MultimodalInputAgent.
+        In fused mode the agent also returns a suggested "route", saving a second multimodal call.
         """
         if audio_input or image_input or video_frame_input:
             logger.info("Detected raw multimodal input. Routing to MultimodalInputAgent for initial parsing.")
-            parsed_data = await self.multimodal_input_agent.handle(
+            route_options = None
+            if ORCHESTRATION_SETTINGS["fused_multimodal_routing"] and not ORCHESTRATION_SETTINGS["planning_mode"]:
+                route_options = [name for name in self.agents_map if name != "multimodal_input"]
+            parsed_data = await self.agents_map["multimodal_input"].handle(
                 audio_data=audio_input,
                 image_data=image_input,
                 video_frame_data=video_frame_input,
-                text_input=text_input # Pass along any initial text input
+                text_input=text_input, # Pass along any initial text input
+                route_options=route_options
             )
             return parsed_data
         else:
             # If no raw multimodal data, just return the text input
             return {"parsed_text": text_input, "multimodal_parts": [text_input] if text_input else []}
 
-    async def handle_user_request(self, user_text_input: str, user_audio_data: bytes = None, user_image_data: bytes = None, user_video_frame: bytes = None) -> str:
+    async def handle_user_request(self, user_text_input: str, user_audio_data: bytes = None, user_image_data: bytes = None, user_video_frame: bytes = None,
+                                  session: SessionState = None, deadline: Deadline = None) -> str:
         """
         Processes a full user request, including multimodal inputs, routes it, and executes the task.
+        With a `session`, recent turns are passed along as context, follow-ups reuse the memory context
+        retrieved for the previous request, and the turn is recorded afterwards.
+        The request runs under `deadline` (a new one with the configured timeout if not given): agents, tools
+        and LLM calls check its remaining budget, and cancelling it stops all in-flight work at once.
         """
+        deadline = deadline or Deadline(ORCHESTRATION_SETTINGS["request_timeout_seconds"])
+        media = [name for name, data in (("audio", user_audio_data), ("image", user_image_data), ("video", user_video_frame)) if data]
+        kind = "+".join(media) or "text"
+        with profiler.request(kind), use_deadline(deadline), tracer.span("handle_user_request", label=kind) as span:
+            if tracer.enabled:
+                span.set(bytes_in=payload_size([user_text_input, user_audio_data, user_image_data, user_video_frame]))
+            try:
+                final_output = await deadline.guard(
+                    self._handle_request(user_text_input, user_audio_data, user_image_data, user_video_frame, session),
+                    grace_seconds=ORCHESTRATION_SETTINGS["cancel_grace_seconds"]
+                )
+                span.set(bytes_out=len(final_output))
+                return final_output
+            except DeadlineExceeded:
+                logger.warning("Request ran out of its time budget and was stopped.")
+                span.set(outcome="deadline_exceeded")
+                return "Sorry, this request took too long and was stopped. Please try again or simplify the request."
+            except RequestCancelled as e:
+                logger.info(f"Request cancelled: {e}")
+                span.set(outcome="cancelled")
+                return "Request stopped."
+
+    async def _handle_request(self, user_text_input: str, user_audio_data: bytes, user_image_data: bytes, user_video_frame: bytes,
+                              session: SessionState) -> str:
         # Step 1: Process raw multimodal inputs via MultimodalInputAgent
         processed_input = await self._process_multimodal_input(
             text_input=user_text_input,
@@ -88,20 +127,85 @@ class Orchestrator:
         
         cleaned_input_text = processed_input["parsed_text"]
         multimodal_context_parts = processed_input["multimodal_parts"]
+        interpreted_parts = processed_input.get("interpreted_parts")
 
         if not cleaned_input_text.strip():
             return "Please provide some input (text, audio, or image)."
 
         logger.info(f"Received processed input: {cleaned_input_text} (Multimodal parts count: {len(multimodal_context_parts)})")
-        
+
+        # Recent turns go in front of the other parts so routing and agents can resolve follow-ups.
+        history_text = session.history_text() if session else ""
+        if history_text:
+            multimodal_context_parts = [history_text] + list(multimodal_context_parts)
+            if interpreted_parts is not None:
+                interpreted_parts = [history_text] + list(interpreted_parts)
+
+        retrieval_task = self._start_retrieval(cleaned_input_text, session)
+        try:
+            if ORCHESTRATION_SETTINGS["planning_mode"]:
+                final_output = await self._plan_and_execute(cleaned_input_text, multimodal_context_parts, retrieval_task, session=session)
+            else:
+                final_output = await self._route_and_execute(
+                    cleaned_input_text, multimodal_context_parts, retrieval_task, preselected_route=processed_input.get("route"),
+                    interpreted_parts=interpreted_parts, session=session
+                )
+        finally:
+            if not retrieval_task.done():
+                retrieval_task.cancel()
+
+        if session is not None:
+            session_store.record_turn(session, cleaned_input_text, final_output)
+        return final_output
+
+    def _start_retrieval(self, query: str, session: SessionState = None) -> asyncio.Future:
+        """
+        Starts memory retrieval (query embedding + vector search) now so it runs concurrently with routing.
+        The chosen agent receives the future if it uses retrieval; otherwise it is cancelled.
+        A follow-up in the same session gets the context already retrieved for that conversation instead.
+        """
+        cached_docs = session.cached_context(query) if session else None
+        if cached_docs is not None:
+            logger.info(f"Reusing {len(cached_docs)} session context document(s); skipping memory retrieval.")
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(cached_docs)
+            return future
+
+        retrieval_task = self.rag_module.prefetch(query)
+        if session is not None:
+            def remember(task: asyncio.Task):
+                if not task.cancelled() and task.exception() is None:
+                    session_store.record_context(session, query, task.result())
+            retrieval_task.add_done_callback(remember)
+        return retrieval_task
+
+    async def _route_and_execute(self, cleaned_input_text: str, multimodal_context_parts: List[Any], retrieval_task: asyncio.Future,
+                                 preselected_route: str = None, interpreted_parts: List[Any] = None, session: SessionState = None,
+                                 route_source: str = "fused multimodal interpretation") -> str:
+        """
+        Routes the processed input to an agent and executes it, handing over the prefetched retrieval.
+        A `preselected_route` (from fused multimodal interpretation, or the agent of a single-step plan)
+        skips the routing LLM call if it is valid;
+        the agent then gets `interpreted_parts` (media replaced by references) instead of the raw media.
+        """
         # Step 2: OrchestratorAgent routes the task
-        async with cl.Step(name="Orchestrator Routing", type="llm") as route_step:
+        async with current_sink().step("Orchestrator Routing", type="llm") as route_step:
             route_step.input = cleaned_input_text # Show the text input to orchestrator
-            chosen_agent_name = await self.orchestrator_agent.route_task(
-                cleaned_input_text, multimodal_content=multimodal_context_parts
-            )
-            route_step.output = f"Routed to: {chosen_agent_name}"
-            await cl.Message(content=f"AI: Routing to **{chosen_agent_name}** agent...").send()
+            if (preselected_route in self.agents_map and preselected_route != "multimodal_input") or preselected_route == "clarify":
+                chosen_agent_name = preselected_route
+                route_step.output = f"Routed to: {chosen_agent_name} (from {route_source})"
+                if interpreted_parts is not None:
+                    multimodal_context_parts = interpreted_parts # The interpretation already covers the media
+            else:
+                if preselected_route:
+                    logger.warning(f"The {route_source} suggested unknown agent '{preselected_route}'. Routing separately.")
+                chosen_agent_name = await self.orchestrator_agent.route_task(
+                    cleaned_input_text, multimodal_content=multimodal_context_parts
+                )
+                route_step.output = f"Routed to: {chosen_agent_name}"
+            await current_sink().message(f"AI: Routing to **{chosen_agent_name}** agent...")
+        if session is not None and chosen_agent_name != "clarify":
+            session.last_route = chosen_agent_name
 
         if chosen_agent_name == "clarify":
             return "I'm not sure how to handle that. Can you please clarify your request?"
@@ -111,27 +215,129 @@ class Orchestrator:
             logger.error(f"Orchestrator routed to non-existent agent: {chosen_agent_name}")
             return f"I've identified an agent for this, but it seems **{chosen_agent_name}** is not available. Please check system configuration."
 
+        # Only retrieval-aware agents get the prefetch; for the rest, drop it before it costs anything more.
+        agent_kwargs = {}
+        if target_agent.uses_retrieval:
+            agent_kwargs["prefetched_docs"] = retrieval_task
+        else:
+            retrieval_task.cancel()
+
         # Step 3: Delegate and execute the task
         logger.info(f"Delegating task to {target_agent.name}...")
         
         try:
-            async with cl.Step(name=f"Agent: {target_agent.name} Execution", type="agent") as agent_exec_step:
+            async with current_sink().step(f"Agent: {target_agent.name} Execution", type="agent") as agent_exec_step:
                 agent_exec_step.input = cleaned_input_text # Show the text input to agent
                 final_output = await target_agent.handle(
-                    cleaned_input_text, multimodal_content=multimodal_context_parts
+                    cleaned_input_text, multimodal_content=multimodal_context_parts, **agent_kwargs
                 )
                 agent_exec_step.output = f"Agent completed. Output: {final_output[:200]}..."
 
-            # Step 4: Optionally add the interaction to long-term memory
-            await self.memory_store.add_to_memory(
+            # Step 4: Add the interaction to long-term memory in the background (the reply does not wait for it)
+            self.rag_module.add_in_background(
                 text=f"User Query: {cleaned_input_text}\nAI Response: {final_output}",
-                metadata={"agent": target_agent.name, "timestamp": asyncio.current_task()._loop.time()}
+                metadata={"agent": target_agent.name, "timestamp": asyncio.current_task()._loop.time()},
+                session_id=session.session_id if session else None
             )
             return final_output
 
+        except RequestCancelled:
+            raise
         except NotImplementedError:
             logger.error(f"Agent {target_agent.name} has not implemented its handle method.")
             return f"**{target_agent.name}** is not fully implemented yet for this type of task."
         except Exception as e:
             logger.error(f"An error occurred while executing task with {target_agent.name}: {e}", exc_info=True)
-            return f"An error occurred while processing your request with **{target_agent.name}**. Please check logs for details."
\ No newline at end of file
+            return f"An error occurred while processing your request with **{target_agent.name}**. Please check logs for details."
+
+    async def _plan_and_execute(self, cleaned_input_text: str, multimodal_context_parts: List[Any], retrieval_task: asyncio.Future,
+                                session: SessionState = None) -> str:
+        """
+        Planning mode: asks the OrchestratorAgent for a task graph and runs it.
+        Single-step plans go through the same path as plain routing.
+        """
+        async with current_sink().step("Orchestrator Planning", type="llm") as plan_step:
+            plan_step.input = cleaned_input_text
+            plan = await self.orchestrator_agent.plan_task(
+                cleaned_input_text, multimodal_content=multimodal_context_parts
+            )
+            plan_step.output = "\n".join(
+                f"{node.id}: {node.agent} <- {node.depends_on or 'start'} | {node.task}" for node in plan.steps
+            )
+
+        if any(node.agent == "clarify" for node in plan.steps):
+            return "I'm not sure how to handle that. Can you please clarify your request?"
+        if len(plan.steps) == 1:
+            return await self._route_and_execute(
+                cleaned_input_text, multimodal_context_parts, retrieval_task,
+                preselected_route=plan.steps[0].agent, session=session, route_source="single-step plan"
+            )
+
+        await current_sink().message(f"AI: Running a {len(plan.steps)}-step plan ({', '.join(n.agent for n in plan.steps)})...")
+        if session is not None:
+            session.last_route = plan.steps[-1].agent
+        final_output = await self._execute_plan(plan, multimodal_context_parts, retrieval_task)
+
+        self.rag_module.add_in_background(
+            text=f"User Query: {cleaned_input_text}\nAI Response: {final_output}",
+            metadata={"agent": "plan:" + ",".join(node.agent for node in plan.steps), "timestamp": asyncio.current_task()._loop.time()},
+            session_id=session.session_id if session else None
+        )
+        return final_output
+
+    async def _execute_plan(self, plan: TaskPlan, multimodal_context_parts: List[Any], retrieval_task: asyncio.Future) -> str:
+        """
+        Runs a task graph. Each node starts as soon as its dependencies finish, with at most
+        `max_parallel_agents` nodes executing at once. Upstream outputs are appended to the
+        downstream node's prompt, and each node's result is streamed to the UI as it completes.
+        Returns the combined output of the terminal nodes.
+        """
+        semaphore = asyncio.Semaphore(ORCHESTRATION_SETTINGS["max_parallel_agents"])
+        node_tasks: Dict[str, asyncio.Task] = {}
+
+        # Root nodes of retrieval-aware agents share the prefetched lookup; drop it if nobody needs it.
+        retrieval_consumers = [n for n in plan.steps if not n.depends_on and self.agents_map[n.agent].uses_retrieval]
+        if not retrieval_consumers:
+            retrieval_task.cancel()
+
+        async def run_node(node: TaskNode) -> str:
+            upstream_outputs = await asyncio.gather(*(node_tasks[dep] for dep in node.depends_on))
+            prompt = node.task
+            if upstream_outputs:
+                context = "\n\n".join(f"Result of step {dep}:\n{output}" for dep, output in zip(node.depends_on, upstream_outputs))
+                prompt = f"{node.task}\n\nUse these results from earlier steps:\n{context}"
+
+            agent = self.agents_map[node.agent]
+            agent_kwargs = {"prefetched_docs": retrieval_task} if node in retrieval_consumers else {}
+            async with semaphore:
+                try:
+                    async with current_sink().step(f"Plan step {node.id}: {agent.name}", type="agent") as node_step:
+                        node_step.input = prompt
+                        output = await agent.handle(prompt, multimodal_content=multimodal_context_parts, **agent_kwargs)
+                        node_step.output = f"Agent completed. Output: {output[:200]}..."
+                except RequestCancelled:
+                    raise
+                except Exception as e:
+                    # Keep the rest of the graph running; dependents see the error text as their input.
+                    logger.error(f"Plan step {node.id} ({agent.name}) failed: {e}", exc_info=True)
+                    output = f"Step {node.id} ({agent.name}) failed: {e}"
+
+            await current_sink().message(f"**Step {node.id} ({agent.name})**\n{output}") # Stream the partial result
+            return output
+
+        # Topological order guarantees dependency tasks exist before their dependents are created.
+        for node in plan.topological_order():
+            node_tasks[node.id] = asyncio.create_task(run_node(node))
+
+        try:
+            await asyncio.gather(*node_tasks.values())
+        finally:
+            for task in node_tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        dependency_ids = {dep for node in plan.steps for dep in node.depends_on}
+        terminal_nodes = [node for node in plan.steps if node.id not in dependency_ids]
+        if len(terminal_nodes) == 1:
+            return node_tasks[terminal_nodes[0].id].result()
+        return "\n\n".join(f"**{node.agent}** ({node.id}):\n{node_tasks[node.id].result()}" for node in terminal_nodes)
@@ -1,27 +1,71 @@
 # __init__.py
 # agentic_ai_framework/tools/__init__.py
-import google.generativeai as genai
-from typing import Callable, Dict, Any
+import importlib
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
+
+def to_gemini_schema(schema: Dict[str, Any], definitions: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Converts a JSON schema as produced by pydantic's `model_json_schema` into the OpenAPI subset that
+    genai.protos.Schema accepts: uppercase types, nested models inlined from $defs/allOf, Optional[X]
+    (anyOf with null) as a nullable X, and keys Gemini rejects (title, default, ...) dropped.
+    """
+    definitions = schema.get("$defs", definitions or {})
+    if "$ref" in schema:
+        schema = {**definitions[schema["$ref"].rsplit("/", 1)[-1]], **{k: v for k, v in schema.items() if k != "$ref"}}
+    if "allOf" in schema and len(schema["allOf"]) == 1: # How pydantic attaches a description to a nested model
+        schema = {**to_gemini_schema(schema["allOf"][0], definitions), **{k: v for k, v in schema.items() if k != "allOf"}}
+    nullable = False
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        nullable = len(options) < len(schema["anyOf"])
+        schema = {**to_gemini_schema(options[0], definitions), **{k: v for k, v in schema.items() if k != "anyOf"}}
+    converted = {}
+    for key, value in schema.items():
+        if key == "type":
+            types = [value] if isinstance(value, str) else list(value)
+            nullable = nullable or "null" in types
+            converted["type"] = next(t for t in types if t != "null").upper()
+        elif key == "properties":
+            converted["properties"] = {name: to_gemini_schema(prop, definitions) for name, prop in value.items()}
+        elif key == "items":
+            converted["items"] = to_gemini_schema(value, definitions)
+        elif key == "enum":
+            converted["enum"] = [str(option) for option in value]
+        elif key in ("description", "required", "nullable"):
+            converted[key] = value
+    if nullable:
+        converted["nullable"] = True
+    return converted
 
 # Base class for tools, allowing LLMs to understand them for function calling
 class BaseTool:
-    def __init__(self, name: str, description: str, func: Callable, schema: Dict[str, Any]):
+    def __init__(self, name: str, description: str, func: Callable, schema: Union[Dict[str, Any], Callable[[], Dict[str, Any]]]):
         self.name = name
         self.description = description
         self.func = func
-        self.schema = schema
+        self._schema = schema # A dict, or a callable such as `Args.model_json_schema` that is only run on first use
+        self._gemini_tool = None
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        if callable(self._schema):
+            self._schema = self._schema()
+        return self._schema
 
     def to_gemini_format(self):
-        """Converts tool definition to Gemini's FunctionDeclaration format."""
-        return genai.protos.Tool(
-            function_declarations=[
-                genai.protos.FunctionDeclaration(
-                    name=self.name,
-                    description=self.description,
-                    parameters=genai.protos.Schema(**self.schema)
-                )
-            ]
-        )
+        """Converts tool definition to Gemini's FunctionDeclaration format (built once per tool)."""
+        if self._gemini_tool is None:
+            import google.generativeai as genai # Deferred: the SDK is slow to import and only needed for Gemini calls
+            self._gemini_tool = genai.protos.Tool(
+                function_declarations=[
+                    genai.protos.FunctionDeclaration(
+                        name=self.name,
+                        description=self.description,
+                        parameters=genai.protos.Schema(**to_gemini_schema(self.schema))
+                    )
+                ]
+            )
+        return self._gemini_tool
 
     def to_openai_format(self):
         """Converts tool definition to OpenAI's function schema format."""
@@ -34,10 +78,45 @@ class BaseTool:
             }
         }
 
-# Import all specific tools so they can be easily accessed
-from .email_tools import *
-from .file_tools import *
-from .web_tools import *
-from .voice_tools import *
-from .system_tools import *
-from .visual_tools import *
\ No newline at end of file
+# Tool registry: the name the LLM calls -> (module, exported attribute).
+# Importing `tools` only loads this table; a tool's module (and its SDKs, PIL, mss, httpx, ...) is imported
+# the first time the tool is looked up, through `get_tool` or `from tools import XTool` (PEP 562 __getattr__).
+TOOL_REGISTRY: Dict[str, Tuple[str, str]] = {
+    "serper_search": ("web_tools", "WebSearchTool"),
+    "send_email": ("email_tools", "SendEmailTool"),
+    "read_email": ("email_tools", "ReadEmailTool"),
+    "check_email_status": ("email_tools", "CheckEmailStatusTool"),
+    "read_file": ("file_tools", "ReadFileTool"),
+    "write_file": ("file_tools", "WriteFileTool"),
+    "list_directory": ("file_tools", "ListDirectoryTool"),
+    "search_files": ("file_tools", "SearchFilesTool"),
+    "text_to_speech": ("voice_tools", "TextToSpeechTool"),
+    "speech_to_text": ("voice_tools", "SpeechToTextTool"),
+    "open_application": ("system_tools", "OpenApplicationTool"),
+    "run_shell_command": ("system_tools", "RunShellCommandTool"),
+    "capture_screen": ("visual_tools", "CaptureScreenTool"),
+    "schedule_event": ("calendar_tools", "ScheduleEventTool"),
+    "find_free_slot": ("calendar_tools", "FindFreeSlotTool"),
+    "list_events": ("calendar_tools", "ListEventsTool"),
+    "cancel_event": ("calendar_tools", "CancelEventTool"),
+    "set_reminder": ("calendar_tools", "SetReminderTool"),
+    "cancel_reminder": ("calendar_tools", "CancelReminderTool"),
+}
+_TOOL_EXPORTS = {attribute: module for module, attribute in TOOL_REGISTRY.values()}
+
+__all__ = ["BaseTool", "TOOL_REGISTRY", "get_tool", "to_gemini_schema"] + list(_TOOL_EXPORTS)
+
+def get_tool(name: str) -> BaseTool:
+    """Returns the tool the LLM knows as `name`, importing its module on first use."""
+    if name not in TOOL_REGISTRY:
+        raise KeyError(f"Unknown tool '{name}'.")
+    module_name, attribute = TOOL_REGISTRY[name]
+    return getattr(importlib.import_module(f"{__name__}.{module_name}"), attribute)
+
+def __getattr__(name: str):
+    if name in _TOOL_EXPORTS:
+        return getattr(importlib.import_module(f"{__name__}.{_TOOL_EXPORTS[name]}"), name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_TOOL_EXPORTS))
\ No newline at end of file
@@ -0,0 +1,295 @@
+# calendar_store.py
+# agentic_ai_framework/tools/calendar_store.py
+import os
+import json
+import uuid
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import CALENDAR_SETTINGS
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class _Node:
+    __slots__ = ("start", "end", "event_id", "priority", "left", "right", "max_end")
+
+    def __init__(self, start: float, end: float, event_id: str):
+        self.start = start
+        self.end = end
+        self.event_id = event_id
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+def _update(node: _Node):
+    node.max_end = max(node.end,
+                       node.left.max_end if node.left else node.end,
+                       node.right.max_end if node.right else node.end)
+
+def _rotate_right(node: _Node) -> _Node:
+    pivot = node.left
+    node.left, pivot.right = pivot.right, node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+def _rotate_left(node: _Node) -> _Node:
+    pivot = node.right
+    node.right, pivot.left = pivot.left, node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+class IntervalTree:
+    """
+    Half-open intervals [start, end) in a treap ordered by (start, event_id), with every node
+    augmented by the largest end in its subtree. Insert and remove are O(log n) expected, and an
+    overlap query is O(log n + k) because subtrees whose max_end is at or before the query start are skipped.
+    """
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, start: float, end: float, event_id: str):
+        def insert_at(node: Optional[_Node]) -> _Node:
+            if node is None:
+                return _Node(start, end, event_id)
+            if (start, event_id) < (node.start, node.event_id):
+                node.left = insert_at(node.left)
+                if node.left.priority > node.priority:
+                    return _rotate_right(node)
+            else:
+                node.right = insert_at(node.right)
+                if node.right.priority > node.priority:
+                    return _rotate_left(node)
+            _update(node)
+            return node
+
+        self._root = insert_at(self._root)
+        self._size += 1
+
+    def remove(self, start: float, event_id: str) -> bool:
+        removed = False
+
+        def remove_at(node: Optional[_Node]) -> Optional[_Node]:
+            nonlocal removed
+            if node is None:
+                return None
+            if (start, event_id) == (node.start, node.event_id):
+                removed = True
+                if node.left is None:
+                    return node.right
+                if node.right is None:
+                    return node.left
+                # Rotate the higher-priority child up and keep sinking the node until it is a leaf
+                if node.left.priority > node.right.priority:
+                    node = _rotate_right(node)
+                    node.right = remove_at(node.right)
+                else:
+                    node = _rotate_left(node)
+                    node.left = remove_at(node.left)
+            elif (start, event_id) < (node.start, node.event_id):
+                node.left = remove_at(node.left)
+            else:
+                node.right = remove_at(node.right)
+            _update(node)
+            return node
+
+        self._root = remove_at(self._root)
+        if removed:
+            self._size -= 1
+        return removed
+
+    def overlapping(self, start: float, end: float) -> List[Tuple[float, float, str]]:
+        """Returns (start, end, event_id) of every interval intersecting [start, end), ordered by start."""
+        found = []
+
+        def visit(node: Optional[_Node]):
+            if node is None or node.max_end <= start:
+                return # Nothing in this subtree ends after the query begins
+            visit(node.left)
+            if node.start >= end:
+                return # This node and its right subtree begin after the query ends
+            if node.end > start:
+                found.append((node.start, node.end, node.event_id))
+            visit(node.right)
+
+        visit(self._root)
+        return found
+
+class CalendarStore:
+    """
+    Persistent local calendar. Events live in an append-only JSONL journal (CALENDAR_SETTINGS["path"]) of
+    add/remove records, replayed on load and compacted when it grows, and are indexed in an IntervalTree,
+    so neither a change nor a conflict check or free-slot search touches the whole calendar.
+    Times are naive local datetimes. Methods are synchronous and thread-safe; call them via asyncio.to_thread.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or CALENDAR_SETTINGS["path"]
+        self._events: Dict[str, dict] = None # Loaded lazily: event_id -> event
+        self._tree = IntervalTree()
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_records = 0
+
+    def _load(self):
+        if self._events is not None:
+            return
+        self._events, records = {}, 0
+        try:
+            with open(self.path, "r") as f:
+                content = f.read()
+        except FileNotFoundError:
+            content = ""
+        if content.lstrip().startswith("["):
+            # Calendar written by an older version as one JSON array; rewritten as a journal below
+            try:
+                legacy_events = json.loads(content)
+            except ValueError:
+                legacy_events = []
+            for event in legacy_events:
+                self._index(event)
+            records = len(legacy_events) * 2 + 64 # Forces the compaction
+        else:
+            for line in content.splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue # Torn final line after a crash
+                records += 1
+                if record["op"] == "add":
+                    self._index(record["event"])
+                else: # "remove"
+                    self._unindex(record["id"])
+        self._journal_records = records
+        logger.info(f"Calendar loaded from {self.path}: {len(self._events)} events from {records} records.")
+        if records > max(64, CALENDAR_SETTINGS["compact_ratio"] * len(self._events)):
+            self._compact_journal()
+
+    def _index(self, event: dict):
+        self._events[event["id"]] = event
+        self._tree.insert(datetime.fromisoformat(event["start"]).timestamp(),
+                          datetime.fromisoformat(event["end"]).timestamp(), event["id"])
+
+    def _unindex(self, event_id: str) -> Optional[dict]:
+        event = self._events.pop(event_id, None)
+        if event is not None:
+            self._tree.remove(datetime.fromisoformat(event["start"]).timestamp(), event_id)
+        return event
+
+    def _append(self, record: dict):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._journal = open(self.path, "a", buffering=1) # Line-buffered: every record reaches the OS
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal_records += 1
+        if self._journal_records > max(1024, CALENDAR_SETTINGS["compact_ratio"] * len(self._events)):
+            self._compact_journal()
+
+    def _compact_journal(self):
+        """Rewrites the journal as one "add" record per event."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for event in sorted(self._events.values(), key=lambda event: event["start"]):
+                f.write(json.dumps({"op": "add", "event": event}) + "\n")
+        os.replace(tmp_path, self.path) # Atomic, so a crash keeps either the old or the new journal
+        self._journal_records = len(self._events)
+        logger.info(f"Calendar journal compacted to {self._journal_records} records.")
+
+    def _overlapping_events(self, start: datetime, end: datetime) -> List[dict]:
+        return [self._events[event_id] for _, _, event_id in self._tree.overlapping(start.timestamp(), end.timestamp())]
+
+    def conflicts(self, start: datetime, end: datetime) -> List[dict]:
+        """Events intersecting [start, end), ordered by start."""
+        with self._lock:
+            self._load()
+            return self._overlapping_events(start, end)
+
+    def add_event(self, title: str, start: datetime, end: datetime, attendees: List[str] = None,
+                  location: str = None, allow_conflicts: bool = False) -> Tuple[Optional[dict], List[dict]]:
+        """
+        Stores the event unless it overlaps existing ones and `allow_conflicts` is False.
+        Returns (event or None, conflicting events).
+        """
+        if end <= start:
+            raise ValueError("The event must end after it starts.")
+        with self._lock:
+            self._load()
+            conflicts = self._overlapping_events(start, end)
+            if conflicts and not allow_conflicts:
+                return None, conflicts
+            event = {
+                "id": uuid.uuid4().hex[:8],
+                "title": title,
+                "start": start.isoformat(timespec="minutes"),
+                "end": end.isoformat(timespec="minutes"),
+                "attendees": attendees or [],
+                "location": location,
+            }
+            self._index(event)
+            self._append({"op": "add", "event": event})
+        logger.info(f"Calendar event {event['id']} '{title}' stored ({event['start']} - {event['end']}).")
+        return event, conflicts
+
+    def remove_event(self, event_id: str) -> Optional[dict]:
+        with self._lock:
+            self._load()
+            event = self._unindex(event_id)
+            if event is None:
+                return None
+            self._append({"op": "remove", "id": event_id})
+        logger.info(f"Calendar event {event_id} removed.")
+        return event
+
+    def events_between(self, start: datetime, end: datetime) -> List[dict]:
+        return self.conflicts(start, end)
+
+    def free_slots(self, duration: timedelta, window_start: datetime, window_end: datetime,
+                   limit: int = None, working_hours: Tuple[int, int] = None) -> List[Tuple[datetime, datetime]]:
+        """
+        Earliest gaps of at least `duration` inside working hours between window_start and window_end.
+        One overlap query per day keeps the cost at O(days * log n + events in the window).
+        Returns up to `limit` (start, end) pairs whose start is aligned to the slot grid.
+        """
+        limit = limit or CALENDAR_SETTINGS["max_suggestions"]
+        first_hour, last_hour = working_hours or CALENDAR_SETTINGS["working_hours"]
+        step = timedelta(minutes=CALENDAR_SETTINGS["slot_step_minutes"])
+        slots = []
+
+        def aligned(moment: datetime) -> datetime:
+            day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+            steps = -(-(moment - day_start) // step) # Round up to the grid
+            return day_start + steps * step
+
+        with self._lock:
+            self._load()
+            day = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            while day < window_end and len(slots) < limit:
+                span_start = max(window_start, day + timedelta(hours=first_hour))
+                span_end = min(window_end, day + timedelta(hours=last_hour))
+                if span_end - span_start >= duration:
+                    cursor = aligned(span_start)
+                    # Busy intervals come back ordered by start, so a single sweep finds the gaps
+                    busy = [(datetime.fromtimestamp(s), datetime.fromtimestamp(e))
+                            for s, e, _ in self._tree.overlapping(span_start.timestamp(), span_end.timestamp())]
+                    for busy_start, busy_end in busy + [(span_end, span_end)]:
+                        if len(slots) >= limit:
+                            break
+                        if busy_start - cursor >= duration:
+                            slots.append((cursor, cursor + duration))
+                        cursor = max(cursor, aligned(busy_end))
+                day += timedelta(days=1)
+        return slots
+
+# Shared calendar instance
+local_calendar = CalendarStore()
@@ -0,0 +1,196 @@
+# calendar_tools.py
+# agentic_ai_framework/tools/calendar_tools.py
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+from tools import BaseTool
+from tools.calendar_store import local_calendar
+from tools.reminder_service import reminder_scheduler, session_owner
+from config import CALENDAR_SETTINGS
+from utils.time_parser import parse_datetime
+from utils.logger import setup_logger
+from pydantic import BaseModel, Field
+
+logger = setup_logger(__name__)
+
+def _format_event(event: dict) -> str:
+    details = f"[{event['id']}] '{event['title']}' {event['start']} - {event['end']}"
+    if event.get("location"):
+        details += f" at {event['location']}"
+    return details
+
+def _format_slots(slots) -> str:
+    return ", ".join(f"{start:%Y-%m-%d %H:%M} - {end:%H:%M}" for start, end in slots)
+
+class ScheduleEventArgs(BaseModel):
+    event_name: str = Field(..., description="The name or title of the event.")
+    start_time: str = Field(..., description="The start date and time of the event (e.g., '2025-06-15 10:00 AM', 'tomorrow 9 AM').")
+    end_time: str = Field(..., description="The end date and time of the event.")
+    attendees: List[str] = Field(None, description="Optional list of attendee email addresses.")
+    location: str = Field(None, description="Optional location for the event.")
+    allow_conflicts: bool = Field(False, description="Book the event even if it overlaps existing events.")
+
+async def schedule_event_func(event_name: str, start_time: str, end_time: str, attendees: List[str] = None,
+                              location: str = None, allow_conflicts: bool = False) -> str:
+    """
+    Books an event in the local calendar. If it overlaps existing events it is not booked (unless
+    `allow_conflicts`), and the reply lists the conflicts plus the nearest free slots of the same length.
+    """
+    logger.info(f"Attempting to schedule event: '{event_name}' from {start_time} to {end_time}")
+    try:
+        start, end = parse_datetime(start_time), parse_datetime(end_time)
+    except ValueError as e:
+        return f"Error: Could not understand the event time ({e}). Use a form like '2025-06-15 10:00 AM'."
+    try:
+        event, conflicts = await asyncio.to_thread(
+            local_calendar.add_event, event_name, start, end, attendees, location, allow_conflicts
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+    except OSError as e:
+        logger.error(f"Error saving calendar: {e}")
+        return f"Error scheduling event: {e}"
+
+    if event is None:
+        window_end = start + timedelta(days=CALENDAR_SETTINGS["search_days"])
+        slots = await asyncio.to_thread(local_calendar.free_slots, end - start, start, window_end)
+        reply = f"Not scheduled: '{event_name}' conflicts with " + "; ".join(_format_event(c) for c in conflicts) + "."
+        if slots:
+            reply += f" Nearest free slots: {_format_slots(slots)}."
+        return reply + " Call again with a free slot, or with allow_conflicts=true to double-book."
+
+    reply = f"Event '{event_name}' scheduled: {_format_event(event)}."
+    if conflicts:
+        reply += f" Note: overlaps {len(conflicts)} existing event(s)."
+    return reply
+
+ScheduleEventTool = BaseTool(
+    name="schedule_event",
+    description="Schedules a new event on the user's calendar with specified name, start time, end time, attendees, and location. Reports conflicts and suggests free slots instead of double-booking.",
+    func=schedule_event_func,
+    schema=ScheduleEventArgs.model_json_schema
+)
+
+class FindFreeSlotArgs(BaseModel):
+    duration_minutes: int = Field(..., description="Length of the slot needed, in minutes.")
+    window_start: str = Field(None, description="Earliest acceptable start (e.g., 'tomorrow 9 AM'). Defaults to now.")
+    window_end: str = Field(None, description="Latest acceptable end. Defaults to a week after window_start.")
+    max_results: int = Field(None, description="Maximum number of slots to return.")
+
+async def find_free_slot_func(duration_minutes: int, window_start: str = None, window_end: str = None, max_results: int = None) -> str:
+    """Finds the earliest free slots of the given length inside working hours."""
+    logger.info(f"Searching free slots of {duration_minutes} min between {window_start} and {window_end}")
+    try:
+        start = parse_datetime(window_start) if window_start else datetime.now()
+        end = parse_datetime(window_end) if window_end else start + timedelta(days=CALENDAR_SETTINGS["search_days"])
+    except ValueError as e:
+        return f"Error: Could not understand the search window ({e})."
+    if int(duration_minutes) <= 0 or end <= start:
+        return "Error: The duration must be positive and the window must end after it starts."
+
+    slots = await asyncio.to_thread(local_calendar.free_slots, timedelta(minutes=int(duration_minutes)), start, end,
+                                    int(max_results) if max_results else None)
+    if not slots:
+        return f"No free {duration_minutes}-minute slot between {start:%Y-%m-%d %H:%M} and {end:%Y-%m-%d %H:%M} within working hours."
+    return f"Free slots: {_format_slots(slots)}."
+
+FindFreeSlotTool = BaseTool(
+    name="find_free_slot",
+    description="Finds the earliest free time slots of a given duration in the user's calendar, within working hours.",
+    func=find_free_slot_func,
+    schema=FindFreeSlotArgs.model_json_schema
+)
+
+class ListEventsArgs(BaseModel):
+    start_time: str = Field(None, description="Start of the period to list (e.g., 'today'). Defaults to now.")
+    end_time: str = Field(None, description="End of the period. Defaults to one day after start_time.")
+
+async def list_events_func(start_time: str = None, end_time: str = None) -> str:
+    """Lists calendar events overlapping a period."""
+    try:
+        start = parse_datetime(start_time) if start_time else datetime.now()
+        end = parse_datetime(end_time) if end_time else start + timedelta(days=1)
+    except ValueError as e:
+        return f"Error: Could not understand the period ({e})."
+    events = await asyncio.to_thread(local_calendar.events_between, start, end)
+    if not events:
+        return f"No events between {start:%Y-%m-%d %H:%M} and {end:%Y-%m-%d %H:%M}."
+    return "Events:\n" + "\n".join(_format_event(event) for event in events)
+
+ListEventsTool = BaseTool(
+    name="list_events",
+    description="Lists the user's calendar events in a time period.",
+    func=list_events_func,
+    schema=ListEventsArgs.model_json_schema
+)
+
+class CancelEventArgs(BaseModel):
+    event_id: str = Field(..., description="ID of the event to cancel, as shown in brackets by list_events or schedule_event.")
+
+async def cancel_event_func(event_id: str) -> str:
+    """Removes an event from the calendar."""
+    try:
+        event = await asyncio.to_thread(local_calendar.remove_event, event_id.strip("[] "))
+    except OSError as e:
+        logger.error(f"Error saving calendar: {e}")
+        return f"Error cancelling event: {e}"
+    return f"Cancelled {_format_event(event)}." if event else f"Error: No event with ID '{event_id}'."
+
+CancelEventTool = BaseTool(
+    name="cancel_event",
+    description="Cancels a calendar event by its ID.",
+    func=cancel_event_func,
+    schema=CancelEventArgs.model_json_schema
+)
+
+class SetReminderArgs(BaseModel):
+    reminder_text: str = Field(..., description="The text for the reminder.")
+    time: str = Field(..., description="When the reminder should trigger (e.g., 'tomorrow 9 AM', 'in 30 minutes', '2025-07-01 14:00').")
+
+async def set_reminder_func(reminder_text: str, time: str) -> str:
+    """Parses the trigger time once and schedules the reminder for delivery to the current session."""
+    logger.info(f"Attempting to set reminder: '{reminder_text}' for {time}")
+    try:
+        due = parse_datetime(time)
+    except ValueError as e:
+        return f"Error: Could not understand the reminder time ({e}). Use a form like 'in 30 minutes' or '2025-07-01 14:00'."
+    if due <= datetime.now():
+        return f"Error: {due:%Y-%m-%d %H:%M} is in the past."
+    try:
+        reminder = reminder_scheduler.schedule(reminder_text, due.timestamp(), owner=session_owner())
+    except OSError as e:
+        logger.error(f"Error saving reminder: {e}")
+        return f"Error setting reminder: {e}"
+    return f"Reminder [{reminder['id']}] '{reminder_text}' set for {due:%Y-%m-%d %H:%M}."
+
+SetReminderTool = BaseTool(
+    name="set_reminder",
+    description="Sets a reminder with a specific text and trigger time. The reminder is delivered in this chat when it is due.",
+    func=set_reminder_func,
+    schema=SetReminderArgs.model_json_schema
+)
+
+class CancelReminderArgs(BaseModel):
+    reminder_id: str = Field(None, description="ID of the reminder to cancel, as shown in brackets by set_reminder. Omit to list pending reminders.")
+
+async def cancel_reminder_func(reminder_id: str = None) -> str:
+    """Cancels one of the user's pending reminders, or lists them when no ID is given."""
+    owner = session_owner()
+    if not reminder_id:
+        pending = reminder_scheduler.pending_for(owner)
+        if not pending:
+            return "No pending reminders."
+        return "Pending reminders:\n" + "\n".join(
+            f"[{r['id']}] '{r['text']}' at {datetime.fromtimestamp(r['due']):%Y-%m-%d %H:%M}" for r in pending
+        )
+    reminder = reminder_scheduler.cancel(reminder_id.strip("[] "), owner=owner)
+    if reminder is None:
+        return f"Error: No pending reminder with ID '{reminder_id}'."
+    return f"Cancelled reminder [{reminder['id']}] '{reminder['text']}'."
+
+CancelReminderTool = BaseTool(
+    name="cancel_reminder",
+    description="Cancels a pending reminder by its ID, or lists pending reminders if no ID is given.",
+    func=cancel_reminder_func,
+    schema=CancelReminderArgs.model_json_schema
+)
@@ -1,7 +1,10 @@
 # email_tools.py
 # agentic_ai_framework/tools/email_tools.py
 import asyncio
+from email.message import EmailMessage
 from tools import BaseTool
+from tools.mailbox_store import mailbox_index
+from tools.smtp_outbox import outbound_mailer
 from utils.logger import setup_logger
 from pydantic import BaseModel, Field
 
@@ -16,7 +19,8 @@ class SendEmailArgs(BaseModel):
 
 async def send_email_func(to_address: str, subject: str, body: str, cc_address: str = None, bcc_address: str = None) -> str:
     """
-    Simulates sending an email. In a real application, this would integrate with an email API (e.g., Gmail API, Microsoft Graph).
+    Queues an email on the outbound SMTP pool and returns as soon as it is queued.
+    Delivery happens in the background; use `check_email_status` with the returned ID to confirm it.
     """
     logger.info(f"Attempting to send email to: {to_address}")
     logger.info(f"Subject: {subject}")
@@ -24,46 +28,79 @@ async def send_email_func(to_address: str, subject: str, body: str, cc_address:
     if cc_address: logger.info(f"CC: {cc_address}")
     if bcc_address: logger.info(f"BCC: {bcc_address}")
 
-    await asyncio.sleep(2) # Simulate network delay for sending email
+    message = EmailMessage()
+    message["To"] = to_address
+    message["Subject"] = subject
+    if cc_address: message["Cc"] = cc_address
+    if bcc_address: message["Bcc"] = bcc_address
+    message.set_content(body)
 
-    return f"Email to {to_address} with subject '{subject}' simulated as sent. (Actual sending disabled for safety)"
+    try:
+        tracking_id = outbound_mailer.enqueue(message)
+    except asyncio.QueueFull:
+        logger.error("Outbound email queue is full.")
+        return "Error: The outbound email queue is full. Please try again shortly."
+    mode = " (Actual sending disabled for safety; delivery will be simulated)" if outbound_mailer.simulated else ""
+    return f"Email to {to_address} with subject '{subject}' queued for delivery. Tracking ID: {tracking_id}.{mode}"
 
 SendEmailTool = BaseTool(
     name="send_email",
-    description="Sends an email to a specified recipient with a subject and body. Can include CC and BCC.",
+    description="Sends an email to a specified recipient with a subject and body. Can include CC and BCC. "
+                "Returns immediately with a tracking ID once the email is queued.",
     func=send_email_func,
-    schema=SendEmailArgs.model_json_schema()
+    schema=SendEmailArgs.model_json_schema
+)
+
+class CheckEmailStatusArgs(BaseModel):
+    tracking_id: str = Field(..., description="The tracking ID returned by send_email.")
+
+async def check_email_status_func(tracking_id: str) -> str:
+    """Reports the delivery status of a queued email."""
+    status = outbound_mailer.get_status(tracking_id)
+    if not status:
+        return f"No email found with tracking ID {tracking_id}."
+    error = f" Last error: {status['error']}" if status.get("error") else ""
+    return f"Email {tracking_id} to {status['to']} ('{status['subject']}'): {status['status']} after {status['attempts']} attempt(s).{error}"
+
+CheckEmailStatusTool = BaseTool(
+    name="check_email_status",
+    description="Checks whether an email queued with send_email has been delivered, is still pending, or failed.",
+    func=check_email_status_func,
+    schema=CheckEmailStatusArgs.model_json_schema
 )
 
 class ReadEmailArgs(BaseModel):
-    query: str = Field(..., description="A query to search for emails (e.g., 'latest unread emails', 'emails from John Doe about project X').")
+    query: str = Field(..., description="A query to search for emails (e.g., 'latest unread emails', 'emails from John Doe about project X'). Supports from:NAME and subject:WORD.")
     max_results: int = Field(3, description="Maximum number of emails to retrieve.")
+    cursor: str = Field(None, description="Optional cursor from a previous result to fetch the next page.")
 
-async def read_email_func(query: str, max_results: int = 3) -> str:
+async def read_email_func(query: str, max_results: int = 3, cursor: str = None) -> str:
     """
-    Simulates reading emails based on a query. In a real application, this would integrate with an email API.
+    Searches the local mailbox (Maildir or mbox at MAILBOX_SETTINGS["path"]) through its inverted index,
+    newest messages first. Headers and bodies are only parsed for the returned page.
     """
     logger.info(f"Attempting to read emails with query: '{query}' (Max results: {max_results})")
-    await asyncio.sleep(2) # Simulate delay
-
-    mock_emails = [
-        {"from": "alice@example.com", "subject": "Project X Update", "body": "Hi team, the project is on track. Meeting next week."},
-        {"from": "bob@example.com", "subject": "Invoice 123 Ready", "body": "Your invoice is attached. Please review."},
-        {"from": "charlie@example.com", "subject": "Lunch Today?", "body": "Are you free for lunch today at 1 PM?"}
-    ]
-
-    found_emails = [e for e in mock_emails if query.lower() in (e['subject'] + e['body'] + e['from']).lower()]
+    try:
+        await asyncio.to_thread(mailbox_index.refresh)
+        keys, next_cursor = mailbox_index.search(query, k=int(max_results), cursor=cursor)
+        found_emails = await asyncio.to_thread(lambda: [mailbox_index.fetch(key) for key in keys])
+    except Exception as e:
+        logger.error(f"Error searching mailbox: {e}")
+        return f"Error reading emails: {e}"
 
+    found_emails = [email for email in found_emails if email]
     if found_emails:
         formatted_emails = []
-        for i, email in enumerate(found_emails[:max_results]):
-            formatted_emails.append(f"Email {i+1} - From: {email['from']}, Subject: {email['subject']}, Body: {email['body'][:50]}...")
+        for i, email in enumerate(found_emails):
+            formatted_emails.append(f"Email {i+1} - From: {email['from']}, Subject: {email['subject']}, Date: {email['date']}, Body: {email['body'][:50]}...")
+        if next_cursor:
+            formatted_emails.append(f"More results available: call again with cursor='{next_cursor}'.")
         return "Found emails:\n" + "\n".join(formatted_emails)
     return "No emails found matching your query."
 
 ReadEmailTool = BaseTool(
     name="read_email",
-    description="Reads emails based on a specified query and returns a summary of the top results.",
+    description="Reads emails based on a specified query and returns a summary of the top results, newest first.",
     func=read_email_func,
-    schema=ReadEmailArgs.model_json_schema()
+    schema=ReadEmailArgs.model_json_schema
 )
\ No newline at end of file
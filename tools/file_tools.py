@@ -1,8 +1,20 @@
 # file_tools.py
 # agentic_ai_framework/tools/file_tools.py
 import os
+import re
+import json
+import mmap
+import time
+import hashlib
 import asyncio
+import fnmatch
+import threading
+import mimetypes
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Tuple
 from tools import BaseTool
+from config import FILE_SETTINGS
 from utils.logger import setup_logger
 from pydantic import BaseModel, Field
 
@@ -10,14 +22,97 @@ logger = setup_logger(__name__)
 
 class ReadFileArgs(BaseModel):
     file_path: str = Field(..., description="The path to the file to read.")
+    offset: int = Field(None, description="Optional byte offset to start reading from.")
+    length: int = Field(None, description="Optional number of bytes to read from `offset`.")
+    start_line: int = Field(None, description="Optional first line to read (1-based, inclusive).")
+    end_line: int = Field(None, description="Optional last line to read (1-based, inclusive).")
+    max_bytes: int = Field(None, description="Optional cap on returned bytes; larger selections return a head and tail summary.")
 
-async def read_file_func(file_path: str) -> str:
-    """Reads the content of a text file."""
+# Read results keyed by (path, mtime, size, requested range); invalidated naturally when the file changes
+_read_cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+def _select_lines(buf, start_line: int, end_line: int) -> Tuple[int, int]:
+    """Returns the (start, end) byte offsets of lines start_line..end_line (1-based, inclusive) without splitting the whole file."""
+    start_line = max(start_line or 1, 1)
+    pos, line = 0, 1
+    while line < start_line:
+        newline = buf.find(b"\n", pos)
+        if newline == -1:
+            return len(buf), len(buf)
+        pos, line = newline + 1, line + 1
+    if end_line is None:
+        return pos, len(buf)
+    end = pos
+    while line <= end_line:
+        newline = buf.find(b"\n", end)
+        if newline == -1:
+            return pos, len(buf)
+        end, line = newline + 1, line + 1
+    return pos, end
+
+def _summarize(buf, start: int, end: int, max_bytes: int) -> str:
+    """
+    Decodes buf[start:end], replacing the middle with a marker if it exceeds max_bytes. Only the windows
+    that are returned get sliced, so a huge selection of a memory-mapped file is never copied whole.
+    """
+    if end - start <= max_bytes:
+        return bytes(buf[start:end]).decode("utf-8", errors="replace")
+    half = max_bytes // 2
+    omitted = end - start - 2 * half
+    return (
+        bytes(buf[start:start + half]).decode("utf-8", errors="replace")
+        + f"\n... [{omitted} bytes omitted; use offset/length or start_line/end_line to read more] ...\n"
+        + bytes(buf[end - half:end]).decode("utf-8", errors="replace")
+    )
+
+def _read_file_sync(file_path: str, size: int, offset: int, length: int, start_line: int, end_line: int, max_bytes: int) -> str:
+    """Blocking part of read_file; runs in a worker thread."""
+    with open(file_path, 'rb') as f:
+        if size == 0:
+            return ""
+        # Large files are memory-mapped so only the pages we touch are read.
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size >= FILE_SETTINGS["mmap_threshold_bytes"] else f.read()
+        try:
+            if b"\x00" in buf[:FILE_SETTINGS["binary_sniff_bytes"]]:
+                start = offset or 0
+                preview = bytes(buf[start:start + 64]).hex(" ")
+                mime_type = mimetypes.guess_type(file_path)[0] or "unknown type"
+                return f"Binary file ({mime_type}, {size} bytes). Hex preview at offset {start}: {preview}"
+
+            if start_line is not None or end_line is not None:
+                start, end = _select_lines(buf, start_line, end_line)
+            elif offset is not None or length is not None:
+                start = min(max(offset or 0, 0), len(buf))
+                end = min(start + length, len(buf)) if length is not None else len(buf)
+            else:
+                start, end = 0, len(buf)
+            return _summarize(buf, start, max(start, end), max_bytes)
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+async def read_file_func(file_path: str, offset: int = None, length: int = None, start_line: int = None,
+                         end_line: int = None, max_bytes: int = None) -> str:
+    """
+    Reads a text file, optionally a byte range (offset/length) or a line range (start_line/end_line).
+    Reads run off the event loop; selections larger than max_bytes come back as a head and tail summary.
+    """
+    max_bytes = max_bytes or FILE_SETTINGS["read_max_bytes"]
     try:
-        await asyncio.sleep(0.5) # Simulate delay
-        with open(file_path, 'r') as f:
-            content = f.read()
-        logger.info(f"Read content from file: {file_path}")
+        stat = await asyncio.to_thread(os.stat, file_path)
+        cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, offset, length, start_line, end_line, max_bytes)
+        cached = _read_cache.get(cache_key)
+        if cached is not None:
+            _read_cache.move_to_end(cache_key)
+            return cached
+
+        content = await asyncio.to_thread(
+            _read_file_sync, file_path, stat.st_size, offset, length, start_line, end_line, max_bytes
+        )
+        _read_cache[cache_key] = content
+        while len(_read_cache) > FILE_SETTINGS["read_cache_size"]:
+            _read_cache.popitem(last=False)
+        logger.info(f"Read content from file: {file_path} ({len(content)} chars returned of {stat.st_size} bytes)")
         return content
     except FileNotFoundError:
         logger.warning(f"File not found: {file_path}")
@@ -28,9 +123,10 @@ async def read_file_func(file_path: str) -> str:
 
 ReadFileTool = BaseTool(
     name="read_file",
-    description="Reads the content of a text file from the local file system.",
+    description="Reads the content of a text file from the local file system. Supports byte ranges (offset/length) "
+                "and line ranges (start_line/end_line); very large files return a head and tail summary.",
     func=read_file_func,
-    schema=ReadFileArgs.model_json_schema()
+    schema=ReadFileArgs.model_json_schema
 )
 
 class WriteFileArgs(BaseModel):
@@ -55,7 +151,7 @@ WriteFileTool = BaseTool(
     name="write_file",
     description="Writes or appends content to a file on the local file system.",
     func=write_file_func,
-    schema=WriteFileArgs.model_json_schema()
+    schema=WriteFileArgs.model_json_schema
 )
 
 class ListDirectoryArgs(BaseModel):
@@ -78,5 +174,182 @@ ListDirectoryTool = BaseTool(
     name="list_directory",
     description="Lists the files and subdirectories within a specified directory.",
     func=list_directory_func,
-    schema=ListDirectoryArgs.model_json_schema()
-)
\ No newline at end of file
+    schema=ListDirectoryArgs.model_json_schema
+)
+
+def _scan_dir(path: str) -> List[list]:
+    """Lists one directory as sorted [name, is_dir, size, mtime] rows (sorted so pagination is stable)."""
+    rows = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                stat = entry.stat(follow_symlinks=False)
+                rows.append([entry.name, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime])
+            except OSError:
+                continue # Vanished or unreadable entry
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+class FileIndex:
+    """
+    Persistent path index. Each directory's listing is stored with the directory's mtime; a refresh
+    only re-scans directories whose mtime changed, so repeated searches of a large tree cost one
+    stat per directory instead of a full walk. (File sizes/mtimes inside an unchanged directory
+    may lag until that directory changes.) Each indexed root has its own file, written only when
+    its directories changed, so refreshing one tree never rewrites the others. Safe to call from
+    several worker threads at once.
+    """
+    def __init__(self, index_dir: str = None):
+        self.index_dir = index_dir or FILE_SETTINGS["index_dir"]
+        self._roots = {} # Loaded lazily per root: {key: {"refreshed_at": float, "dirs": {path: {"mtime_ns": int, "rows": [...]}}}}
+        self._lock = threading.Lock() # Searches run in to_thread; refreshes and saves must not interleave
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.index_dir, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".json")
+
+    def _load(self, key: str) -> dict:
+        if key not in self._roots:
+            try:
+                with open(self._path(key), "r") as f:
+                    stored = json.load(f)
+                # refreshed_at is not persisted, so a new process re-stats the tree once before trusting it
+                self._roots[key] = {"refreshed_at": 0, "dirs": stored["dirs"]} if stored.get("key") == key else None
+            except (FileNotFoundError, ValueError, KeyError, TypeError):
+                self._roots[key] = None
+        return self._roots[key] or {"refreshed_at": 0, "dirs": {}}
+
+    def _save(self, key: str):
+        os.makedirs(self.index_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp" # Other processes sharing the index use their own
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "dirs": self._roots[key]["dirs"]}, f)
+        os.replace(tmp_path, path) # Atomic, so a crash never leaves a truncated index
+
+    def listings(self, root: str, include_hidden: bool) -> Dict[str, List[list]]:
+        """Returns {directory: rows} for the tree under `root`, refreshing changed directories if due."""
+        with self._lock:
+            return self._listings(root, include_hidden)
+
+    def _listings(self, root: str, include_hidden: bool) -> Dict[str, List[list]]:
+        root = os.path.abspath(root)
+        key = root + ("|hidden" if include_hidden else "") # Hidden dirs are only walked for indexes that include them
+        cached = self._load(key)
+        if time.time() - cached["refreshed_at"] < FILE_SETTINGS["index_refresh_seconds"]:
+            return {path: info["rows"] for path, info in cached["dirs"].items()}
+
+        old_dirs, new_dirs, rescanned = cached["dirs"], {}, 0
+        stack = [root]
+        while stack and len(new_dirs) < FILE_SETTINGS["index_max_dirs"]:
+            path = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            previous = old_dirs.get(path)
+            if previous is not None and previous["mtime_ns"] == mtime_ns:
+                rows = previous["rows"] # Unchanged directory: reuse its listing
+            else:
+                try:
+                    rows = _scan_dir(path)
+                except OSError:
+                    continue
+                rescanned += 1
+            new_dirs[path] = {"mtime_ns": mtime_ns, "rows": rows}
+            stack.extend(os.path.join(path, row[0]) for row in rows if row[1] and (include_hidden or not row[0].startswith(".")))
+
+        self._roots[key] = {"refreshed_at": time.time(), "dirs": new_dirs}
+        if rescanned or new_dirs.keys() != old_dirs.keys(): # Unchanged trees are not written back
+            self._save(key)
+        logger.info(f"File index for {root}: {len(new_dirs)} directories, {rescanned} rescanned.")
+        return {path: info["rows"] for path, info in new_dirs.items()}
+
+# Shared index instance
+file_index = FileIndex()
+
+def _search_files_sync(root: str, pattern: str, regex: str, max_depth: int, include_hidden: bool,
+                       offset: int, limit: int, use_index: bool) -> Tuple[List[list], bool]:
+    """Walks the tree depth-first and returns (matches for the requested page, has_more)."""
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise FileNotFoundError(root) # Otherwise a missing root would just yield no matches
+    listings = file_index.listings(root, include_hidden) if use_index else None
+    name_glob = pattern.lower() if pattern else None
+    path_regex = re.compile(regex, re.IGNORECASE) if regex else None
+
+    matches, skipped = [], 0
+    stack = [(root, 0)]
+    while stack:
+        path, depth = stack.pop()
+        try:
+            rows = listings.get(path, []) if listings is not None else _scan_dir(path)
+        except OSError:
+            continue
+        subdirs = []
+        for name, is_dir, size, mtime in rows:
+            if not include_hidden and name.startswith("."):
+                continue
+            full_path = os.path.join(path, name)
+            if is_dir and (max_depth is None or depth < max_depth):
+                subdirs.append((full_path, depth + 1))
+            relative = os.path.relpath(full_path, root)
+            if name_glob and not fnmatch.fnmatch(name.lower(), name_glob):
+                continue
+            if path_regex and not path_regex.search(relative):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            if len(matches) == limit:
+                return matches, True # Found one past the page: there is more
+            matches.append([relative, is_dir, size, mtime])
+        stack.extend(reversed(subdirs)) # Keep alphabetical order when popping
+    return matches, False
+
+class SearchFilesArgs(BaseModel):
+    root: str = Field(".", description="Directory to search under (defaults to current directory).")
+    pattern: str = Field(None, description="Optional case-insensitive glob matched against file names (e.g. '*q3*report*').")
+    regex: str = Field(None, description="Optional case-insensitive regular expression matched against the path relative to root.")
+    max_depth: int = Field(None, description="Optional maximum directory depth below root (0 = root only).")
+    include_hidden: bool = Field(False, description="If true, hidden files and directories are included.")
+    cursor: int = Field(0, description="Pagination cursor returned by a previous call (number of matches to skip).")
+    limit: int = Field(None, description="Maximum matches to return in this page.")
+    use_index: bool = Field(False, description="If true, use the persistent path index (fast repeated searches of large trees).")
+
+async def search_files_func(root: str = ".", pattern: str = None, regex: str = None, max_depth: int = None,
+                            include_hidden: bool = False, cursor: int = 0, limit: int = None, use_index: bool = False) -> str:
+    """Recursively searches a directory tree in one call, with filters, metadata and pagination."""
+    limit = limit or FILE_SETTINGS["search_page_size"]
+    cursor = int(cursor or 0)
+    try:
+        matches, has_more = await asyncio.to_thread(
+            _search_files_sync, root, pattern, regex, None if max_depth is None else int(max_depth),
+            include_hidden, cursor, int(limit), use_index
+        )
+    except FileNotFoundError:
+        logger.warning(f"Directory not found: {root}")
+        return "Error: Directory not found."
+    except re.error as e:
+        return f"Error: Invalid regular expression: {e}"
+    except Exception as e:
+        logger.error(f"Error searching files under {root}: {e}")
+        return f"Error searching files: {e}"
+
+    if not matches:
+        return "No matching files found." if cursor == 0 else "No more matching files."
+    lines = [
+        f"{relative}{'/' if is_dir else ''} | {'dir' if is_dir else f'{size} bytes'} | modified {datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M')}"
+        for relative, is_dir, size, mtime in matches
+    ]
+    header = f"Matches {cursor + 1}-{cursor + len(matches)} under {os.path.abspath(root)}:"
+    footer = f"\nMore results available: call again with cursor={cursor + len(matches)}." if has_more else ""
+    return header + "\n" + "\n".join(lines) + footer
+
+SearchFilesTool = BaseTool(
+    name="search_files",
+    description="Recursively searches a directory tree for files and folders by name glob and/or path regex, "
+                "returning paths with size and modification time. Use this instead of listing directories level by level.",
+    func=search_files_func,
+    schema=SearchFilesArgs.model_json_schema
+)
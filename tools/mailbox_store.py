@@ -0,0 +1,326 @@
+# mailbox_store.py
+# agentic_ai_framework/tools/mailbox_store.py
+import os
+import re
+import json
+import time
+import heapq
+import base64
+import bisect
+import mailbox
+import threading
+from array import array
+from email import policy
+from email.parser import BytesParser, BytesHeaderParser
+from email.header import decode_header, make_header
+from email.utils import parsedate_to_datetime
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+from config import MAILBOX_SETTINGS
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+") # Unicode letters and digits
+FIELD_PATTERN = re.compile(r"\b(from|subject):(\S+)", re.IGNORECASE)
+# Words that describe the search itself rather than the mail content ("latest unread emails from ...")
+QUERY_STOPWORDS = {
+    "a", "an", "the", "of", "to", "for", "and", "or", "in", "on", "at", "about", "from", "with", "is", "are",
+    "me", "my", "any", "all", "show", "find", "get", "email", "emails", "mail", "mails", "message", "messages",
+    "latest", "recent", "unread", "new", "last",
+}
+
+# Messages used to seed an empty local mailbox so the tool works out of the box
+DEMO_MESSAGES = [
+    ("alice@example.com", "Project X Update", "Hi team, the project is on track. Meeting next week."),
+    ("bob@example.com", "Invoice 123 Ready", "Your invoice is attached. Please review."),
+    ("charlie@example.com", "Lunch Today?", "Are you free for lunch today at 1 PM?"),
+]
+
+def _tokens(text: str) -> set:
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+def _header_text(value) -> str:
+    """Decodes RFC 2047 encoded words in a compat32 header value."""
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (LookupError, ValueError):
+        return str(value)
+
+def _body_text(message, max_chars: int) -> str:
+    """Plain-text body (first text/plain part, else first text part), truncated. Works on compat32 messages."""
+    fallback = None
+    for part in message.walk():
+        if part.get_content_maintype() != "text":
+            continue
+        if part.get_content_subtype() == "plain":
+            fallback = part
+            break
+        fallback = fallback or part
+    if fallback is None:
+        return ""
+    payload = fallback.get_payload(decode=True) or b""
+    return payload.decode(fallback.get_content_charset() or "utf-8", errors="replace")[:max_chars]
+
+class MboxScanner:
+    """
+    Read-only access to an mbox file whose table of contents is extended incrementally: a refresh
+    scans only from the start of the last known message (whose end may have moved) to the end of
+    the file, instead of reopening and rescanning the whole file like mailbox.mbox. Keys are
+    message start offsets, which stay valid while the file is only appended to. If the file was
+    replaced, truncated or rewritten, the table is rebuilt and `refresh` returns True.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._toc: Dict[int, int] = {} # start offset -> stop offset
+        self._identity = None
+        self._scanned = 0
+        self._last_start: Optional[int] = None
+
+    def refresh(self) -> bool:
+        stat = os.stat(self.path)
+        identity = (stat.st_dev, stat.st_ino)
+        reset = identity != self._identity or stat.st_size < self._scanned or not self._last_message_intact()
+        if reset:
+            self._toc, self._scanned, self._last_start, self._identity = {}, 0, None, identity
+        elif stat.st_size == self._scanned:
+            return False
+        resume = self._last_start if self._last_start is not None else 0
+        self._toc.pop(resume, None)
+        toc = dict(self._toc)
+        with open(self.path, "rb") as f:
+            f.seek(resume)
+            start, last_was_empty = None, False
+            while True:
+                line_pos = f.tell()
+                line = f.readline()
+                if line.startswith(b"From ") or not line:
+                    if start is not None:
+                        toc[start] = line_pos - 1 if last_was_empty else line_pos # Drop the separating blank line
+                    if not line:
+                        break
+                    start = line_pos
+                    last_was_empty = False
+                else:
+                    last_was_empty = line == b"\n"
+            self._scanned = f.tell()
+        self._last_start = start
+        self._toc = toc # Swapped whole, so concurrent get_bytes calls see the old or the new table
+        return reset
+
+    def _last_message_intact(self) -> bool:
+        if self._last_start is None:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(self._last_start)
+            return f.read(5) == b"From "
+
+    def keys(self) -> List[int]:
+        return list(self._toc)
+
+    def get_bytes(self, key: int) -> bytes:
+        stop = self._toc[key] # KeyError if the message is gone
+        with open(self.path, "rb") as f:
+            f.seek(key)
+            f.readline() # The "From " separator line is not part of the message
+            return f.read(stop - f.tell())
+
+class _IndexSnapshot:
+    """One immutable version of the index; `refresh` builds a new one and swaps it in."""
+    __slots__ = ("keys", "order", "postings")
+
+    def __init__(self, keys: List, order: List[Tuple[float, str]], postings: Dict[str, array]):
+        self.keys = keys # doc_id -> mailbox key
+        self.order = order # doc_id -> (timestamp, str(key)), ascending; the position cursors refer to
+        self.postings = postings # term -> ascending doc IDs
+
+class MailboxIndex:
+    """
+    Inverted index over a local Maildir or mbox store.
+    Document IDs are assigned in (date, key) order, so every postings list (token -> array of IDs) is
+    date-sorted and newest-first top-k is a reverse scan of the shortest list with binary-search
+    membership checks against the others. Only the key and sort position are kept per message; headers
+    and bodies of hits are parsed lazily when results are formatted.
+    Searches read an immutable snapshot without locking; `refresh` (serialized by a lock, in a worker
+    thread) builds the next snapshot copy-on-write and swaps it in. Results are mailbox keys and
+    cursors encode a (date, key) position, so both stay valid when a late-arriving older message
+    makes a refresh renumber the documents.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or MAILBOX_SETTINGS["path"]
+        self._mailbox = None # mailbox.Maildir or MboxScanner
+        self._snapshot = _IndexSnapshot([], [], {})
+        self._indexed_keys = set()
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._mailbox is not None:
+            return self._mailbox
+        if os.path.isfile(self.path):
+            self._mailbox = MboxScanner(self.path)
+        else:
+            seed = not os.path.exists(self.path)
+            self._mailbox = mailbox.Maildir(self.path, create=True)
+            if seed:
+                for sender, subject, body in DEMO_MESSAGES:
+                    msg = EmailMessage()
+                    msg["From"], msg["To"], msg["Subject"] = sender, "me@example.com", subject
+                    msg["Date"] = time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime())
+                    msg.set_content(body)
+                    self._mailbox.add(msg)
+                logger.info(f"Seeded new local mailbox at {self.path} with {len(DEMO_MESSAGES)} demo messages.")
+        return self._mailbox
+
+    def refresh(self, force: bool = False) -> int:
+        """Indexes messages added since the last refresh. Blocking; call from a worker thread."""
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < MAILBOX_SETTINGS["refresh_seconds"]:
+                return 0
+            box = self._open()
+            snapshot = self._snapshot
+            if isinstance(box, MboxScanner) and box.refresh(): # The file was rewritten: its keys mean other messages now
+                snapshot, self._indexed_keys = _IndexSnapshot([], [], {}), set()
+            new_docs = []
+            for key in box.keys():
+                if key in self._indexed_keys:
+                    continue
+                try:
+                    # compat32 parsing is several times faster than policy.default and enough for indexing
+                    message = BytesParser(policy=policy.compat32).parsebytes(box.get_bytes(key))
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable message {key}: {e}")
+                    continue
+                try:
+                    timestamp = parsedate_to_datetime(message["Date"]).timestamp()
+                except (TypeError, ValueError):
+                    timestamp = 0.0
+                terms = {f"from:{t}" for t in _tokens(_header_text(message["From"]))}
+                terms |= {f"subject:{t}" for t in _tokens(_header_text(message["Subject"]))}
+                terms |= {t.split(":", 1)[1] for t in terms}
+                terms |= _tokens(_body_text(message, MAILBOX_SETTINGS["max_body_chars"]))
+                new_docs.append(((timestamp, str(key)), key, terms))
+                self._indexed_keys.add(key)
+            self._refreshed_at = time.monotonic()
+            if not new_docs and snapshot is self._snapshot:
+                return 0
+
+            new_docs.sort(key=lambda doc: doc[0])
+            if snapshot.order and new_docs and new_docs[0][0] < snapshot.order[-1]:
+                snapshot = self._rebuilt(snapshot, new_docs) # An older message arrived late: re-sort everything once
+            else:
+                snapshot = self._appended(snapshot, new_docs)
+            self._snapshot = snapshot
+            logger.info(f"Mailbox index: {len(new_docs)} new message(s), {len(snapshot.keys)} total.")
+            return len(new_docs)
+
+    @staticmethod
+    def _appended(snapshot: _IndexSnapshot, new_docs: List[Tuple[Tuple[float, str], object, set]]) -> _IndexSnapshot:
+        """The next snapshot with `new_docs` (all sorting after the existing ones) added; only touched postings are copied."""
+        keys, order, postings = list(snapshot.keys), list(snapshot.order), dict(snapshot.postings)
+        copied = set()
+        for position, key, terms in new_docs:
+            doc_id = len(keys)
+            keys.append(key)
+            order.append(position)
+            for term in terms:
+                if term not in copied:
+                    postings[term] = array("I", postings.get(term, ()))
+                    copied.add(term)
+                postings[term].append(doc_id)
+        return _IndexSnapshot(keys, order, postings)
+
+    @classmethod
+    def _rebuilt(cls, snapshot: _IndexSnapshot, new_docs: List[Tuple[Tuple[float, str], object, set]]) -> _IndexSnapshot:
+        terms_by_doc: Dict[int, List[str]] = {}
+        for term, postings in snapshot.postings.items():
+            for doc_id in postings:
+                terms_by_doc.setdefault(doc_id, []).append(term)
+        docs = [(snapshot.order[i], snapshot.keys[i], terms_by_doc.get(i, [])) for i in range(len(snapshot.keys))] + new_docs
+        docs.sort(key=lambda doc: doc[0])
+        return cls._appended(_IndexSnapshot([], [], {}), docs)
+
+    @staticmethod
+    def _contains(postings: array, doc_id: int) -> bool:
+        i = bisect.bisect_left(postings, doc_id)
+        return i < len(postings) and postings[i] == doc_id
+
+    def _query_terms(self, query: str) -> List[str]:
+        terms = []
+        for field, value in FIELD_PATTERN.findall(query):
+            terms += [f"{field.lower()}:{t}" for t in _tokens(value)]
+        terms += [t for t in _tokens(FIELD_PATTERN.sub(" ", query)) if t not in QUERY_STOPWORDS]
+        return terms
+
+    def search(self, query: str, k: int = 3, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+        """
+        Returns (mailbox keys newest first, next cursor). All terms must match; if that finds nothing,
+        any term may match. An empty query lists the newest messages.
+        """
+        snapshot = self._snapshot # One consistent version for the whole search
+        if cursor:
+            timestamp, key = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            before = bisect.bisect_left(snapshot.order, (timestamp, key))
+        else:
+            before = len(snapshot.keys)
+        terms = self._query_terms(query)
+        lists = [snapshot.postings.get(term, array("I")) for term in terms]
+
+        if not terms:
+            hits = list(range(before - 1, -1, -1)[:k + 1])
+        else:
+            lists.sort(key=len)
+            hits = self._scan(lists[0], lists[1:], before, k + 1)
+            if not hits and len(lists) > 1: # Fall back to matching any term
+                hits = self._merge_any(lists, before, k + 1)
+
+        next_cursor = None
+        if len(hits) > k:
+            hits = hits[:k]
+            next_cursor = base64.urlsafe_b64encode(json.dumps(snapshot.order[hits[-1]]).encode()).decode()
+        return [snapshot.keys[doc_id] for doc_id in hits], next_cursor
+
+    def _scan(self, shortest: array, others: List[array], before: int, limit: int) -> List[int]:
+        hits = []
+        i = bisect.bisect_left(shortest, before) - 1
+        while i >= 0 and len(hits) < limit:
+            doc_id = shortest[i]
+            if all(self._contains(other, doc_id) for other in others):
+                hits.append(doc_id)
+            i -= 1
+        return hits
+
+    @staticmethod
+    def _merge_any(lists: List[array], before: int, limit: int) -> List[int]:
+        """Newest `limit` doc IDs in any of the lists: a lazy k-way merge from each list's end, not a full union."""
+        def newest_first(postings: array):
+            for i in range(bisect.bisect_left(postings, before) - 1, -1, -1):
+                yield postings[i]
+        hits = []
+        for doc_id in heapq.merge(*(newest_first(postings) for postings in lists), reverse=True):
+            if not hits or hits[-1] != doc_id:
+                hits.append(doc_id)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def fetch(self, key, body_chars: int = 50) -> Optional[Dict[str, str]]:
+        """Parses headers (and a body snippet) of one hit, by the mailbox key `search` returned. Blocking."""
+        box = self._open()
+        try:
+            raw = box.get_bytes(key)
+        except KeyError:
+            return None # Deleted since it was indexed
+        headers = BytesHeaderParser(policy=policy.default).parsebytes(raw)
+        body = _body_text(BytesParser(policy=policy.compat32).parsebytes(raw), body_chars) if body_chars else ""
+        return {
+            "from": str(headers["From"] or ""),
+            "subject": str(headers["Subject"] or ""),
+            "date": str(headers["Date"] or ""),
+            "body": body.strip(),
+        }
+
+# Shared index for the read_email tool
+mailbox_index = MailboxIndex()
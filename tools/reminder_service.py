@@ -0,0 +1,315 @@
+# reminder_service.py
+# agentic_ai_framework/tools/reminder_service.py
+import os
+import json
+import time
+import uuid
+import heapq
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional, Set
+from config import REMINDER_SETTINGS
+from utils.events import current_sink
+from utils.metrics import percentiles
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def session_owner() -> Optional[str]:
+    """Owner key for reminders created by the current request, as reported by its event sink. None outside a request."""
+    return current_sink().session_owner()
+
+class ReminderScheduler:
+    """
+    In-process reminder timer. Pending reminders sit in a min-heap of (due timestamp, sequence, id)
+    next to an id -> reminder dict. Insert is O(log n), and cancel is O(1) because it only drops the dict
+    entry; stale heap entries are skipped when they reach the top and purged once they outnumber live ones.
+    One asyncio task sleeps until the earliest due time and is woken early when a sooner reminder arrives.
+
+    State survives restarts through an append-only JSONL journal (add/cancel/fire records, plus
+    hold/deliver for reminders that fired while their owner was offline) that is replayed on start and
+    compacted when it grows. Journal I/O never runs on the event loop: records
+    are buffered and a single writer task appends them, and compacts, in a worker thread. Fired
+    reminders are put on the queues of all open sessions of their owner (e.g. several browser tabs).
+    If the owner has no open session, they are held, across restarts too, for the next one.
+    """
+    def __init__(self, journal_path: str = None):
+        self.journal_path = journal_path or REMINDER_SETTINGS["journal_path"]
+        self._heap: List[tuple] = []
+        self._pending: Dict[str, dict] = {}
+        self._sequence = 0
+        self._journal = None # Only touched by the writer task's worker thread
+        self._journal_buffer: List[dict] = [] # Records not yet handed to the writer
+        self._journal_records = 0
+        self._compact_requested = False
+        self._loaded = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._writer_wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._closing = False
+        self._sessions: Dict[str, Set[asyncio.Queue]] = {} # owner -> delivery queues of its open sessions
+        self._undelivered: Dict[str, deque] = {}
+        self._schedule_overhead_ms = deque(maxlen=REMINDER_SETTINGS["metrics_window"])
+        self._lateness_ms = deque(maxlen=REMINDER_SETTINGS["metrics_window"])
+        self._fired = 0
+        self._last_report = time.monotonic()
+
+    # --- Persistence ---
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        records = 0
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue # Torn final line after a crash
+                    records += 1
+                    if record["op"] == "add":
+                        self._push(record["reminder"])
+                    elif record["op"] == "hold":
+                        reminder = self._pending.pop(record["id"], None)
+                        if reminder is not None:
+                            self._hold(reminder)
+                    elif record["op"] == "deliver":
+                        held = self._undelivered.get(record.get("owner"), ())
+                        for reminder in [r for r in held if r["id"] == record["id"]]:
+                            held.remove(reminder)
+                    else: # "cancel" or "fire"
+                        self._pending.pop(record["id"], None)
+        except FileNotFoundError:
+            pass
+        self._journal_records = records
+        self._compact_heap()
+        logger.info(f"Reminder journal replayed: {len(self._pending)} pending and {sum(map(len, self._undelivered.values()))} "
+                    f"undelivered reminders from {records} records.")
+        self._compact_requested = records > max(64, REMINDER_SETTINGS["compact_ratio"] * self._live_records())
+
+    def _live_records(self) -> int:
+        """Records a compacted journal holds: one per pending reminder, two (add + hold) per held one."""
+        return len(self._pending) + 2 * sum(len(held) for held in self._undelivered.values())
+
+    def _append(self, record: dict):
+        """Queues a journal record for the writer task. Never blocks the event loop."""
+        self._journal_buffer.append(record)
+        self._journal_records += 1
+        if self._writer_wakeup is not None:
+            self._writer_wakeup.set()
+
+    async def _run_writer(self):
+        """The only code that touches the journal file; each batch is written in a worker thread."""
+        while True:
+            await self._writer_wakeup.wait()
+            self._writer_wakeup.clear()
+            try:
+                await self._flush_journal()
+            except Exception as e:
+                logger.error(f"Reminder journal write failed: {e}")
+                await asyncio.sleep(1) # Buffered records are kept and retried
+                self._writer_wakeup.set()
+            if self._closing and not self._journal_buffer:
+                await asyncio.to_thread(self._close_journal)
+                return
+
+    async def _flush_journal(self):
+        if self._compact_requested or self._journal_records > max(1024, REMINDER_SETTINGS["compact_ratio"] * self._live_records()):
+            # The snapshot already reflects every buffered record, so those are dropped, not written
+            snapshot = list(self._pending.values())
+            held = [reminder for queue in self._undelivered.values() for reminder in queue]
+            self._journal_buffer, self._journal_records, self._compact_requested = [], len(snapshot) + 2 * len(held), False
+            await asyncio.to_thread(self._rewrite_journal, snapshot, held)
+        if self._journal_buffer:
+            records, self._journal_buffer = self._journal_buffer, []
+            try:
+                await asyncio.to_thread(self._write_records, records)
+            except BaseException:
+                self._journal_buffer[:0] = records
+                raise
+
+    def _write_records(self, records: List[dict]):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            self._journal = open(self.journal_path, "a")
+        self._journal.write("".join(json.dumps(record) + "\n" for record in records))
+        self._journal.flush() # Every batch reaches the OS
+
+    def _rewrite_journal(self, reminders: List[dict], held: List[dict]):
+        """Rewrites the journal as one "add" record per pending reminder, plus "add" + "hold" per held one. Blocking."""
+        self._close_journal()
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for reminder in reminders:
+                f.write(json.dumps({"op": "add", "reminder": reminder}) + "\n")
+            for reminder in held:
+                f.write(json.dumps({"op": "add", "reminder": reminder}) + "\n")
+                f.write(json.dumps({"op": "hold", "id": reminder["id"]}) + "\n")
+        os.replace(tmp_path, self.journal_path) # Atomic, so a crash keeps either the old or the new journal
+        logger.info(f"Reminder journal compacted to {len(reminders) + 2 * len(held)} records.")
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    # --- Heap ---
+
+    def _push(self, reminder: dict):
+        self._pending[reminder["id"]] = reminder
+        self._sequence += 1
+        heapq.heappush(self._heap, (reminder["due"], self._sequence, reminder["id"]))
+
+    def _compact_heap(self):
+        """Drops heap entries of cancelled or fired reminders once they dominate the heap."""
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._heap = [entry for entry in self._heap if entry[2] in self._pending]
+            heapq.heapify(self._heap)
+
+    # --- Public API ---
+
+    def start(self):
+        """Starts the timer task on the running event loop (idempotent)."""
+        self._load()
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            self._writer_wakeup = asyncio.Event()
+            self._writer = asyncio.create_task(self._run_writer())
+            if self._compact_requested:
+                self._writer_wakeup.set()
+            logger.info("Reminder scheduler started.")
+
+    def schedule(self, text: str, due: float, owner: str = None) -> dict:
+        """Adds a reminder due at the absolute Unix timestamp `due` and returns it."""
+        started = time.perf_counter()
+        self.start()
+        reminder = {"id": uuid.uuid4().hex[:12], "text": text, "due": due, "owner": owner, "created": time.time()}
+        was_next = not self._heap or due < self._heap[0][0]
+        self._push(reminder)
+        self._append({"op": "add", "reminder": reminder})
+        if was_next:
+            self._wakeup.set() # The timer task is sleeping toward a later reminder
+        self._schedule_overhead_ms.append((time.perf_counter() - started) * 1000)
+        return reminder
+
+    def cancel(self, reminder_id: str, owner: str = None) -> Optional[dict]:
+        """Cancels a pending reminder. If `owner` is given, only that owner's reminders can be cancelled."""
+        self._load()
+        reminder = self._pending.get(reminder_id)
+        if reminder is None or (owner is not None and reminder.get("owner") not in (owner, None)):
+            return None
+        del self._pending[reminder_id]
+        self._append({"op": "cancel", "id": reminder_id})
+        self._compact_heap()
+        return reminder
+
+    def pending_for(self, owner: str = None) -> List[dict]:
+        """Pending reminders of one owner, soonest first. O(n); meant for listing, not the hot path."""
+        self._load()
+        return sorted((r for r in self._pending.values() if owner is None or r.get("owner") == owner), key=lambda r: r["due"])
+
+    def register_session(self, owner: str) -> asyncio.Queue:
+        """
+        Returns a new queue fired reminders for `owner` are delivered to, pre-filled with any held while
+        offline. Each open session (tab) of an owner has its own queue and receives every reminder.
+        """
+        self._load()
+        queue = asyncio.Queue()
+        for reminder in self._undelivered.pop(owner, ()):
+            queue.put_nowait(reminder)
+            self._append({"op": "deliver", "id": reminder["id"], "owner": owner})
+        self._sessions.setdefault(owner, set()).add(queue)
+        return queue
+
+    def unregister_session(self, owner: str, queue: asyncio.Queue = None):
+        """Removes one session's queue (or, without `queue`, all of the owner's); the others keep receiving."""
+        queues = self._sessions.get(owner)
+        if queues is None:
+            return
+        if queue is None:
+            queues.clear()
+        else:
+            queues.discard(queue)
+        if not queues:
+            del self._sessions[owner]
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "pending": len(self._pending),
+            "heap_entries": len(self._heap),
+            "fired": self._fired,
+            "schedule_overhead_ms": percentiles(list(self._schedule_overhead_ms)),
+            "lateness_ms": percentiles(list(self._lateness_ms)),
+        }
+
+    # --- Timer loop ---
+
+    def _deliver(self, reminder: dict) -> bool:
+        """Puts a fired reminder on its owner's session queues. Returns False if it had to be held instead."""
+        queues = self._sessions.get(reminder.get("owner"))
+        if queues:
+            for queue in queues:
+                queue.put_nowait(reminder)
+            return True
+        self._hold(reminder)
+        logger.info(f"Reminder {reminder['id']} fired with no open session for its owner; holding it for the next one.")
+        return False
+
+    def _hold(self, reminder: dict):
+        held = self._undelivered.setdefault(reminder.get("owner"), deque(maxlen=REMINDER_SETTINGS["max_undelivered_per_owner"]))
+        held.append(reminder)
+
+    def _fire_due(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, reminder_id = heapq.heappop(self._heap)
+            reminder = self._pending.pop(reminder_id, None)
+            if reminder is None:
+                continue # Cancelled, or a stale duplicate
+            self._lateness_ms.append(max(0.0, (now - reminder["due"]) * 1000))
+            self._fired += 1
+            # "fire" only once it reached a session; a held reminder is journaled as such so a restart keeps it
+            self._append({"op": "fire" if self._deliver(reminder) else "hold", "id": reminder_id})
+
+    async def _run(self):
+        while True:
+            try:
+                self._wakeup.clear()
+                self._fire_due()
+                if time.monotonic() - self._last_report >= REMINDER_SETTINGS["report_interval_seconds"] and self._fired:
+                    self._last_report = time.monotonic()
+                    logger.info(f"Reminder scheduler metrics: {self.report()}")
+                timeout = max(0.0, self._heap[0][0] - time.time()) if self._heap else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reminder scheduler loop error: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer is not None:
+            # Let the writer flush what is buffered and close the file itself
+            self._closing = True
+            self._writer_wakeup.set()
+            await self._writer
+            self._writer = None
+
+# Shared scheduler instance
+reminder_scheduler = ReminderScheduler()
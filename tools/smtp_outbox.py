@@ -0,0 +1,200 @@
+# smtp_outbox.py
+# agentic_ai_framework/tools/smtp_outbox.py
+import time
+import uuid
+import smtplib
+import asyncio
+import contextvars
+from collections import OrderedDict
+from email.message import EmailMessage
+from email.utils import make_msgid, formatdate
+from typing import Any, Dict, List, Optional, Tuple
+from config import SMTP_SETTINGS
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class SMTPConnection:
+    """A persistent SMTP session that reconnects when it has been idle too long or was dropped. Blocking."""
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        self.close()
+        smtp = smtplib.SMTP(self.settings["host"], self.settings["port"], timeout=self.settings["timeout_seconds"])
+        if self.settings["use_tls"]:
+            smtp.starttls()
+        if self.settings["username"]:
+            smtp.login(self.settings["username"], self.settings["password"] or "")
+        self._smtp = smtp
+
+    def send(self, message: EmailMessage) -> Dict[str, Any]:
+        """Sends one message. Returns the recipients the server refused (empty if all were accepted)."""
+        if self._smtp is None or time.monotonic() - self._last_used > self.settings["idle_reconnect_seconds"]:
+            self._connect()
+        try:
+            refused = self._smtp.send_message(message) # Bcc headers are stripped by smtplib
+        except smtplib.SMTPServerDisconnected:
+            self._connect() # Server closed the idle session; retry once on a fresh one
+            refused = self._smtp.send_message(message)
+        self._last_used = time.monotonic()
+        return refused or {}
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._smtp = None
+
+class OutboundMailer:
+    """
+    Bounded async send queue drained by a pool of workers, each owning one persistent SMTP
+    connection. Workers send messages in batches over their connection and retry transient
+    failures with exponential backoff. `enqueue` returns immediately with a tracking ID;
+    delivery status is available through `get_status`.
+    """
+    def __init__(self, settings: Dict[str, Any] = None):
+        self.settings = dict(settings or SMTP_SETTINGS)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._statuses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @property
+    def simulated(self) -> bool:
+        return not self.settings["host"]
+
+    def _ensure_started(self):
+        # Created lazily so the queue and workers belong to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.settings["queue_size"])
+            # A fresh context: the workers live as long as the process and must not keep the first caller's
+            # deadline, sink or trace span alive
+            self._workers = [contextvars.Context().run(asyncio.create_task, self._worker(i)) for i in range(self.settings["pool_size"])]
+            logger.info(f"Outbound mailer started with {self.settings['pool_size']} worker(s){' (simulated delivery)' if self.simulated else ''}.")
+
+    def enqueue(self, message: EmailMessage) -> str:
+        """Queues a message and returns its tracking ID. Raises asyncio.QueueFull if the outbox is full."""
+        self._ensure_started()
+        tracking_id = uuid.uuid4().hex[:12]
+        if "From" not in message:
+            message["From"] = self.settings["sender"]
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid()
+        self._queue.put_nowait((tracking_id, message, 0))
+        self._set_status(tracking_id, status="queued", to=message["To"], subject=message["Subject"], attempts=0, error=None)
+        return tracking_id
+
+    def get_status(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        return self._statuses.get(tracking_id)
+
+    def _set_status(self, tracking_id: str, **fields):
+        entry = self._statuses.setdefault(tracking_id, {})
+        entry.update(fields, updated_at=time.time())
+        self._statuses.move_to_end(tracking_id)
+        while len(self._statuses) > self.settings["status_history"]:
+            self._statuses.popitem(last=False)
+
+    async def _next_batch(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.settings["batch_wait_seconds"]
+        while len(batch) < self.settings["batch_size"]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self, worker_id: int):
+        connection = SMTPConnection(self.settings)
+        try:
+            while True:
+                batch = await self._next_batch()
+                try:
+                    for tracking_id, _, attempts in batch:
+                        self._set_status(tracking_id, status="sending", attempts=attempts + 1)
+                    results = await asyncio.to_thread(self._send_batch, connection, [message for _, message, _ in batch])
+                    for (tracking_id, message, attempts), (error, refused) in zip(batch, results):
+                        self._handle_result(tracking_id, message, attempts + 1, error, refused)
+                except Exception as e:
+                    # Keep the worker alive: losing it would silently shrink the pool
+                    logger.error(f"Outbound mail worker {worker_id} failed on a batch: {e}", exc_info=True)
+                    for tracking_id, _, _ in batch:
+                        if (self.get_status(tracking_id) or {}).get("status") == "sending":
+                            self._set_status(tracking_id, status="failed", error=str(e))
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    def _send_batch(self, connection: SMTPConnection, messages: List[EmailMessage]) -> List[Tuple[Optional[Exception], Dict[str, Any]]]:
+        """
+        Sends messages back-to-back on one connection. Returns (error or None, refused recipients) per
+        message; one message failing, for whatever reason, does not stop the rest. Blocking.
+        """
+        results = []
+        for message in messages:
+            if self.simulated:
+                logger.info(f"Simulated delivery to {message['To']}: '{message['Subject']}' (Actual sending disabled for safety)")
+                results.append((None, {}))
+                continue
+            try:
+                results.append((None, connection.send(message)))
+            except Exception as e: # SMTP/network errors, but also e.g. a header that cannot be encoded
+                connection.close() # Start the next message on a clean session
+                results.append((e, {}))
+        return results
+
+    def _handle_result(self, tracking_id: str, message: EmailMessage, attempts: int, error: Optional[Exception],
+                       refused: Dict[str, Any] = None):
+        if error is None and refused:
+            # Not retried: the accepted recipients already have the message
+            refused_text = ", ".join(f"{address} ({code} {reply.decode(errors='replace') if isinstance(reply, bytes) else reply})"
+                                     for address, (code, reply) in refused.items())
+            self._set_status(tracking_id, status="partially_delivered", error=f"Refused recipients: {refused_text}")
+            logger.warning(f"Email {tracking_id} to {message['To']} delivered, but refused for: {refused_text}")
+            return
+        if error is None:
+            self._set_status(tracking_id, status="simulated" if self.simulated else "delivered", error=None)
+            logger.info(f"Email {tracking_id} to {message['To']} {'simulated' if self.simulated else 'delivered'}.")
+            return
+        permanent = isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError)) \
+            or (isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600) \
+            or not isinstance(error, (smtplib.SMTPException, OSError)) # Malformed message: a retry fails the same way
+        if permanent or attempts >= self.settings["max_retries"]:
+            self._set_status(tracking_id, status="failed", error=str(error))
+            logger.error(f"Email {tracking_id} to {message['To']} failed after {attempts} attempt(s): {error}")
+            return
+        delay = self.settings["retry_backoff_seconds"] * (2 ** (attempts - 1))
+        self._set_status(tracking_id, status="retrying", error=str(error))
+        logger.warning(f"Email {tracking_id} attempt {attempts} failed ({error}); retrying in {delay:.1f}s.")
+        asyncio.get_running_loop().call_later(delay, self._requeue, tracking_id, message, attempts)
+
+    def _requeue(self, tracking_id: str, message: EmailMessage, attempts: int):
+        try:
+            self._queue.put_nowait((tracking_id, message, attempts))
+        except asyncio.QueueFull:
+            self._set_status(tracking_id, status="failed", error="Outbox full while retrying.")
+
+    async def flush(self):
+        """Waits until every queued message has been attempted (retries scheduled later are not awaited)."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers, self._queue = [], None
+
+# Shared outbox used by the send_email tool
+outbound_mailer = OutboundMailer()
@@ -1,10 +1,16 @@
 # agentic_ai_framework/tools/system_tools.py
+import os
+import codecs
+import signal
+import weakref
 import subprocess
 import platform
 import asyncio
 from tools import BaseTool
+from config import SHELL_SETTINGS
 from utils.logger import setup_logger
 from pydantic import BaseModel, Field
+from utils.events import current_step # For streaming command output into the tool step
 
 logger = setup_logger(__name__)
 
@@ -31,31 +37,166 @@ OpenApplicationTool = BaseTool(
     name="open_application",
     description="Opens a specified application on the user's operating system.",
     func=open_application_func,
-    schema=OpenApplicationArgs.model_json_schema()
+    schema=OpenApplicationArgs.model_json_schema
 )
 
+class CappedOutput:
+    """Collects a byte stream but keeps only its first and last `limit // 2` bytes."""
+    def __init__(self, limit: int):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def append(self, chunk: bytes):
+        self.total += len(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail += chunk
+            if len(self.tail) > 2 * self.tail_limit: # Trim occasionally rather than on every chunk
+                del self.tail[:-self.tail_limit]
+
+    def render(self) -> str:
+        tail = bytes(self.tail[-self.tail_limit:])
+        omitted = self.total - len(self.head) - len(tail)
+        text = self.head.decode("utf-8", errors="replace")
+        if omitted > 0:
+            text += f"\n... [{omitted} bytes omitted] ...\n"
+        return text + tail.decode("utf-8", errors="replace")
+
+# Bounds how many shell commands run at once across all sessions. One semaphore per event loop, created
+# on first use: a semaphore binds to the loop that first waits on it, and batch or benchmark processes
+# may run several loops one after another (repeated asyncio.run).
+_command_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _command_slots.get(loop)
+    if slots is None:
+        slots = _command_slots[loop] = asyncio.Semaphore(SHELL_SETTINGS["max_concurrent_commands"])
+    return slots
+
+def _kill_process_tree(process: asyncio.subprocess.Process):
+    """Kills the shell and everything it spawned (its own process group on POSIX)."""
+    try:
+        if os.name == "nt":
+            process.kill()
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass # Already exited
+
+class StepStream:
+    """
+    Live view of command output in the current step (the tool step), bounded like CappedOutput: only the
+    first `limit // 2` bytes are streamed, then a single notice; the step's final output (the head/tail
+    render) shows the tail once the command ends. Text is sent at most every `interval` seconds.
+    """
+    def __init__(self, limit: int, interval: float):
+        self.step = current_step()
+        self.remaining = limit // 2
+        self.interval = interval
+        self._pending: list = []
+        self._flush_task = None
+        self._truncated = False
+
+    async def write(self, text: str, size: int):
+        if self.step is None or self._truncated:
+            return
+        if size > self.remaining:
+            text = text[:self.remaining] # Close enough for a preview; the returned output is exact
+            self._pending.append(text + "\n... [live output truncated; the result keeps the head and tail] ...\n")
+            self._truncated = True
+            await self.close()
+            return
+        self.remaining -= size
+        self._pending.append(text)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self):
+        if self._pending:
+            text, self._pending = "".join(self._pending), []
+            await self.step.stream_token(text)
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self.step is not None:
+            await self._flush()
+
 class RunCommandArgs(BaseModel):
     command: str = Field(..., description="The shell command to execute.")
+    timeout_seconds: int = Field(None, description="Optional timeout in seconds (capped at the configured maximum).")
 
-async def run_shell_command_func(command: str) -> str:
+async def run_shell_command_func(command: str, timeout_seconds: int = None) -> str:
     """
     Executes a shell command. DANGEROUS! Use with extreme caution and strong user confirmation.
+    Output is streamed as it arrives, capped to head/tail, and the command is killed on timeout.
     """
     logger.warning(f"Executing potentially dangerous shell command: '{command}'")
+    max_timeout = SHELL_SETTINGS["timeout_seconds"]
+    timeout = min(max(float(timeout_seconds), SHELL_SETTINGS["min_timeout_seconds"]), max_timeout) if timeout_seconds else max_timeout
+    stdout = CappedOutput(SHELL_SETTINGS["max_output_bytes"])
+    stderr = CappedOutput(SHELL_SETTINGS["max_output_bytes"])
+    live = StepStream(SHELL_SETTINGS["max_output_bytes"], SHELL_SETTINGS["stream_interval_seconds"])
+
+    async def pump(stream: asyncio.StreamReader, buffer: CappedOutput, label: str):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                break
+            buffer.append(chunk)
+            text = decoder.decode(chunk)
+            if text:
+                await live.write(text if label == "stdout" else f"[stderr] {text}", len(chunk))
+
     try:
-        await asyncio.sleep(1) # Simulate delay
-        process = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        return f"Command executed. STDOUT:\n{process.stdout}\nSTDERR:\n{process.stderr}"
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Shell command failed with exit code {e.returncode}: {e.stderr}")
-        return f"Command failed: {e.stderr}"
+        async with _slots():
+            process = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=(os.name != "nt") # Own process group, so a timeout kills the whole tree
+            )
+            readers = asyncio.gather(pump(process.stdout, stdout, "stdout"), pump(process.stderr, stderr, "stderr"), process.wait())
+            # When the request is cancelled, wait_for cancels the readers without retrieving their outcome
+            readers.add_done_callback(lambda done: done.cancelled() or done.exception())
+            try:
+                await asyncio.wait_for(readers, timeout=timeout)
+            except asyncio.TimeoutError:
+                _kill_process_tree(process)
+                await process.wait()
+                logger.error(f"Shell command timed out after {timeout}s and was killed: '{command}'")
+                return f"Command timed out after {timeout}s and was killed. Partial STDOUT:\n{stdout.render()}\nSTDERR:\n{stderr.render()}"
+            except asyncio.CancelledError:
+                _kill_process_tree(process)
+                raise
+            finally:
+                await live.close()
+
+        if process.returncode != 0:
+            logger.error(f"Shell command failed with exit code {process.returncode}: {stderr.render()[:500]}")
+            return f"Command failed with exit code {process.returncode}. STDOUT:\n{stdout.render()}\nSTDERR:\n{stderr.render()}"
+        return f"Command executed. STDOUT:\n{stdout.render()}\nSTDERR:\n{stderr.render()}"
     except Exception as e:
         logger.error(f"Error executing shell command '{command}': {e}")
         return f"Error executing command: {e}"
 
 RunShellCommandTool = BaseTool(
     name="run_shell_command",
-    description="Executes a shell command on the operating system. USE WITH EXTREME CAUTION.",
+    description="Executes a shell command on the operating system. USE WITH EXTREME CAUTION. Long-running commands are killed after a timeout.",
     func=run_shell_command_func,
-    schema=RunCommandArgs.model_json_schema()
+    schema=RunCommandArgs.model_json_schema
 )
\ No newline at end of file
@@ -1,44 +1,247 @@
 # agentic_ai_framework/tools/visual_tools.py
-import io
+import json
+import time
 import asyncio
+import hashlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from PIL import Image
 from tools import BaseTool
+from config import SCREEN_CAPTURE_SETTINGS
 from utils.logger import setup_logger
+from utils.image_pipeline import image_pipeline
+from utils.events import current_sink
 from pydantic import BaseModel, Field
 import mss # For screen capturing
 import base64 # For encoding images if needed for non-direct multimodal parts
 
 logger = setup_logger(__name__)
 
+class ScreenCaptureSession:
+    """
+    Reusable screen capture on top of a single `mss` instance.
+    Frames are split into tiles whose hashes are compared with the previous frame the same caller
+    (session) captured of the same monitor/region, so incremental captures only encode and return the
+    regions that changed since that caller last looked, whoever else captured in between.
+    """
+    def __init__(self, settings: Dict[str, Any] = None):
+        self.settings = dict(settings or SCREEN_CAPTURE_SETTINGS)
+        # mss handles are bound to the thread that created them, so all grabs go through one thread.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen-capture")
+        self._sct = None
+        # (owner, monitor, region) -> tile hashes of that owner's last frame, least recently used first
+        self._previous_tiles: "OrderedDict[Tuple, List[bytes]]" = OrderedDict()
+        self._frame_times = deque(maxlen=30)
+        self.stats = {"frames": 0, "unchanged_frames": 0, "bytes_sent": 0, "encode_seconds": 0.0}
+
+    def _grab(self, monitor: int, region: Optional[Dict[str, int]]):
+        """Runs on the capture thread: grabs the frame and hashes its tiles."""
+        if self._sct is None:
+            self._sct = mss.mss()
+        monitor_info = self._sct.monitors[monitor]
+        if region:
+            # Region coordinates are relative to the chosen monitor (e.g. a window's bounds)
+            area = {
+                "left": monitor_info["left"] + region["left"],
+                "top": monitor_info["top"] + region["top"],
+                "width": region["width"],
+                "height": region["height"],
+            }
+        else:
+            area = monitor_info
+        sct_img = self._sct.grab(area)
+        return sct_img.bgra, sct_img.size, self._hash_tiles(sct_img.bgra, sct_img.size)
+
+    def _hash_tiles(self, raw: bytes, size: Tuple[int, int]) -> List[bytes]:
+        tile = self.settings["tile_size"]
+        width, height = size
+        stride = width * 4 # BGRA
+        view = memoryview(raw)
+        hashes = []
+        for y0 in range(0, height, tile):
+            y1 = min(y0 + tile, height)
+            for x0 in range(0, width, tile):
+                x1 = min(x0 + tile, width)
+                h = hashlib.blake2b(digest_size=8)
+                for y in range(y0, y1):
+                    h.update(view[y * stride + x0 * 4: y * stride + x1 * 4])
+                hashes.append(h.digest())
+        return hashes
+
+    def _changed_regions(self, previous: List[bytes], current: List[bytes], size: Tuple[int, int]) -> List[Dict[str, int]]:
+        """Merges changed tiles into rectangles: horizontal runs per tile row, then identical runs stacked vertically."""
+        tile = self.settings["tile_size"]
+        width, height = size
+        cols = -(-width // tile)
+        rows = -(-height // tile)
+
+        runs_by_row = []
+        for row in range(rows):
+            runs, start = [], None
+            for col in range(cols + 1):
+                changed = col < cols and previous[row * cols + col] != current[row * cols + col]
+                if changed and start is None:
+                    start = col
+                elif not changed and start is not None:
+                    runs.append((start, col))
+                    start = None
+            runs_by_row.append(runs)
+
+        rectangles = [] # [col_start, col_end, row_start, row_end]
+        open_rects = {}
+        for row, runs in enumerate(runs_by_row):
+            next_open = {}
+            for run in runs:
+                rect = open_rects.get(run)
+                if rect is not None:
+                    rect[3] = row + 1 # Extend downwards
+                else:
+                    rect = [run[0], run[1], row, row + 1]
+                    rectangles.append(rect)
+                next_open[run] = rect
+            open_rects = next_open
+
+        regions = []
+        for col0, col1, row0, row1 in rectangles:
+            left, top = col0 * tile, row0 * tile
+            regions.append({
+                "left": left,
+                "top": top,
+                "width": min(col1 * tile, width) - left,
+                "height": min(row1 * tile, height) - top,
+            })
+        return regions
+
+    @staticmethod
+    def _bounding_box(regions: List[Dict[str, int]]) -> Dict[str, int]:
+        left = min(r["left"] for r in regions)
+        top = min(r["top"] for r in regions)
+        right = max(r["left"] + r["width"] for r in regions)
+        bottom = max(r["top"] + r["height"] for r in regions)
+        return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+    async def capture(self, monitor: int = 1, region: Dict[str, int] = None, incremental: bool = True,
+                      owner: str = None) -> Dict[str, Any]:
+        """
+        Captures a monitor (or a region of it). Returns a dict with `status` ("full", "changed" or
+        "unchanged"), the encoded `regions` and the session stats. Incremental results are relative to
+        the last frame captured for `owner` (the requesting session; defaults to the current sink's).
+        """
+        if owner is None:
+            owner = current_sink().session_owner()
+        loop = asyncio.get_running_loop()
+        raw, size, tiles = await loop.run_in_executor(self._executor, self._grab, monitor, region)
+        key = (owner, monitor, tuple(sorted(region.items())) if region else None)
+        previous = self._previous_tiles.pop(key, None)
+        self._previous_tiles[key] = tiles
+        while len(self._previous_tiles) > self.settings["max_tracked_frames"]:
+            self._previous_tiles.popitem(last=False)
+
+        full_frame = {"left": 0, "top": 0, "width": size[0], "height": size[1]}
+        if not incremental or previous is None or len(previous) != len(tiles):
+            status, regions = "full", [full_frame]
+        else:
+            changed_tiles = sum(1 for a, b in zip(previous, tiles) if a != b)
+            if changed_tiles == 0:
+                status, regions = "unchanged", []
+            elif changed_tiles / len(tiles) >= self.settings["full_frame_change_ratio"]:
+                status, regions = "changed", [full_frame]
+            else:
+                status, regions = "changed", self._changed_regions(previous, tiles, size)
+                if len(regions) > self.settings["max_regions"]:
+                    regions = [self._bounding_box(regions)]
+
+        encode_start = time.perf_counter()
+        encoded_regions = []
+        if regions == [full_frame]:
+            # Not deduped: a changed frame must be sent as captured, never as an earlier cached frame
+            processed = await image_pipeline.process_raw(raw, size, "BGRX", dedupe=False)
+            encoded_regions.append({**full_frame, "mime_type": processed["mime_type"], "data": processed["data"]})
+        elif regions:
+            frame = await asyncio.to_thread(Image.frombytes, "RGB", size, raw, "raw", "BGRX")
+            for r in regions:
+                crop = frame.crop((r["left"], r["top"], r["left"] + r["width"], r["top"] + r["height"]))
+                processed = await image_pipeline.process_raw(crop.tobytes(), crop.size, "RGB", dedupe=False)
+                encoded_regions.append({**r, "mime_type": processed["mime_type"], "data": processed["data"]})
+        encode_seconds = time.perf_counter() - encode_start
+
+        self._record(status, encoded_regions, encode_seconds)
+        return {"status": status, "frame_size": size, "regions": encoded_regions, "stats": self.report()}
+
+    def _record(self, status: str, encoded_regions: List[Dict[str, Any]], encode_seconds: float):
+        self._frame_times.append(time.monotonic())
+        self.stats["frames"] += 1
+        self.stats["unchanged_frames"] += status == "unchanged"
+        self.stats["bytes_sent"] += sum(len(r["data"]) for r in encoded_regions)
+        self.stats["encode_seconds"] += encode_seconds
+
+    def report(self) -> Dict[str, float]:
+        """Frames per second (recent window), average bytes per frame and average encode time."""
+        frames = max(self.stats["frames"], 1)
+        fps = 0.0
+        if len(self._frame_times) > 1:
+            fps = (len(self._frame_times) - 1) / max(self._frame_times[-1] - self._frame_times[0], 1e-6)
+        return {
+            "fps": round(fps, 2),
+            "bytes_per_frame": round(self.stats["bytes_sent"] / frames),
+            "encode_ms_per_frame": round(1000 * self.stats["encode_seconds"] / frames, 2),
+            "unchanged_ratio": round(self.stats["unchanged_frames"] / frames, 3),
+        }
+
+# Shared session so repeated tool calls reuse the mss handle and the previous frame
+screen_capture_session = ScreenCaptureSession()
+
+class CaptureRegion(BaseModel):
+    left: int = Field(..., description="X offset of the region in pixels, relative to the monitor.")
+    top: int = Field(..., description="Y offset of the region in pixels, relative to the monitor.")
+    width: int = Field(..., description="Width of the region in pixels.")
+    height: int = Field(..., description="Height of the region in pixels.")
+
 class CaptureScreenArgs(BaseModel):
     monitor: int = Field(1, description="The monitor number to capture (e.g., 1 for primary, 2 for secondary).")
+    region: CaptureRegion = Field(None, description="Optional region (e.g. a window's bounds) to capture instead of the whole monitor.")
+    incremental: bool = Field(False, description="If true, only regions that changed since the previous capture are returned, or 'unchanged'.")
 
-async def capture_screen_func(monitor: int = 1) -> str:
+async def capture_screen_func(monitor: int = 1, region: Dict[str, int] = None, incremental: bool = False) -> str:
     """
     Captures a screenshot of a specified monitor and returns its content as a base64 string.
     This image can then be fed to Gemini 1.5 Pro's multimodal input.
+    In incremental mode returns a JSON summary with only the changed regions.
     """
-    logger.info(f"Capturing screen for monitor {monitor}...")
+    logger.info(f"Capturing screen for monitor {monitor} (region: {region}, incremental: {incremental})...")
     try:
-        await asyncio.sleep(1) # Simulate delay
-        with mss.mss() as sct:
-            monitor_info = sct.monitors[monitor]
-            sct_img = sct.grab(monitor_info)
-            img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-
-            byte_arr = io.BytesIO()
-            img.save(byte_arr, format='PNG')
-            encoded_image = base64.b64encode(byte_arr.getvalue()).decode('utf-8')
-            logger.info("Screenshot captured and base64 encoded.")
+        if region:
+            region = {k: int(region[k]) for k in ("left", "top", "width", "height")} # LLM args may arrive as floats
+        result = await screen_capture_session.capture(monitor=monitor, region=region, incremental=incremental)
+        if not incremental:
+            encoded_image = base64.b64encode(result["regions"][0]["data"]).decode('utf-8')
+            logger.info(f"Screenshot captured and base64 encoded. Stats: {result['stats']}")
             return encoded_image # This can be used as a part in multimodal input
 
+        if result["status"] == "unchanged":
+            return "unchanged"
+        summary = {
+            "status": result["status"],
+            "frame_size": result["frame_size"],
+            "regions": [
+                {**{k: r[k] for k in ("left", "top", "width", "height", "mime_type")},
+                 "image_base64": base64.b64encode(r["data"]).decode('utf-8')}
+                for r in result["regions"]
+            ],
+            "stats": result["stats"],
+        }
+        logger.info(f"Incremental capture: {result['status']}, {len(result['regions'])} region(s). Stats: {result['stats']}")
+        return json.dumps(summary)
+
     except Exception as e:
         logger.error(f"Error capturing screen: {e}")
         return f"Error capturing screen: {e}"
 
 CaptureScreenTool = BaseTool(
     name="capture_screen",
-    description="Captures a screenshot of the specified monitor. Returns a base64 encoded image string.",
+    description="Captures a screenshot of the specified monitor or a region of it. Returns a base64 encoded image string, "
+                "or in incremental mode only the regions that changed since the last capture (or 'unchanged').",
     func=capture_screen_func,
-    schema=CaptureScreenArgs.model_json_schema()
-)
\ No newline at end of file
+    schema=CaptureScreenArgs.model_json_schema
+)
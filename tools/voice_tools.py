@@ -1,63 +1,286 @@
 # voice_tools.py
 # agentic_ai_framework/tools/voice_tools.py
+import re
+import uuid
+import wave
 import asyncio
+import hashlib
+import inspect
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from tools import BaseTool
+from config import VOICE_SETTINGS
 from utils.logger import setup_logger
 from pydantic import BaseModel, Field
 import os
 
 logger = setup_logger(__name__)
 
+class TextToSpeechEngine:
+    """
+    Interface for speech synthesizers. `synthesize` is blocking and returns 16-bit mono PCM at
+    VOICE_SETTINGS["tts_sample_rate"]; the pipeline runs it off the event loop.
+    """
+    def synthesize(self, text: str, voice: str) -> bytes:
+        raise NotImplementedError
+
+class LocalTTSEngine(TextToSpeechEngine):
+    """
+    Offline stand-in for a local synthesizer (e.g. Piper or Coqui). Produces silence whose
+    length follows the text, so timing and file output behave like real speech.
+    In a real system, you'd integrate with Google Cloud Text-to-Speech or another TTS service.
+    """
+    SECONDS_PER_CHARACTER = 0.06
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        samples = int(len(text) * self.SECONDS_PER_CHARACTER * VOICE_SETTINGS["tts_sample_rate"])
+        return b"\x00\x00" * samples
+
+class TextToSpeechPipeline:
+    """
+    Splits text into sentences, synthesizes them concurrently and yields audio chunks in order as
+    soon as each is ready. Sentences are cached by text+voice hash, so repeated phrases are free; the
+    cache is bounded by total PCM bytes, and a sentence already being synthesized is awaited, not redone.
+    """
+    SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+    def __init__(self, engine: TextToSpeechEngine = None, max_concurrency: int = None, cache_bytes: int = None):
+        self.engine = engine or LocalTTSEngine()
+        self.max_concurrency = max_concurrency or VOICE_SETTINGS["tts_max_concurrency"]
+        self.cache_bytes = cache_bytes or VOICE_SETTINGS["tts_cache_bytes"]
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._in_flight: Dict[str, list] = {} # key -> [synthesis task, callers waiting for it]
+
+    def split_sentences(self, text: str) -> List[str]:
+        return [sentence.strip() for sentence in self.SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+    async def _synthesize_cached(self, sentence: str, voice: str, semaphore: asyncio.Semaphore) -> bytes:
+        key = hashlib.sha256(f"{voice}\0{sentence}".encode("utf-8")).hexdigest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        entry = self._in_flight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._synthesize(key, sentence, voice, semaphore))
+            entry = self._in_flight[key] = [task, 0]
+            task.add_done_callback(lambda done: self._synthesis_done(key, done))
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0]) # One waiter giving up must not cancel it for the others
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel() # Nobody needs this sentence any more
+
+    async def _synthesize(self, key: str, sentence: str, voice: str, semaphore: asyncio.Semaphore) -> bytes:
+        async with semaphore:
+            audio = await asyncio.to_thread(self.engine.synthesize, sentence, voice)
+        self._store(key, audio)
+        return audio
+
+    def _synthesis_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key, [None])[0] is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception() # Retrieved here too, so a failure nobody waits for any more is not logged as unhandled
+
+    def _store(self, key: str, audio: bytes):
+        if len(audio) > self.cache_bytes:
+            return # Larger than the whole budget: caching it would only evict everything else
+        self._cache[key] = audio
+        self._cached_bytes += len(audio)
+        while self._cached_bytes > self.cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+
+    async def stream(self, text: str, voice: str = None) -> AsyncIterator[Tuple[str, bytes]]:
+        """Yields (sentence, PCM audio) pairs in reading order while later sentences are still synthesizing."""
+        voice = voice or VOICE_SETTINGS["tts_voice"]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        sentences = self.split_sentences(text)
+        tasks = [asyncio.create_task(self._synthesize_cached(sentence, voice, semaphore)) for sentence in sentences]
+        try:
+            for sentence, task in zip(sentences, tasks):
+                yield sentence, await task
+        finally:
+            for task in tasks: # Consumer stopped early (or was cancelled): drop the remaining work
+                task.cancel()
+
+# Shared pipeline so the phrase cache is reused across requests
+text_to_speech = TextToSpeechPipeline()
+
 class TextToSpeechArgs(BaseModel):
     text: str = Field(..., description="The text to convert to speech.")
-    output_path: str = Field("output.mp3", description="The path to save the audio file.")
+    output_path: str = Field(None, description="Optional path for the WAV file. A unique path is generated if omitted.")
+    voice: str = Field(None, description="Optional voice name.")
 
-async def text_to_speech_func(text: str, output_path: str = "output.mp3") -> str:
+async def text_to_speech_func(text: str, output_path: str = None, voice: str = None) -> str:
     """
-    Converts text to speech and saves it as an audio file.
-    In a real system, you'd integrate with Google Cloud Text-to-Speech or another TTS service.
+    Converts text to speech and saves it as a WAV file.
+    Audio is written sentence by sentence as synthesis finishes, so the file starts filling immediately.
     """
+    if not output_path:
+        os.makedirs(VOICE_SETTINGS["tts_output_dir"], exist_ok=True)
+        output_path = os.path.join(VOICE_SETTINGS["tts_output_dir"], f"tts_{uuid.uuid4().hex}.wav")
     logger.info(f"Converting text to speech: {text[:50]}... -> {output_path}")
-    # --- Placeholder for actual TTS API call ---
-    # from google.cloud import texttospeech
-    # client = texttospeech.TextToSpeechClient()
-    # input_text = texttospeech.SynthesisInput(text=text)
-    # voice = texttospeech.VoiceSelectionParams(...)
-    # audio_config = texttospeech.AudioConfig(...)
-    # response = client.synthesize_speech(input=input_text, voice=voice, audio_config=audio_config)
-    # with open(output_path, 'wb') as out: out.write(response.audio_content)
-    # ---------------------------------------------
-    await asyncio.sleep(1) # Simulate delay
-    return f"Text successfully converted to speech and saved to {output_path}. (Simulated)"
+
+    wav_file = await asyncio.to_thread(wave.open, output_path, "wb")
+    try:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(VOICE_SETTINGS["tts_sample_rate"])
+        chunk_count = 0
+        async for _, audio in text_to_speech.stream(text, voice):
+            await asyncio.to_thread(wav_file.writeframes, audio)
+            chunk_count += 1
+    finally:
+        await asyncio.to_thread(wav_file.close)
+    return f"Text successfully converted to speech ({chunk_count} sentence chunk(s)) and saved to {output_path}."
 
 TextToSpeechTool = BaseTool(
     name="text_to_speech",
-    description="Converts provided text into spoken audio and saves it to a file.",
+    description="Converts provided text into spoken audio and saves it to a WAV file. Returns the file path.",
     func=text_to_speech_func,
-    schema=TextToSpeechArgs.model_json_schema()
+    schema=TextToSpeechArgs.model_json_schema
 )
 
+class SpeechToTextEngine:
+    """
+    Interface for incremental speech recognizers. `start` creates per-utterance state, `feed`
+    consumes one chunk and returns the transcript so far, `finish` returns the final transcript.
+    Methods are blocking (real engines are CPU-bound); the pipeline runs them off the event loop.
+    """
+    def start(self) -> Any:
+        raise NotImplementedError
+
+    def feed(self, state: Any, chunk: bytes) -> str:
+        raise NotImplementedError
+
+    def finish(self, state: Any) -> str:
+        raise NotImplementedError
+
+UNTRANSCRIBED = "Could not transcribe audio."
+
+class LocalSTTEngine(SpeechToTextEngine):
+    """
+    Offline stand-in for a local streaming recognizer (e.g. Vosk or whisper.cpp). Without one it
+    recognizes nothing, so every utterance is reported as untranscribable rather than as made-up text.
+    In a real system, you'd integrate with Google Cloud Speech-to-Text or another STT service.
+    """
+    def start(self) -> Dict[str, Any]:
+        return {}
+
+    def feed(self, state: Dict[str, Any], chunk: bytes) -> str:
+        return ""
+
+    def finish(self, state: Dict[str, Any]) -> str:
+        return UNTRANSCRIBED
+
+class TextFixtureSTTEngine(SpeechToTextEngine):
+    """
+    Test and benchmark engine: chunks that are UTF-8 text are "recognized" as that text, which makes
+    fixtures and load runs deterministic. Audio that is not UTF-8 text is reported as untranscribable.
+    """
+    def start(self) -> Dict[str, Any]:
+        return {"pending": b"", "text": "", "undecodable": False}
+
+    def feed(self, state: Dict[str, Any], chunk: bytes) -> str:
+        data = state["pending"] + chunk
+        try:
+            state["text"] += data.decode("utf-8")
+            state["pending"] = b""
+        except UnicodeDecodeError as e:
+            if e.start >= len(data) - 3: # Multi-byte character split across chunks
+                state["text"] += data[:e.start].decode("utf-8", errors="replace")
+                state["pending"] = data[e.start:]
+            else:
+                state["undecodable"] = True
+                state["pending"] = b""
+        return " ".join(state["text"].split())
+
+    def finish(self, state: Dict[str, Any]) -> str:
+        transcript = " ".join(state["text"].split())
+        return UNTRANSCRIBED if state["undecodable"] or not transcript else transcript
+
+class SpeechToTextPipeline:
+    """
+    Chunked speech-to-text over bytes or an async chunk stream. Partial transcripts are reported
+    through `on_partial` as chunks are recognized. Transcripts of in-memory audio are cached by audio
+    hash; streams cannot be looked up before they are consumed, so they are not cached.
+    """
+    def __init__(self, engine: SpeechToTextEngine = None, chunk_bytes: int = None, cache_size: int = None):
+        self.engine = engine or LocalSTTEngine()
+        self.chunk_bytes = chunk_bytes or VOICE_SETTINGS["stt_chunk_bytes"]
+        self.cache_size = cache_size or VOICE_SETTINGS["stt_cache_size"]
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    async def _iter_bytes(self, audio: bytes) -> AsyncIterator[bytes]:
+        view = memoryview(audio)
+        for offset in range(0, len(view), self.chunk_bytes):
+            yield bytes(view[offset:offset + self.chunk_bytes])
+
+    async def transcribe(self, audio: Union[bytes, AsyncIterator[bytes]],
+                         on_partial: Callable[[str], Optional[Awaitable[None]]] = None) -> str:
+        """Transcribes `audio` (bytes or an async iterator of byte chunks) and returns the final text."""
+        if isinstance(audio, (bytes, bytearray)):
+            digest = hashlib.sha256(audio).hexdigest()
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                logger.info("Transcript served from cache.")
+                return cached
+            chunks = self._iter_bytes(bytes(audio))
+        else:
+            digest, chunks = None, audio
+
+        state = await asyncio.to_thread(self.engine.start)
+        async for chunk in chunks:
+            partial = await asyncio.to_thread(self.engine.feed, state, chunk)
+            if on_partial and partial:
+                result = on_partial(partial)
+                if inspect.isawaitable(result):
+                    await result
+        transcript = await asyncio.to_thread(self.engine.finish, state)
+
+        if digest is not None:
+            self._cache[digest] = transcript
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        logger.info(f"Transcription result: {transcript}")
+        return transcript
+
+# Shared pipeline used by the tool and MultimodalInputAgent
+speech_to_text = SpeechToTextPipeline()
+
 class SpeechToTextArgs(BaseModel):
     audio_file_path: str = Field(..., description="The path to the audio file to transcribe.")
 
 async def speech_to_text_func(audio_file_path: str) -> str:
     """
     Transcribes audio from a file to text.
-    In a real system, you'd integrate with Google Cloud Speech-to-Text or another STT service.
+    The file is read in chunks off the event loop and streamed through the shared STT pipeline.
     """
     logger.info(f"Transcribing audio from: {audio_file_path}")
-    await asyncio.sleep(1) # Simulate delay
-    mock_transcriptions = {
-        "audio_command.mp3": "Please find me the latest news on AI ethics.",
-        "meeting_notes.wav": "The meeting discussed Q3 sales figures and new marketing strategies."
-    }
-    transcription = mock_transcriptions.get(os.path.basename(audio_file_path), "Could not transcribe audio.")
-    logger.info(f"Transcription result: {transcription}")
-    return transcription
+
+    async def read_chunks() -> AsyncIterator[bytes]:
+        with open(audio_file_path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, speech_to_text.chunk_bytes)
+                if not chunk:
+                    break
+                yield chunk
+
+    try:
+        return await speech_to_text.transcribe(read_chunks())
+    except FileNotFoundError:
+        logger.warning(f"Audio file not found: {audio_file_path}")
+        return "Error: Audio file not found."
 
 SpeechToTextTool = BaseTool(
     name="speech_to_text",
     description="Transcribes audio from a given file path into text.",
     func=speech_to_text_func,
-    schema=SpeechToTextArgs.model_json_schema()
+    schema=SpeechToTextArgs.model_json_schema
 )
\ No newline at end of file
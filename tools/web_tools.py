@@ -1,52 +1,132 @@
 # web_tools.py
 # agentic_ai_framework/tools/web_tools.py
-import requests
-import json
+import time
 import asyncio
-from config import SERPER_API_KEY
+import httpx
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+from config import SERPER_API_KEY, SERPER_API_URL, SERPER_DEFAULT_URL, SEARCH_SETTINGS
 from utils.logger import setup_logger
 from tools import BaseTool
 from pydantic import BaseModel, Field
 
 logger = setup_logger(__name__)
 
+class SearchClient:
+    """
+    Async Serper client with a keep-alive connection pool, per-call timeouts, concurrent
+    multi-query fan-out and a TTL'd result cache. Identical in-flight queries share one request.
+    """
+    def __init__(self, endpoint: str = None, api_key: str = None, settings: Dict[str, Any] = None):
+        self.endpoint = endpoint or SERPER_API_URL
+        self.api_key = api_key if api_key is not None else SERPER_API_KEY
+        self.settings = dict(settings or SEARCH_SETTINGS)
+        self._client = None # Created lazily inside the running event loop
+        self._cache: "OrderedDict[str, Tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.settings["timeout_seconds"],
+                limits=httpx.Limits(
+                    max_connections=self.settings["max_connections"],
+                    max_keepalive_connections=self.settings["max_keepalive_connections"],
+                ),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search(self, query: str) -> List[Dict[str, str]]:
+        """Returns organic results (title, link, snippet) for one query, from cache when fresh."""
+        key = " ".join(query.lower().split())
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.settings["cache_ttl_seconds"]:
+            self._cache.move_to_end(key)
+            return cached[1]
+        if key not in self._inflight:
+            self._inflight[key] = asyncio.create_task(self._fetch(query))
+            self._inflight[key].add_done_callback(lambda _: self._inflight.pop(key, None))
+        results = await asyncio.shield(self._inflight[key])
+
+        self._cache[key] = (time.monotonic(), results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.settings["cache_size"]:
+            self._cache.popitem(last=False)
+        return results
+
+    async def _fetch(self, query: str) -> List[Dict[str, str]]:
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['X-API-KEY'] = self.api_key
+        response = await self._get_client().post(self.endpoint, headers=headers, json={"q": query})
+        response.raise_for_status() # Raise an exception for HTTP errors
+        organic = response.json().get('organic', [])
+        return [
+            {"title": item.get("title", ""), "link": item.get("link", ""), "snippet": item["snippet"]}
+            for item in organic[:self.settings["results_per_query"]] if 'snippet' in item
+        ]
+
+    async def search_many(self, queries: List[str]) -> Tuple[List[Dict[str, str]], List[str]]:
+        """
+        Runs the queries concurrently and merges their results, dropping duplicate links.
+        Returns (results, errors); a failing query does not discard the others' results.
+        """
+        outcomes = await asyncio.gather(*(self.search(q) for q in queries), return_exceptions=True)
+        merged, seen, errors = [], set(), []
+        for query, outcome in zip(queries, outcomes):
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                raise outcome # RequestCancelled: the request is being stopped, not one query failing
+            if isinstance(outcome, Exception):
+                logger.error(f"Search request for '{query}' failed: {outcome}")
+                errors.append(f"'{query}': {outcome}")
+                continue
+            for item in outcome:
+                dedupe_key = item["link"] or item["snippet"]
+                if dedupe_key not in seen:
+                    seen.add(dedupe_key)
+                    merged.append(item)
+        return merged, errors
+
+# Shared client so the connection pool and cache are reused across tool calls
+search_client = SearchClient()
+
 class SearchArgs(BaseModel):
     query: str = Field(..., description="The search query string.")
+    additional_queries: List[str] = Field(None, description="Optional extra queries to run in parallel; results are merged and deduplicated.")
 
-async def serper_search_func(query: str) -> str:
-    """Performs a web search using the Serper API and returns the top results."""
-    if not SERPER_API_KEY:
+async def serper_search_func(query: str, additional_queries: List[str] = None) -> str:
+    """Performs one or more web searches using the Serper API and returns the combined top results."""
+    if not search_client.api_key and search_client.endpoint == SERPER_DEFAULT_URL:
         logger.error("SERPER_API_KEY is not set in config.py or environment.")
         return "Error: Web search tool not configured."
 
-    url = "https://google.serper.dev/search"
-    headers = {
-        'X-API-KEY': SERPER_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    payload = json.dumps({"q": query})
+    queries = [query] + [q for q in (additional_queries or []) if q and q != query]
+    queries = queries[:SEARCH_SETTINGS["max_queries_per_call"]]
 
     try:
-        await asyncio.sleep(1) # Simulate network delay
-        response = requests.post(url, headers=headers, data=payload)
-        response.raise_for_status() # Raise an exception for HTTP errors
-        results = response.json()
-        
-        # Extract relevant snippets
-        snippets = [item['snippet'] for item in results.get('organic', []) if 'snippet' in item]
-        if snippets:
-            return " ".join(snippets[:5]) # Return top 5 snippets
-        return "No relevant search results found."
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Serper API request failed: {e}")
-        return f"Error performing web search: {e}"
+        results, errors = await search_client.search_many(queries)
     except Exception as e:
         logger.error(f"Error processing Serper API response: {e}")
         return f"Error processing search results: {e}"
 
+    if results:
+        lines = [f"{i}. {item['title']}: {item['snippet']} ({item['link']})" for i, item in enumerate(results, start=1)]
+        if errors:
+            lines.append("Some queries failed: " + "; ".join(errors))
+        return "\n".join(lines)
+    if errors:
+        return "Error performing web search: " + "; ".join(errors)
+    return "No relevant search results found."
+
 WebSearchTool = BaseTool(
     name="serper_search",
-    description="Performs a web search to find information on the internet. Useful for factual queries, latest news, and general knowledge.",
+    description="Performs a web search to find information on the internet. Useful for factual queries, latest news, and general knowledge. "
+                "Several related queries can be searched at once with `additional_queries`.",
     func=serper_search_func,
-    schema=SearchArgs.model_json_schema()
-)
\ No newline at end of file
+    schema=SearchArgs.model_json_schema
+)
@@ -0,0 +1,244 @@
+# admission.py
+# agentic_ai_framework/utils/admission.py
+import time
+import asyncio
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+from config import SCHEDULER_SETTINGS
+from utils.deadline import RequestCancelled
+from utils.metrics import percentiles
+from utils.tracing import tracer
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND) # Dispatch order: background only gets slots no interactive request can use
+
+BUSY_MESSAGE = "The system is busy right now and could not start your request in time. Please try again in a moment."
+
+class SchedulerBusy(Exception):
+    """Raised instead of admitting work that would wait longer than the configured limit."""
+
+class _Waiter:
+    __slots__ = ("session_id", "priority", "future", "enqueued")
+
+    def __init__(self, session_id: str, priority: str, future: asyncio.Future):
+        self.session_id = session_id
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.monotonic()
+
+class RequestScheduler:
+    """
+    Admission control in front of the Orchestrator. At most `max_concurrent` units of work run at once.
+    Waiting work is kept per priority class as session -> FIFO of waiters, in an OrderedDict that is
+    rotated on every grant, so sessions take turns (round-robin) instead of one busy session filling
+    every slot. A session also never runs more than `max_per_session` items of one class at once.
+
+    Interactive requests always go first; background jobs (memory writes, ingestion) use at most
+    `background_share` of the slots and only when no interactive request is waiting for one. An
+    interactive request whose expected wait (from the queue length and recent service times), or actual
+    wait, passes `max_queue_wait_seconds` raises SchedulerBusy, so the caller can answer "busy" at once
+    rather than let everyone's latency degrade together.
+    """
+    def __init__(self, max_concurrent: int = None):
+        self.max_concurrent = max(1, max_concurrent or SCHEDULER_SETTINGS["max_concurrent"])
+        self.background_limit = max(1, int(self.max_concurrent * SCHEDULER_SETTINGS["background_share"]))
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._queued = {p: 0 for p in PRIORITIES}
+        self._running = {p: 0 for p in PRIORITIES}
+        self._running_by_session: Dict[tuple, int] = {} # (priority, session) -> running count
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._service_seconds: Optional[float] = None # Moving average of interactive run time
+        self._waits_ms = {p: deque(maxlen=SCHEDULER_SETTINGS["metrics_window"]) for p in PRIORITIES}
+        self._counts = {p: {"admitted": 0, "shed": 0, "cancelled": 0} for p in PRIORITIES}
+        self._last_report = time.monotonic()
+
+    # --- Admission ---
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, priority: str = INTERACTIVE):
+        """
+        Holds one slot for the duration of the `async with` block, waiting for it if needed.
+        Raises SchedulerBusy if the work is shed before it starts.
+        """
+        await self._acquire(session_id, priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(session_id, priority, time.monotonic() - started)
+
+    async def _acquire(self, session_id: str, priority: str):
+        waiter = _Waiter(session_id, priority, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(session_id, deque()).append(waiter)
+        self._queued[priority] += 1
+        self._dispatch()
+        if waiter.future.done():
+            return
+
+        if priority == INTERACTIVE:
+            max_wait = SCHEDULER_SETTINGS["max_queue_wait_seconds"]
+            expected = self.expected_wait()
+            if self._queued[priority] > SCHEDULER_SETTINGS["max_queued_interactive"] or expected > max_wait:
+                self._shed(waiter, f"expected wait {expected:.1f}s with {self._queued[priority]} queued")
+        else:
+            max_wait = SCHEDULER_SETTINGS["background_max_wait_seconds"]
+            if self._queued[priority] > SCHEDULER_SETTINGS["max_queued_background"]:
+                self._shed(waiter, f"{self._queued[priority]} background jobs queued")
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._shed(waiter, f"waited {max_wait:.0f}s")
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self._release(session_id, priority, 0.0) # Granted just as the caller gave up
+            else:
+                self._remove(waiter)
+                waiter.future.cancel()
+                self._counts[priority]["cancelled"] += 1
+            raise
+
+    def _shed(self, waiter: _Waiter, reason: str):
+        self._remove(waiter)
+        waiter.future.cancel()
+        self._counts[waiter.priority]["shed"] += 1
+        logger.warning(f"Shedding {waiter.priority} work from session {waiter.session_id}: {reason}.")
+        raise SchedulerBusy(reason)
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues[waiter.priority]
+        waiters = queue.get(waiter.session_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        self._queued[waiter.priority] -= 1
+        if not waiters:
+            del queue[waiter.session_id]
+
+    def _has_capacity(self, priority: str) -> bool:
+        if sum(self._running.values()) >= self.max_concurrent:
+            return False
+        return priority == INTERACTIVE or self._running[BACKGROUND] < self.background_limit
+
+    def _dispatch(self):
+        """Grants free slots to waiting work: interactive first, sessions in round-robin order."""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            skipped = 0 # Sessions passed over in a row because they are at their per-session limit
+            while queue and skipped < len(queue) and self._has_capacity(priority):
+                session_id, waiters = next(iter(queue.items()))
+                if self._running_by_session.get((priority, session_id), 0) >= SCHEDULER_SETTINGS["max_per_session"]:
+                    queue.move_to_end(session_id)
+                    skipped += 1
+                    continue
+                waiter = waiters.popleft()
+                if waiters:
+                    queue.move_to_end(session_id)
+                else:
+                    del queue[session_id]
+                self._queued[priority] -= 1
+                self._grant(waiter)
+                skipped = 0
+
+    def _grant(self, waiter: _Waiter):
+        key = (waiter.priority, waiter.session_id)
+        self._running[waiter.priority] += 1
+        self._running_by_session[key] = self._running_by_session.get(key, 0) + 1
+        self._counts[waiter.priority]["admitted"] += 1
+        self._waits_ms[waiter.priority].append((time.monotonic() - waiter.enqueued) * 1000)
+        waiter.future.set_result(None)
+
+    def _release(self, session_id: str, priority: str, seconds: float):
+        key = (priority, session_id)
+        self._running[priority] -= 1
+        if self._running_by_session[key] <= 1:
+            del self._running_by_session[key]
+        else:
+            self._running_by_session[key] -= 1
+        if priority == INTERACTIVE and seconds > 0:
+            average = self._service_seconds
+            self._service_seconds = seconds if average is None else average * 0.9 + seconds * 0.1
+        self._dispatch()
+        if time.monotonic() - self._last_report >= SCHEDULER_SETTINGS["report_interval_seconds"]:
+            self._last_report = time.monotonic()
+            logger.info(f"Request scheduler metrics: {self.metrics()}")
+
+    def expected_wait(self) -> float:
+        """Rough seconds a newly queued interactive request waits: queue depth over slots, times average run time."""
+        if not self._service_seconds:
+            return 0.0
+        return self._queued[INTERACTIVE] / self.max_concurrent * self._service_seconds
+
+    # --- Background jobs ---
+
+    def submit_background(self, session_id: str, job: Callable[[], Awaitable[Any]], name: str = "background job") -> Optional[asyncio.Task]:
+        """
+        Runs `job()` at background priority without making the caller wait for it.
+        Returns the task, or None if the background queue is already full and the job was dropped.
+        """
+        if self._queued[BACKGROUND] >= SCHEDULER_SETTINGS["max_queued_background"]:
+            self._counts[BACKGROUND]["shed"] += 1
+            logger.warning(f"Dropping {name} for session {session_id}: background queue is full.")
+            return None
+        # A fresh context: the job outlives the request, so it must not inherit its deadline, sink or trace
+        task = contextvars.Context().run(asyncio.create_task, self._run_background(session_id, job, name))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _run_background(self, session_id: str, job: Callable[[], Awaitable[Any]], name: str):
+        try:
+            async with self.slot(session_id, BACKGROUND):
+                await job()
+        except SchedulerBusy as e:
+            logger.warning(f"Dropped {name} for session {session_id}: {e}.")
+        except RequestCancelled as e:
+            logger.info(f"{name} for session {session_id} was stopped: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"{name} for session {session_id} failed: {e}", exc_info=True)
+
+    async def drain(self):
+        """Waits for every submitted background job to finish (e.g. before a batch run exits)."""
+        while self._background_tasks:
+            await asyncio.gather(*list(self._background_tasks), return_exceptions=True)
+
+    # --- Metrics ---
+
+    def queue_depths(self) -> Dict[tuple, int]:
+        """(priority, "running"|"queued") -> count; cheap enough for every metrics scrape."""
+        depths = {}
+        for priority in PRIORITIES:
+            depths[(priority, "running")] = self._running[priority]
+            depths[(priority, "queued")] = self._queued[priority]
+        return depths
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "expected_wait_seconds": round(self.expected_wait(), 3),
+            "average_service_seconds": round(self._service_seconds or 0.0, 3),
+            **{priority: {
+                "running": self._running[priority],
+                "queued": self._queued[priority],
+                "waiting_sessions": len(self._queues[priority]),
+                **self._counts[priority],
+                "queue_wait_ms": percentiles(list(self._waits_ms[priority])),
+            } for priority in PRIORITIES},
+        }
+
+# Shared by the Chainlit app and the Orchestrator's background memory writes
+request_scheduler = RequestScheduler()
+tracer.metrics.gauge("agentic_scheduler_work", "Requests and background jobs running or queued in the admission scheduler.",
+                     ("priority", "state"), request_scheduler.queue_depths)
@@ -0,0 +1,37 @@
+# chainlit_sink.py
+# agentic_ai_framework/utils/chainlit_sink.py
+from typing import Any, Optional
+import chainlit as cl # For Chainlit integration
+from utils.events import EventSink
+
+class ChainlitEventSink(EventSink):
+    """
+    Presents pipeline events in the Chainlit UI: steps become nested cl.Step elements (the handle
+    given to callers is the cl.Step itself) and messages become cl.Message posts. Only valid
+    inside a Chainlit request context.
+    """
+    async def _open_step(self, name: str, type: str, parent: Any) -> cl.Step:
+        step = cl.Step(name=name, type=type, parent_id=parent.id if parent is not None else None)
+        await step.__aenter__()
+        return step
+
+    async def _close_step(self, handle: cl.Step, error: Optional[BaseException]):
+        if error is not None:
+            handle.is_error = True
+            await handle.__aexit__(type(error), error, error.__traceback__)
+        else:
+            await handle.__aexit__(None, None, None)
+
+    async def message(self, content: str):
+        await cl.Message(content=content).send()
+
+    def session_owner(self) -> Optional[str]:
+        # The authenticated user's identifier, so reminders follow the user across sessions, or else the session ID
+        try:
+            user = cl.user_session.get("user")
+            return getattr(user, "identifier", None) or cl.user_session.get("id")
+        except Exception:
+            return None
+
+# Stateless, so one instance serves every session
+chainlit_sink = ChainlitEventSink()
@@ -0,0 +1,105 @@
+# deadline.py
+# agentic_ai_framework/utils/deadline.py
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+# The deadline of the request being processed. Like the event sink, it follows asyncio tasks, so every
+# layer (agents, tools, the LLM client) sees its own request's budget without it being passed everywhere.
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("request_deadline", default=None)
+
+class RequestCancelled(BaseException):
+    """
+    The request was stopped (by the user or the server) before it finished. Like asyncio.CancelledError
+    it is a BaseException, so the `except Exception` handlers of agents, tools and memory lookups let it
+    through instead of turning a stopped request into an error reply and carrying on.
+    """
+
+class DeadlineExceeded(RequestCancelled):
+    """The request ran out of its time budget."""
+
+class Deadline:
+    """
+    Time budget and cancellation token of one request. Layers call `check()` before starting more work,
+    read `remaining()` to size timeouts or to skip optional work, and `cancel()` stops the request:
+    `guard()` abandons the guarded work at once and cancels it, which unwinds every in-flight LLM call,
+    tool and memory lookup started under it.
+    """
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + timeout_seconds if timeout_seconds else None
+        self.reason: Optional[str] = None # Set once cancelled
+        self._cancelled: Optional[asyncio.Event] = None
+
+    def _event(self) -> asyncio.Event:
+        if self._cancelled is None:
+            self._cancelled = asyncio.Event()
+            if self.reason is not None:
+                self._cancelled.set()
+        return self._cancelled
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, never negative, or None without a time limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def cancel(self, reason: str = "stopped"):
+        if self.reason is None:
+            self.reason = reason
+            if self._cancelled is not None:
+                self._cancelled.set()
+
+    def check(self):
+        """Raises if the request has been cancelled or its budget is spent."""
+        if self.reason is not None:
+            raise RequestCancelled(self.reason)
+        if self.expired:
+            raise DeadlineExceeded("request deadline exceeded")
+
+    async def wait_for(self, awaitable: Awaitable[Any]) -> Any:
+        """Awaits `awaitable` for at most the remaining budget, raising DeadlineExceeded when it runs out."""
+        self.check()
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("request deadline exceeded") from None
+
+    async def guard(self, awaitable: Awaitable[Any], grace_seconds: float = 1.0) -> Any:
+        """
+        Runs `awaitable` as a task until it finishes, the budget runs out or `cancel()` is called. In the
+        last two cases the task is cancelled, given `grace_seconds` to unwind (close steps, cancel
+        subtasks), and RequestCancelled/DeadlineExceeded is raised.
+        """
+        self.check()
+        task = asyncio.ensure_future(awaitable)
+        stop = asyncio.ensure_future(self._event().wait())
+        try:
+            done, _ = await asyncio.wait({task, stop}, timeout=self.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+            if not task.done():
+                task.cancel()
+                await asyncio.wait({task}, timeout=grace_seconds)
+        if task in done:
+            return task.result()
+        self.check()
+        raise DeadlineExceeded("request deadline exceeded") # wait() timed out a hair before `expired` flips
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the request running in this context, if any."""
+    return _current_deadline.get()
+
+@contextmanager
+def use_deadline(deadline: Optional[Deadline]):
+    """Makes `deadline` the current one inside the block (and tasks it starts)."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,126 @@
+# events.py
+# agentic_ai_framework/utils/events.py
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# The sink receiving progress events for the request being processed, and the innermost open step.
+# Context variables follow asyncio tasks, so concurrent requests (and parallel plan steps) never mix.
+_current_sink: ContextVar[Optional["EventSink"]] = ContextVar("event_sink", default=None)
+_current_step: ContextVar[Optional["StepHandle"]] = ContextVar("event_step", default=None)
+
+class StepHandle:
+    """
+    A unit of visible work (routing, an agent run, a tool call). Callers set `input`/`output`, may set
+    `is_error`, and can call `update()` to publish a changed output or `stream_token()` to append to it.
+    Adapters may hand out their own objects with the same attributes (e.g. chainlit.Step).
+    """
+    def __init__(self, name: str, type: str, parent: Optional["StepHandle"] = None):
+        self.name = name
+        self.type = type
+        self.parent = parent
+        self.input: Any = None
+        self.output: Any = ""
+        self.is_error = False
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.ended is None else (self.ended - self.started) * 1000
+
+    async def update(self):
+        pass
+
+    async def stream_token(self, token: str):
+        self.output = (self.output or "") + token
+
+class EventSink:
+    """
+    Interface between the agent pipeline and whatever presents its progress. The pipeline only talks to
+    `current_sink()`, never to a UI framework. The base class drops everything, which is what code running
+    outside any request (scripts, tests) gets. Subclasses override the underscored hooks and `message`.
+    """
+    @asynccontextmanager
+    async def step(self, name: str, type: str = "run") -> AsyncIterator[Any]:
+        """Opens a step nested under the current one for the duration of the `async with` block."""
+        handle = await self._open_step(name, type, _current_step.get())
+        token = _current_step.set(handle)
+        error = None
+        try:
+            yield handle
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_step.reset(token)
+            await self._close_step(handle, error)
+
+    async def _open_step(self, name: str, type: str, parent: Any) -> Any:
+        return StepHandle(name, type, parent)
+
+    async def _close_step(self, handle: Any, error: Optional[BaseException]):
+        handle.ended = time.perf_counter()
+        if error is not None:
+            handle.is_error = True
+
+    async def message(self, content: str):
+        """Shows an intermediate message to the user (routing notices, partial plan results)."""
+
+    def session_owner(self) -> Optional[str]:
+        """Identifier of the user or session the request belongs to, used to deliver later events (reminders)."""
+        return None
+
+class RecordingEventSink(EventSink):
+    """Headless sink that keeps steps and messages so a batch runner can report per-request timings."""
+    def __init__(self, owner: str = None):
+        self.owner = owner
+        self.steps: List[StepHandle] = []
+        self.messages: List[str] = []
+
+    async def _open_step(self, name: str, type: str, parent: Any) -> StepHandle:
+        handle = StepHandle(name, type, parent)
+        self.steps.append(handle)
+        return handle
+
+    async def message(self, content: str):
+        self.messages.append(content)
+
+    def session_owner(self) -> Optional[str]:
+        return self.owner
+
+    def timings(self) -> List[Dict[str, Any]]:
+        """Closed steps in start order with their durations and nesting depth."""
+        rows = []
+        for handle in self.steps:
+            depth, parent = 0, handle.parent
+            while parent is not None:
+                depth, parent = depth + 1, parent.parent
+            rows.append({
+                "step": handle.name,
+                "type": handle.type,
+                "depth": depth,
+                "ms": round(handle.duration_ms, 2) if handle.duration_ms is not None else None,
+                "error": handle.is_error,
+            })
+        return rows
+
+_null_sink = EventSink()
+
+def current_sink() -> EventSink:
+    """The sink of the request running in this context, or a sink that ignores events."""
+    return _current_sink.get() or _null_sink
+
+def current_step() -> Optional[Any]:
+    """The innermost step opened in this context, if any."""
+    return _current_step.get()
+
+@contextmanager
+def use_sink(sink: EventSink):
+    """Routes events raised inside the block (and tasks it starts) to `sink`."""
+    token = _current_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _current_sink.reset(token)
@@ -0,0 +1,221 @@
+# image_pipeline.py
+# agentic_ai_framework/utils/image_pipeline.py
+import io
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Tuple, List, Iterator
+from PIL import Image, ImageOps, ImageSequence
+from config import IMAGE_SETTINGS, VIDEO_SETTINGS
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# --- Worker-side functions (run inside the process pool, so they must stay module-level) ---
+
+def _dhash(img: Image.Image) -> int:
+    """64-bit difference hash: robust to re-encoding and resizing, cheap to compute."""
+    small = img.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return bits
+
+def _encode(img: Image.Image, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Downscales, flattens to RGB and re-encodes. Metadata (EXIF, ICC, text chunks) is not carried over."""
+    max_side = settings["max_side"]
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    fmt = settings["format"].upper()
+    out = io.BytesIO()
+    img.save(out, format=fmt, quality=settings["quality"], optimize=(fmt == "JPEG"))
+    return {
+        "data": out.getvalue(),
+        "mime_type": MIME_TYPES[fmt],
+        "width": img.width,
+        "height": img.height,
+    }
+
+def process_encoded_image(data: bytes, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Decodes an uploaded image file (any PIL format) and runs it through the pipeline."""
+    with Image.open(io.BytesIO(data)) as img:
+        # For JPEG this makes the decoder scale down during decoding (DCT scaling), saving time and memory.
+        img.draft("RGB", (settings["max_side"], settings["max_side"]))
+        img = ImageOps.exif_transpose(img) # Apply orientation before the EXIF data is dropped
+        return _encode(img, settings)
+
+def process_raw_frame(raw: bytes, size: Tuple[int, int], raw_mode: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs raw pixel data (e.g. an mss BGRA screen grab) through the pipeline without an intermediate PNG."""
+    img = Image.frombytes("RGB", size, raw, "raw", raw_mode)
+    return _encode(img, settings)
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+def _iter_mjpeg(data: bytes) -> Iterator[bytes]:
+    """Yields the individual JPEG images of a concatenated (MJPEG-style) stream one at a time."""
+    start = data.find(JPEG_SOI)
+    while start != -1:
+        end = data.find(JPEG_EOI, start + 2)
+        if end == -1:
+            break
+        yield data[start:end + 2]
+        start = data.find(JPEG_SOI, end + 2)
+
+def _is_mjpeg(data: bytes) -> bool:
+    if not data.startswith(JPEG_SOI):
+        return False
+    first_end = data.find(JPEG_EOI)
+    return first_end != -1 and data.find(JPEG_SOI, first_end + 2) != -1
+
+def _iter_timed_frames(data: bytes, video_settings: Dict[str, Any]) -> Iterator[Tuple[float, Image.Image]]:
+    """
+    Yields (timestamp in seconds, frame) pairs, decoding one frame at a time so the full
+    video is never held in memory. Supports animated GIF/WebP/APNG and MJPEG-style streams.
+    """
+    if _is_mjpeg(data):
+        frame_interval = 1.0 / video_settings["mjpeg_fps"]
+        for index, jpeg in enumerate(_iter_mjpeg(data)):
+            with Image.open(io.BytesIO(jpeg)) as frame:
+                yield index * frame_interval, frame
+        return
+
+    with Image.open(io.BytesIO(data)) as container:
+        timestamp = 0.0
+        for frame in ImageSequence.Iterator(container):
+            yield timestamp, frame
+            timestamp += frame.info.get("duration", 100) / 1000.0 # Per-frame duration in ms; GIF default ~10fps
+
+def sample_video_frames(data: bytes, video_settings: Dict[str, Any], settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Samples frames at `sample_fps`, drops near-duplicates by perceptual hash and stops after
+    `max_frames`. Kept frames go through the same downscale/re-encode as single images.
+    """
+    interval = 1.0 / video_settings["sample_fps"]
+    next_sample_at = 0.0
+    kept, kept_hashes = [], []
+    for timestamp, frame in _iter_timed_frames(data, video_settings):
+        if timestamp + 1e-9 < next_sample_at:
+            continue
+        next_sample_at = timestamp + interval
+        frame_hash = _dhash(frame)
+        if any(bin(frame_hash ^ h).count("1") <= video_settings["dedupe_hash_distance"] for h in kept_hashes):
+            continue # Near-identical to a frame we already kept
+        kept_hashes.append(frame_hash)
+        encoded = _encode(frame.copy(), settings) # Copy: sequence frames are reused by the decoder
+        encoded["timestamp"] = round(timestamp, 2)
+        kept.append(encoded)
+        if len(kept) >= video_settings["max_frames"]:
+            break
+    if not kept:
+        raise ValueError("No decodable frames found (supported: animated GIF/WebP/APNG, MJPEG-style streams, still images).")
+    return kept
+
+# --- Event-loop side ---
+
+class ImagePipeline:
+    """
+    Shared image preprocessing: downscale, re-encode and strip metadata in a process pool, and
+    dedupe repeated uploads of the exact same bytes through an LRU cache.
+    """
+    def __init__(self, settings: Dict[str, Any] = None):
+        self.settings = dict(settings or IMAGE_SETTINGS)
+        self._executor = None # Created on first use so importing this module stays cheap
+        self._by_digest: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"processed": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.settings["process_pool_workers"])
+        return self._executor
+
+    async def process_bytes(self, data: bytes) -> Dict[str, Any]:
+        """Processes an encoded image file (upload bytes)."""
+        return await self._process(data, process_encoded_image, data)
+
+    async def process_raw(self, raw: bytes, size: Tuple[int, int], raw_mode: str = "BGRX", dedupe: bool = True) -> Dict[str, Any]:
+        """
+        Processes raw pixel data, e.g. `sct_img.bgra` from mss.
+        Pass `dedupe=False` for frames that are unlikely to repeat byte for byte (screen captures), so they
+        are neither hashed nor kept in the cache.
+        """
+        return await self._process(raw, process_raw_frame, raw, tuple(size), raw_mode, dedupe=dedupe)
+
+    async def sample_video(self, data: bytes, video_settings: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Extracts a bounded number of distinct, downscaled frames from a multi-frame upload."""
+        loop = asyncio.get_running_loop()
+        frames = await loop.run_in_executor(
+            self._get_executor(), sample_video_frames, data, dict(video_settings or VIDEO_SETTINGS), self.settings
+        )
+        logger.info(f"Video sampled: {len(data)} bytes -> {len(frames)} frame(s), {sum(len(f['data']) for f in frames)} bytes.")
+        return frames
+
+    async def _process(self, source: bytes, func, *args, dedupe: bool = True) -> Dict[str, Any]:
+        # Only byte-identical input is deduped: a near-identical image (same window, different text) may
+        # differ in exactly what the user is asking about, so its own pixels are always processed and sent.
+        if not dedupe:
+            return await self._run(source, func, *args)
+        # Hash off the loop: full-resolution raw frames can be tens of megabytes.
+        digest = await asyncio.to_thread(lambda: hashlib.blake2b(source, digest_size=16).hexdigest())
+        cached = self._by_digest.get(digest)
+        if cached is not None:
+            self._by_digest.move_to_end(digest)
+            self.stats["cache_hits"] += 1
+            return cached
+        if digest in self._inflight: # Same image already being processed by another request
+            return await asyncio.shield(self._inflight[digest])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        try:
+            result = await self._run(source, func, *args)
+            self._remember(digest, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # Mark as retrieved; waiting requests re-raise it themselves
+            raise
+        finally:
+            del self._inflight[digest]
+
+    async def _run(self, source: bytes, func, *args) -> Dict[str, Any]:
+        result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args, self.settings)
+        self.stats["processed"] += 1
+        self.stats["bytes_in"] += len(source)
+        self.stats["bytes_out"] += len(result["data"])
+        logger.info(f"Image processed: {len(source)} -> {len(result['data'])} bytes ({result['width']}x{result['height']} {result['mime_type']}).")
+        return result
+
+    def _remember(self, digest: str, result: Dict[str, Any]):
+        self._by_digest[digest] = result
+        self._by_digest.move_to_end(digest)
+        while len(self._by_digest) > self.settings["cache_size"]:
+            self._by_digest.popitem(last=False)
+
+    @staticmethod
+    def to_part(processed: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns an inline-data part that Gemini accepts directly alongside text parts."""
+        return {"mime_type": processed["mime_type"], "data": processed["data"]}
+
+# Shared instance used by agents and tools
+image_pipeline = ImagePipeline()
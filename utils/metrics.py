@@ -0,0 +1,12 @@
+# metrics.py
+# agentic_ai_framework/utils/metrics.py
+import statistics
+from typing import Dict, Sequence
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99 of `samples`, rounded for reports. Empty input gives zeros."""
+    if len(samples) < 2:
+        value = round(samples[0], 3) if samples else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100)
+    return {"p50": round(cuts[49], 3), "p95": round(cuts[94], 3), "p99": round(cuts[98], 3)}
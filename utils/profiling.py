@@ -0,0 +1,282 @@
+# profiling.py
+# agentic_ai_framework/utils/profiling.py
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import cProfile
+import threading
+import traceback
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from config import PROFILING_SETTINGS
+from utils.metrics import percentiles
+from utils.tracing import ROUTES
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "on", "yes")
+    return bool(value)
+
+def _timestamp() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+
+class LoopLagMonitor:
+    """
+    Detects callbacks that block the event loop. A task on the loop records a heartbeat every `interval`;
+    a watchdog thread checks it, and once the heartbeat is `threshold_ms` overdue it captures the loop
+    thread's current stack, i.e. the code doing the blocking (a synchronous HTTP call, subprocess.run, ...).
+    Each stall is written once to a JSONL file and logged; the heartbeat task also keeps lag percentiles.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold_ms: float, interval_ms: float, output_path: str):
+        self.loop = loop
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.output_path = output_path
+        self.stalls = 0
+        self._lag_ms = deque(maxlen=PROFILING_SETTINGS["metrics_window"])
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Must be called on the loop's thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = self.loop.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Event-loop lag monitor started (threshold {self.threshold * 1000:.0f}ms).")
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _beat(self):
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._lag_ms.append(max(0.0, (time.monotonic() - self._heartbeat - self.interval) * 1000))
+
+    def _watch(self):
+        reported = None # Heartbeat of the stall already written, so one stall yields one report
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue < self.threshold or heartbeat == reported:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            self.stalls += 1
+            record = {"time": time.time(), "blocked_ms": round(overdue * 1000, 1), "stack": stack}
+            where = stack[-1].strip().splitlines()[0] if stack else "unknown"
+            logger.warning(f"Event loop blocked for at least {overdue * 1000:.0f}ms at {where}")
+            try:
+                with open(self.output_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                logger.error(f"Could not write loop-lag report: {e}")
+
+    def report(self) -> Dict[str, Any]:
+        return {"threshold_ms": self.threshold * 1000, "stalls": self.stalls, "lag_ms": percentiles(list(self._lag_ms))}
+
+class Profiler:
+    """
+    Runtime-switchable profiling of the request path, all off by default:
+      - cProfile: a random `cprofile_sample_rate` share of requests is profiled into a .prof file
+        (pstats format: snakeviz, gprof2dot, `python -m pstats`). One capture at a time; it covers the
+        whole loop thread, so concurrent requests' work shows up in it too.
+      - tracemalloc: every `tracemalloc_every_n_requests` requests a snapshot is taken and the top growth
+        since the previous one is written as text, next to the raw snapshot (tracemalloc.Snapshot.load).
+        This runs in a worker thread, one diff at a time; only the latest snapshot and the newest
+        `tracemalloc_keep_reports` reports are kept. Steady growth at the same line across reports points at a leak.
+      - loop lag: a LoopLagMonitor with a `loop_lag_threshold_ms` threshold.
+    Settings can be changed while running through `configure()` or GET /profiling?<setting>=<value>
+    on the metrics endpoint.
+    """
+    def __init__(self):
+        self.settings = dict(PROFILING_SETTINGS)
+        self.requests = 0
+        self.captures = 0
+        self._active_profile: Optional[cProfile.Profile] = None
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._last_snapshot_path: Optional[str] = None
+        self._diff_running = False # A diff still in the executor; due diffs are skipped meanwhile
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lag_monitor: Optional[LoopLagMonitor] = None
+        self._lock = threading.Lock() # configure() may be called from the endpoint thread
+
+    def _path(self, name: str) -> str:
+        os.makedirs(self.settings["output_dir"], exist_ok=True)
+        return os.path.join(self.settings["output_dir"], name)
+
+    # --- Runtime control ---
+
+    def attach(self, loop: asyncio.AbstractEventLoop = None):
+        """Binds to the running event loop (once) and applies the current settings to it."""
+        if self._loop is None:
+            self._loop = loop or asyncio.get_running_loop()
+            self._apply()
+
+    def configure(self, **changes: Any) -> Dict[str, Any]:
+        """Updates settings (cprofile_sample_rate, tracemalloc, loop_lag_threshold_ms, ...) and applies them."""
+        with self._lock:
+            for key, value in changes.items():
+                if key not in self.settings:
+                    raise KeyError(f"Unknown profiling setting: {key}")
+                current = self.settings[key]
+                if isinstance(current, bool):
+                    value = _parse_bool(value) # bool("false") would be True
+                elif current is not None:
+                    value = type(current)(value)
+                self.settings[key] = value
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._apply)
+        else:
+            self._apply_tracemalloc() # Can start before any request binds a loop
+        logger.info(f"Profiling settings changed: {changes}")
+        return self.status()
+
+    def _apply(self):
+        self._apply_tracemalloc()
+        threshold = self.settings["loop_lag_threshold_ms"]
+        if self._lag_monitor is not None and (not threshold or threshold != self._lag_monitor.threshold * 1000):
+            self._lag_monitor.stop()
+            self._lag_monitor = None
+        if threshold and self._lag_monitor is None and self._loop is not None:
+            self._lag_monitor = LoopLagMonitor(self._loop, threshold, self.settings["loop_lag_interval_ms"], self._path("loop_lag.jsonl"))
+            self._lag_monitor.start()
+
+    def _apply_tracemalloc(self):
+        if self.settings["tracemalloc"] and not tracemalloc.is_tracing():
+            tracemalloc.start(self.settings["tracemalloc_frames"])
+            self._last_snapshot = None
+            logger.info("tracemalloc started.")
+        elif not self.settings["tracemalloc"] and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._last_snapshot = None
+            logger.info("tracemalloc stopped.")
+
+    # --- Per-request hooks ---
+
+    @contextmanager
+    def request(self, label: str = "request"):
+        """Wraps one request: starts a sampled cProfile capture and takes the periodic tracemalloc diff afterwards."""
+        if self._loop is None:
+            try:
+                self.attach()
+            except RuntimeError:
+                pass # No running loop (synchronous caller); loop-lag monitoring needs one
+        self.requests += 1
+        profile = None
+        rate = self.settings["cprofile_sample_rate"]
+        if rate > 0 and self._active_profile is None and random.random() < rate:
+            profile = self._active_profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._active_profile = None
+                self._save_profile(profile, label)
+            every = self.settings["tracemalloc_every_n_requests"]
+            if tracemalloc.is_tracing() and every and self.requests % every == 0:
+                self._start_snapshot_diff()
+
+    def _save_profile(self, profile: cProfile.Profile, label: str):
+        self.captures += 1
+        path = self._path(f"request-{_timestamp()}-{label}.prof")
+        # Writing a large profile takes a while; do it off the loop when there is one
+        if self._loop is not None and self._loop.is_running():
+            self._loop.run_in_executor(None, profile.dump_stats, path)
+        else:
+            profile.dump_stats(path)
+        logger.info(f"Saved cProfile capture to {path}")
+
+    def _start_snapshot_diff(self):
+        # Snapshotting, dumping and comparing a large heap take a while; do it off the loop when there is one
+        if self._diff_running:
+            return
+        if self._loop is None or not self._loop.is_running():
+            self._snapshot_diff()
+            return
+        self._diff_running = True
+        future = self._loop.run_in_executor(None, self._snapshot_diff)
+        future.add_done_callback(self._snapshot_diff_done)
+
+    def _snapshot_diff_done(self, future: asyncio.Future):
+        self._diff_running = False
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"tracemalloc diff failed: {future.exception()}")
+
+    def _snapshot_diff(self):
+        """Takes a snapshot and writes the growth since the previous one. Blocking."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, __file__, all_frames=True), # The profiler's own reports (linecache etc.)
+        ))
+        previous, self._last_snapshot = self._last_snapshot, snapshot
+        stamp = _timestamp()
+        path = self._path(f"tracemalloc-{stamp}.snapshot")
+        snapshot.dump(path)
+        previous_path, self._last_snapshot_path = self._last_snapshot_path, path
+        if previous_path and previous_path != path:
+            try:
+                os.remove(previous_path)
+            except OSError:
+                pass
+        if previous is None:
+            return
+        top = snapshot.compare_to(previous, "traceback")[:self.settings["tracemalloc_top"]]
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"tracemalloc diff after request {self.requests}: traced {current / 1e6:.1f}MB (peak {peak / 1e6:.1f}MB)", ""]
+        for stat in top:
+            lines.append(f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks), now {stat.size / 1024:.1f} KiB")
+            lines.extend("    " + line for line in stat.traceback.format())
+        with open(self._path(f"tracemalloc-{stamp}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self._prune_reports()
+
+    def _prune_reports(self):
+        output_dir = self.settings["output_dir"]
+        reports = sorted(name for name in os.listdir(output_dir) if name.startswith("tracemalloc-") and name.endswith(".txt"))
+        for name in reports[:max(0, len(reports) - self.settings["tracemalloc_keep_reports"])]:
+            try:
+                os.remove(os.path.join(output_dir, name))
+            except OSError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "settings": dict(self.settings),
+            "requests": self.requests,
+            "cprofile_captures": self.captures,
+            "tracemalloc_tracing": tracemalloc.is_tracing(),
+            "loop_lag": self._lag_monitor.report() if self._lag_monitor else None,
+        }
+
+# Shared by the request path and the metrics endpoint
+profiler = Profiler()
+
+def _profiling_route(params: Dict[str, List[str]]) -> Tuple[str, str]:
+    changes = {key: values[0] for key, values in params.items()}
+    try:
+        status = profiler.configure(**changes) if changes else profiler.status()
+    except (KeyError, ValueError) as e:
+        status = {"error": str(e)}
+    return "application/json", json.dumps(status)
+
+ROUTES["/profiling"] = _profiling_route
@@ -0,0 +1,83 @@
+# time_parser.py
+# agentic_ai_framework/utils/time_parser.py
+import re
+from datetime import datetime, timedelta
+
+# Natural-language time strings the LLM passes to the planning tools, e.g.
+# "2025-06-15 10:00 AM", "2025-06-15T14:30", "tomorrow 9 AM", "friday 3pm", "in 30 minutes", "now".
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+RELATIVE_PATTERN = re.compile(r"^in\s+(\d+(?:\.\d+)?)\s*(seconds?|secs?|minutes?|mins?|hours?|hrs?|days?|weeks?)$")
+DATE_PATTERN = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})")
+CLOCK_PATTERN = re.compile(r"^(?:at\s+)?(\d{1,2})(?::(\d{2}))?(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?$")
+UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def _parse_clock(text: str):
+    """Parses '9', '9am', '9:30 PM', '14:00', '14:00:30' into (hour, minute, second)."""
+    match = CLOCK_PATTERN.match(text.strip())
+    if not match:
+        raise ValueError(f"Unrecognized time of day: '{text}'")
+    hour, minute, second = int(match.group(1)), int(match.group(2) or 0), int(match.group(3) or 0)
+    meridiem = (match.group(4) or "").replace(".", "")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Invalid 12-hour time: '{text}'")
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59 or second > 59:
+        raise ValueError(f"Invalid time of day: '{text}'")
+    return hour, minute, second
+
+def _local_naive(moment: datetime) -> datetime:
+    """Converts a timezone-aware datetime to naive local time; naive ones are already local."""
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo is not None else moment
+
+def parse_datetime(text: str, now: datetime = None) -> datetime:
+    """
+    Converts a time string into an absolute (naive, local) datetime. Relative forms are resolved
+    against `now`. A day without a time of day means midnight. ISO strings with an offset or "Z" are
+    converted to local time, so results can always be compared with each other and with datetime.now().
+    Raises ValueError if unparseable.
+    """
+    now = _local_naive(now or datetime.now())
+    raw = " ".join(str(text).strip().lower().replace(",", " ").split())
+    if not raw:
+        raise ValueError("Empty time string.")
+    if raw == "now":
+        return now
+
+    relative = RELATIVE_PATTERN.match(raw)
+    if relative:
+        amount, unit = float(relative.group(1)), relative.group(2)
+        return now + timedelta(seconds=amount * UNIT_SECONDS[unit[0]])
+
+    try:
+        return _local_naive(datetime.fromisoformat(raw.upper().replace(" ", "T", 1))) # ISO 8601 forms
+    except ValueError:
+        pass
+
+    day, rest = None, raw
+    dated = DATE_PATTERN.match(raw)
+    if dated:
+        day = datetime(int(dated.group(1)), int(dated.group(2)), int(dated.group(3)))
+        rest = raw[dated.end():].lstrip("t ")
+    else:
+        first, _, remainder = raw.partition(" ")
+        if first == "today":
+            day, rest = now.replace(hour=0, minute=0, second=0, microsecond=0), remainder
+        elif first == "tomorrow":
+            day, rest = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1), remainder
+        else:
+            if first == "next" and remainder.split(" ")[0] in WEEKDAYS:
+                first, _, remainder = remainder.partition(" ")
+            if first in WEEKDAYS:
+                days_ahead = (WEEKDAYS.index(first) - now.weekday()) % 7 or 7 # Next occurrence, never today
+                day, rest = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=days_ahead), remainder
+
+    if day is None:
+        # A bare time of day: today if still ahead, otherwise tomorrow
+        hour, minute, second = _parse_clock(raw)
+        candidate = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+        return candidate if candidate > now else candidate + timedelta(days=1)
+    if not rest:
+        return day
+    hour, minute, second = _parse_clock(rest)
+    return day.replace(hour=hour, minute=minute, second=second)
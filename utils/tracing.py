@@ -0,0 +1,298 @@
+# tracing.py
+# agentic_ai_framework/utils/tracing.py
+import json
+import time
+import bisect
+import threading
+from collections import deque
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+from config import TRACING_SETTINGS
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# The innermost open span of the request running in this context (follows asyncio tasks like the event sink)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+def payload_size(value: Any) -> int:
+    """Approximate size in bytes of an LLM/tool payload: text length, raw bytes, inline data, nested parts."""
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        if "data" in value:
+            return payload_size(value["data"])
+        return sum(payload_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(item) for item in value)
+    size = getattr(value, "size", None) # PIL images: width x height x 3 channels
+    if isinstance(size, tuple) and len(size) == 2:
+        return size[0] * size[1] * 3
+    return len(str(value))
+
+# --- Metrics ---
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in the Prometheus text format."""
+    def __init__(self, name: str, help: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = sorted(buckets)
+        self._series: Dict[tuple, list] = {} # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels: Any):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float("inf")], series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float, *labels: Any):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items(), key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Histograms and counters fed by finished spans, plus gauges read from callbacks at scrape time
+    (e.g. scheduler queue depth). Updates happen on the event loop and rendering on the exporter thread,
+    so both go through one lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.span_seconds = Histogram("agentic_span_duration_seconds", "Duration of traced pipeline spans.",
+                                      ("span", "label"), TRACING_SETTINGS["latency_buckets_seconds"])
+        self.payload_bytes = Histogram("agentic_payload_bytes", "Size of LLM requests and tool inputs/outputs.",
+                                       ("span", "label", "direction"), TRACING_SETTINGS["payload_buckets_bytes"])
+        self.llm_tokens = Counter("agentic_llm_tokens_total", "Tokens reported by the LLM APIs.", ("model", "kind"))
+        self.span_errors = Counter("agentic_span_errors_total", "Spans that ended with an exception.", ("span", "label"))
+        self._gauges: List[Tuple[str, str, Sequence[str], Callable[[], Dict[tuple, float]]]] = []
+
+    def gauge(self, name: str, help: str, label_names: Sequence[str], callback: Callable[[], Dict[tuple, float]]):
+        """Registers a gauge whose label values -> value mapping is produced by `callback` on every scrape."""
+        self._gauges.append((name, help, tuple(label_names), callback))
+
+    def record_span(self, span: "Span"):
+        seconds = span.ended - span.started
+        with self._lock:
+            self.span_seconds.observe(seconds, span.name, span.label)
+            if span.error:
+                self.span_errors.inc(1, span.name, span.label)
+            for direction in ("in", "out"):
+                size = span.attributes.get(f"bytes_{direction}")
+                if size is not None:
+                    self.payload_bytes.observe(size, span.name, span.label, direction)
+            for kind in ("prompt", "completion"):
+                tokens = span.attributes.get(f"{kind}_tokens")
+                if tokens:
+                    self.llm_tokens.inc(tokens, span.label, kind)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = self.span_seconds.render() + self.payload_bytes.render() + self.llm_tokens.render() + self.span_errors.render()
+        for name, help, label_names, callback in self._gauges:
+            try:
+                samples = callback()
+            except Exception as e:
+                logger.error(f"Metrics gauge {name} failed: {e}")
+                continue
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{_format_labels(label_names, labels)} {value}" for labels, value in samples.items()]
+        return "\n".join(lines) + "\n"
+
+# --- Spans ---
+
+class Span:
+    """One timed operation. `label` is the low-cardinality metric label (model, tool or agent name)."""
+    __slots__ = ("name", "label", "attributes", "children", "parent", "started", "ended", "error", "_token", "_tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, label: str, attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.label = label
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.parent: Optional["Span"] = None
+        self.started = 0.0
+        self.ended: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        if self.parent is not None:
+            self.parent.children.append(self)
+        self._token = _current_span.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.ended = time.perf_counter()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self._tracer._finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {"name": self.name, "label": self.label, "ms": round(((self.ended or time.perf_counter()) - self.started) * 1000, 3)}
+        if self.attributes:
+            record["attributes"] = self.attributes
+        if self.error:
+            record["error"] = self.error
+        if self.children:
+            record["children"] = [child.to_dict() for child in self.children]
+        return record
+
+class _NoopSpan:
+    """Returned while tracing is off: entering, exiting and setting attributes do nothing."""
+    __slots__ = ()
+
+    def set(self, **attributes: Any):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """
+    Creates spans while `enabled`. A finished span feeds the latency/payload/token metrics; a finished
+    root span (one request) is kept among the recent traces and, with `traces_path` set, appended to
+    that JSONL file. While disabled, `span()` returns a shared no-op object, so instrumented code costs
+    one attribute check per span.
+    """
+    def __init__(self, enabled: bool = None, traces_path: str = None):
+        self.enabled = TRACING_SETTINGS["enabled"] if enabled is None else enabled
+        self.traces_path = traces_path or TRACING_SETTINGS["traces_path"]
+        self.metrics = MetricsRegistry()
+        self.recent = deque(maxlen=TRACING_SETTINGS["recent_traces"])
+        self._traces_file = None
+
+    def span(self, name: str, label: str = "", **attributes: Any):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, label, attributes)
+
+    def current(self):
+        """The innermost open span in this context, or a no-op span, for adding attributes."""
+        return (_current_span.get() if self.enabled else None) or _NOOP_SPAN
+
+    def _finish(self, span: Span):
+        self.metrics.record_span(span)
+        if span.parent is None:
+            record = span.to_dict()
+            self.recent.append(record)
+            if self.traces_path:
+                try:
+                    if self._traces_file is None:
+                        self._traces_file = open(self.traces_path, "a", encoding="utf-8")
+                    self._traces_file.write(json.dumps(record, default=str) + "\n")
+                    self._traces_file.flush()
+                except OSError as e:
+                    logger.error(f"Could not write trace to {self.traces_path}: {e}")
+
+# Shared by every instrumented module
+tracer = Tracer()
+
+# --- Local HTTP endpoint ---
+
+# Path -> handler(query params) returning (content type, body). Other modules may add their own routes.
+ROUTES: Dict[str, Callable[[Dict[str, List[str]]], Tuple[str, str]]] = {
+    "/metrics": lambda params: ("text/plain; version=0.0.4", tracer.metrics.render()),
+    "/traces": lambda params: ("application/json", json.dumps(list(tracer.recent), default=str)),
+}
+
+def _toggle_tracing(params: Dict[str, List[str]]) -> Tuple[str, str]:
+    if "enabled" in params:
+        tracer.enabled = params["enabled"][0].lower() in ("1", "true", "on", "yes")
+        logger.info(f"Tracing {'enabled' if tracer.enabled else 'disabled'} via the metrics endpoint.")
+    return "application/json", json.dumps({"enabled": tracer.enabled})
+
+ROUTES["/tracing"] = _toggle_tracing
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            self.send_error(404)
+            return
+        try:
+            content_type, body = route(parse_qs(url.query))
+        except Exception as e:
+            logger.error(f"Metrics endpoint {url.path} failed: {e}")
+            self.send_error(500)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass # Scrapes are too frequent for the application log
+
+def start_metrics_server(host: str = None, port: int = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Serves /metrics (Prometheus text format), /traces (recent request traces as JSON) and
+    /tracing?enabled=0|1 (runtime toggle) from a daemon thread. Returns None when the port is 0 or taken.
+    Bind to localhost only: the endpoint has no authentication.
+    """
+    host = host or TRACING_SETTINGS["metrics_host"]
+    port = TRACING_SETTINGS["metrics_port"] if port is None else port
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server